@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+from Cache import LRUCache
+from FoodLoading import load_catalogue
+from SearchIndex import district_key, tokenize
+
+# --- 1. CONFIGURATION ---
+
+DB_PATH = "data/foody_data.sqlite"
+
+# Number of (area, q) filters whose id lists are kept in memory
+QUERY_CACHE_SIZE = 256
+
+# Seconds between checks of the SQLite file (0 disables hot reload)
+WATCH_INTERVAL = float(os.getenv("CATALOGUE_WATCH_INTERVAL", "5"))
+
+
+# --- 2. QUERY SERVICE ---
+
+class CatalogueService:
+    """
+    Paginated catalogue queries shared by the home page, the forum page and /api/foods.
+    The filtered id list of each (area, q) is memoized, so paging through a filter
+    only costs a slice. The memo is dropped whenever the catalogue is reloaded.
+
+    The current catalogue is published as one immutable (catalogue, version) tuple:
+    a reload builds the new catalogue off to the side and swaps the tuple in a single
+    assignment, so readers never wait for a rebuild.
+    """
+
+    def __init__(self, db_path=DB_PATH, cache_size=QUERY_CACHE_SIZE):
+        self.db_path = db_path
+        self.cache = LRUCache(cache_size)
+        self.listeners = []
+        self.rebuild_seconds = 0.0
+        self.loaded_at = None
+        self._snapshot = None
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self.reload()
+
+    @property
+    def catalogue(self):
+        return self._snapshot[0]
+
+    @property
+    def version(self):
+        return self._snapshot[1]
+
+    def add_listener(self, callback):
+        """
+        Register a function called after every reload (e.g. to rebuild other indexes).
+        """
+        self.listeners.append(callback)
+
+    def _data_signature(self):
+        try:
+            stat = os.stat(self.db_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def reload(self):
+        with self._reload_lock:
+            start = time.perf_counter()
+            signature = self._data_signature()
+
+            catalogue = load_catalogue(self.db_path)
+            version = self._snapshot[1] + 1 if self._snapshot else 1
+            self._snapshot = (catalogue, version)
+            self._signature = signature
+            self.cache.clear()
+
+            for callback in self.listeners:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Catalogue reload listener error: {e}")
+
+            self.rebuild_seconds = time.perf_counter() - start
+            self.loaded_at = datetime.now().isoformat(timespec="seconds")
+
+        print(f"Catalogue v{version} loaded in {self.rebuild_seconds * 1000:.1f} ms")
+
+    def check_for_update(self):
+        """
+        Reload if the SQLite file changed since the last load. Returns True if reloaded.
+        """
+        signature = self._data_signature()
+        if signature is None or signature == self._signature:
+            return False
+        try:
+            self.reload()
+            return True
+        except Exception as e:
+            # Keep serving the previous snapshot if the new file cannot be read
+            print(f"Catalogue reload error: {e}")
+            return False
+
+    def start_watching(self, interval=WATCH_INTERVAL):
+        """
+        Poll the SQLite file in a daemon thread and hot-swap the catalogue when it changes.
+        """
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                self.check_for_update()
+
+        self._watcher = threading.Thread(target=watch, name="catalogue-watcher", daemon=True)
+        self._watcher.start()
+
+    def stats(self):
+        catalogue, version = self._snapshot
+        return {
+            "version": version,
+            "size": len(catalogue.foods),
+            "rebuild_seconds": round(self.rebuild_seconds, 4),
+            "loaded_at": self.loaded_at,
+            "query_cache": self.cache.stats()
+        }
+
+    def filtered_ids(self, area="all", q="", open_at=None):
+        catalogue, version = self._snapshot
+        area_key = "all" if not area or area.lower() == "all" else district_key(area)
+        key = (version, area_key, " ".join(tokenize(q or "")), open_at)
+
+        ids = self.cache.get(key)
+        if ids is None:
+            ids = catalogue.filter_ids(area, q, open_at)
+            if ids is None:
+                ids = range(len(catalogue.foods))
+            self.cache.set(key, ids)
+        return catalogue, ids
+
+    def query(self, area="all", q="", page=1, per_page=9, open_at=None):
+        """
+        (items on the page, total number of matches).
+        open_at is a minute of day (0-1439) to keep only places open at that time.
+        """
+        catalogue, ids = self.filtered_ids(area, q, open_at)
+        page = max(page, 1)
+        start = (page - 1) * per_page
+        items = [catalogue.foods[pos] for pos in ids[start:start + per_page]]
+        return items, len(ids)
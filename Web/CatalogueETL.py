@@ -0,0 +1,235 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from SearchIndex import parse_district
+
+# --- 1. CONFIGURATION ---
+
+RAW_DB_PATH = "data/foody_data.sqlite"
+CATALOGUE_DB_NAME = "catalogue.sqlite"
+
+# Bump when the normalized schema changes so old files get rebuilt
+SCHEMA_VERSION = "1"
+
+HOURS_RE = re.compile(r"(\d{1,2})[:h.](\d{2})\s*-\s*(\d{1,2})[:h.](\d{2})")
+
+SCHEMA = """
+    CREATE TABLE restaurants (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        location TEXT,
+        district_key TEXT,
+        rating REAL,
+        price_range TEXT,
+        opening_hours TEXT,
+        latitude REAL,
+        longitude REAL,
+        local_image_path TEXT,
+        original_image_url TEXT,
+        detail_page_url TEXT
+    );
+
+    -- One row per open interval; close_minute < open_minute means it ends after midnight
+    CREATE TABLE opening_hours (
+        restaurant_id INTEGER NOT NULL REFERENCES restaurants (id),
+        open_minute INTEGER NOT NULL,
+        close_minute INTEGER NOT NULL
+    );
+
+    CREATE TABLE tags (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE NOT NULL
+    );
+
+    CREATE TABLE restaurant_tags (
+        restaurant_id INTEGER NOT NULL REFERENCES restaurants (id),
+        tag_id INTEGER NOT NULL REFERENCES tags (id),
+        PRIMARY KEY (restaurant_id, tag_id)
+    );
+
+    CREATE TABLE catalogue_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+
+    CREATE INDEX idx_restaurants_district ON restaurants (district_key);
+    CREATE INDEX idx_restaurants_rating ON restaurants (rating);
+    CREATE INDEX idx_restaurants_lat_lon ON restaurants (latitude, longitude);
+    CREATE INDEX idx_restaurants_location ON restaurants (location);
+    CREATE INDEX idx_opening_hours_restaurant ON opening_hours (restaurant_id);
+    CREATE INDEX idx_restaurant_tags_tag ON restaurant_tags (tag_id);
+"""
+
+_build_lock = threading.Lock()
+
+
+# --- 2. CLEANUP HELPERS ---
+
+def parse_opening_hours(text):
+    """
+    '07:00 - 14:00 | 16:00 - 21:00' -> [(420, 840), (960, 1260)].
+    Returns [] when the hours are unknown ('Updating', empty, unparseable).
+    """
+    ranges = []
+    for h1, m1, h2, m2 in HOURS_RE.findall(str(text or "")):
+        open_minute = min(int(h1) * 60 + int(m1), 1440)
+        close_minute = min(int(h2) * 60 + int(m2), 1440)
+        ranges.append((open_minute, close_minute))
+    return ranges
+
+
+def parse_rating(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def clean_tags(text):
+    """
+    'Student,\\xa0Couple,\\xa0Family' -> ['Student', 'Couple', 'Family'].
+    """
+    tags = []
+    for tag in str(text or "").replace("\xa0", " ").split(","):
+        tag = " ".join(tag.split())
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def canonical_image_path(path):
+    if not path:
+        return None
+    return path.replace("\\", "/")
+
+
+def clean_text(text):
+    if text is None:
+        return None
+    text = " ".join(str(text).replace("\xa0", " ").split())
+    return text or None
+
+
+# --- 3. PIPELINE ---
+
+def catalogue_db_path(raw_path=RAW_DB_PATH):
+    return os.path.join(os.path.dirname(raw_path), CATALOGUE_DB_NAME)
+
+
+def _source_signature(raw_path):
+    stat = os.stat(raw_path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}:{SCHEMA_VERSION}"
+
+
+def build_catalogue_db(raw_path=RAW_DB_PATH, out_path=None):
+    """
+    Read the raw Foody scrape and write the normalized catalogue database.
+    The file is built next to the target and renamed into place, so readers
+    always see either the old or the new catalogue.
+    """
+    out_path = out_path or catalogue_db_path(raw_path)
+    signature = _source_signature(raw_path)
+
+    src = sqlite3.connect(raw_path)
+    src.row_factory = sqlite3.Row
+    raw_rows = src.execute("SELECT * FROM restaurants").fetchall()
+    src.close()
+
+    tmp_path = out_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(SCHEMA)
+
+    tag_ids = {}
+    stats = {"restaurants": 0, "opening_ranges": 0, "tags": 0, "skipped": 0}
+
+    for row in raw_rows:
+        row = dict(row)
+        if row.get("id") is None or not row.get("name"):
+            stats["skipped"] += 1
+            continue
+
+        location = clean_text(row.get("location"))
+        cursor = conn.execute("""
+            INSERT OR IGNORE INTO restaurants (
+                id, name, location, district_key, rating, price_range, opening_hours,
+                latitude, longitude, local_image_path, original_image_url, detail_page_url
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            row["id"],
+            clean_text(row["name"]),
+            location,
+            parse_district(location)[0] if location else None,
+            parse_rating(row.get("rating")),
+            clean_text(row.get("price_range")),
+            clean_text(row.get("opening_hours")),
+            parse_rating(row.get("latitude")),
+            parse_rating(row.get("longitude")),
+            canonical_image_path(row.get("local_image_path")),
+            row.get("original_image_url"),
+            row.get("detail_page_url")
+        ))
+        if cursor.rowcount == 0:
+            stats["skipped"] += 1
+            continue
+        stats["restaurants"] += 1
+
+        for open_minute, close_minute in parse_opening_hours(row.get("opening_hours")):
+            conn.execute(
+                "INSERT INTO opening_hours (restaurant_id, open_minute, close_minute) VALUES (?, ?, ?)",
+                (row["id"], open_minute, close_minute)
+            )
+            stats["opening_ranges"] += 1
+
+        for tag in clean_tags(row.get("tags")):
+            if tag not in tag_ids:
+                tag_ids[tag] = conn.execute("INSERT INTO tags (name) VALUES (?)", (tag,)).lastrowid
+            conn.execute(
+                "INSERT OR IGNORE INTO restaurant_tags (restaurant_id, tag_id) VALUES (?, ?)",
+                (row["id"], tag_ids[tag])
+            )
+
+    stats["tags"] = len(tag_ids)
+    conn.executemany("INSERT INTO catalogue_meta (key, value) VALUES (?, ?)", [
+        ("source_signature", signature),
+        ("built_at", datetime.now().isoformat(timespec="seconds")),
+        ("schema_version", SCHEMA_VERSION)
+    ])
+    conn.commit()
+    conn.close()
+
+    os.replace(tmp_path, out_path)
+    return stats
+
+
+def _is_up_to_date(raw_path, out_path):
+    if not os.path.exists(out_path):
+        return False
+    try:
+        conn = sqlite3.connect(out_path)
+        row = conn.execute("SELECT value FROM catalogue_meta WHERE key = 'source_signature'").fetchone()
+        conn.close()
+    except sqlite3.Error:
+        return False
+    return row is not None and row[0] == _source_signature(raw_path)
+
+
+def ensure_catalogue_db(raw_path=RAW_DB_PATH):
+    """
+    Path of the normalized catalogue, rebuilding it first if the raw scrape changed.
+    """
+    out_path = catalogue_db_path(raw_path)
+    with _build_lock:
+        if not _is_up_to_date(raw_path, out_path):
+            stats = build_catalogue_db(raw_path, out_path)
+            print(f"Catalogue ETL: {stats}")
+    return out_path
+
+
+if __name__ == "__main__":
+    print(build_catalogue_db())
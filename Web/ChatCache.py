@@ -0,0 +1,203 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from Cache import TTLCache
+from SearchIndex import tokenize
+
+# --- 1. CONFIGURATION ---
+
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "512"))
+
+# Seconds a cached reply stays valid
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "900"))
+
+# Minimum cosine similarity of character trigrams for a near-duplicate hit (0 disables)
+CHAT_CACHE_SIMILARITY = float(os.getenv("CHAT_CACHE_SIMILARITY", "0.9"))
+
+# Modes whose answer is determined by the extracted entities (location, cuisine, budget, open_now),
+# so two phrasings with the same entities can share one reply
+ENTITY_MODES = {"/place_"}
+
+# Entities a near-duplicate must share with the cached message ('Bình Thạnh' vs 'Bình Tân'
+# differ by one trigram or two but never by these)
+SIGNATURE_ENTITIES = ("location", "cuisine")
+
+NUMBER_RE = re.compile(r"\d+")
+
+
+# --- 2. NORMALIZATION ---
+
+def normalize_message(text):
+    """
+    'Phở ngon Quận 1!!' -> 'pho ngon quan 1'.
+    """
+    return " ".join(tokenize(text or ""))
+
+
+def entity_key(entities):
+    """
+    Accent-folded, order-independent key of the non-empty router entities, or None.
+    """
+    if not isinstance(entities, dict):
+        return None
+    items = []
+    for name, value in entities.items():
+        if value is None or value is False:
+            continue
+        value = normalize_message(str(value))
+        if value and value != "none":
+            items.append((name, value))
+    return tuple(sorted(items)) or None
+
+
+def ngram_vector(text, n=3):
+    padded = f" {text} "
+    return Counter(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+def cosine(a, b, norm_a, norm_b):
+    if not norm_a or not norm_b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(count * b.get(gram, 0) for gram, count in a.items()) / (norm_a * norm_b)
+
+
+# --- 3. RESPONSE CACHE ---
+
+class ResponseCache:
+    """
+    Chatbot replies keyed by (mode, normalized message) and, for ENTITY_MODES,
+    by (mode, extracted entities). A message that misses the exact key can still
+    hit a near-identical earlier message of the same mode through character
+    trigram similarity; numbers must match so 'quận 1' never answers 'quận 10'.
+    With extract (message -> entities, e.g. the local EntityExtractor) the location
+    and cuisine must match too, and ENTITY_MODES messages without a known location
+    never use the similarity tier.
+    """
+
+    def __init__(self, maxsize=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL, similarity=CHAT_CACHE_SIMILARITY,
+                 extract=None):
+        self.entries = TTLCache(maxsize, ttl)
+        self.maxsize = maxsize
+        self.similarity = similarity
+        self.extract = extract
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"exact": 0, "similar": 0, "entities": 0}
+        self.misses = 0
+
+    def lookup(self, mode, message):
+        """
+        Cached reply for the message before any LLM call, or None.
+        """
+        norm = normalize_message(message)
+        value = self.entries.get(("msg", mode, norm))
+        if value is not None:
+            self._count("exact")
+            return dict(value)
+
+        if self.similarity > 0:
+            value = self._lookup_similar(mode, norm)
+            if value is not None:
+                self._count("similar")
+                return dict(value)
+        return None
+
+    def lookup_entities(self, mode, message, entities):
+        """
+        Cached reply for the same entities after routing, or None (counted as a miss).
+        The hit is also remembered under this message so the next identical one skips routing.
+        """
+        key = entity_key(entities) if mode in ENTITY_MODES else None
+        value = self.entries.get(("ent", mode, key)) if key else None
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._count("entities")
+        self._remember(mode, normalize_message(message), value)
+        return dict(value)
+
+    def store(self, mode, message, entities, value):
+        self._remember(mode, normalize_message(message), value)
+        key = entity_key(entities) if mode in ENTITY_MODES else None
+        if key:
+            self.entries.set(("ent", mode, key), value)
+
+    def _remember(self, mode, norm, value):
+        self.entries.set(("msg", mode, norm), value)
+        if self.similarity <= 0:
+            return
+
+        vector = ngram_vector(norm)
+        norm_len = math.sqrt(sum(c * c for c in vector.values()))
+        signature = self._signature(norm)
+        with self._lock:
+            self._vectors[(mode, norm)] = (vector, norm_len, NUMBER_RE.findall(norm), signature)
+            self._vectors.move_to_end((mode, norm))
+            while len(self._vectors) > self.maxsize:
+                self._vectors.popitem(last=False)
+
+    def _signature(self, norm):
+        """
+        Key of the location and cuisine extract finds in the message, or None.
+        """
+        if self.extract is None:
+            return None
+        entities = self.extract(norm) or {}
+        return entity_key({name: entities.get(name) for name in SIGNATURE_ENTITIES})
+
+    def _lookup_similar(self, mode, norm):
+        signature = self._signature(norm)
+        # Không biết địa điểm thì không thể chắc câu gần giống hỏi cùng một nơi
+        if self.extract is not None and mode in ENTITY_MODES and not dict(signature or ()).get("location"):
+            return None
+
+        vector = ngram_vector(norm)
+        norm_len = math.sqrt(sum(c * c for c in vector.values()))
+        numbers = NUMBER_RE.findall(norm)
+
+        best_key, best_score = None, self.similarity
+        with self._lock:
+            candidates = list(self._vectors.items())
+        for (entry_mode, entry_norm), (entry_vector, entry_len, entry_numbers, entry_signature) in candidates:
+            if entry_mode != mode or entry_numbers != numbers or entry_signature != signature:
+                continue
+            score = cosine(vector, entry_vector, norm_len, entry_len)
+            if score >= best_score:
+                best_key, best_score = (entry_mode, entry_norm), score
+
+        if best_key is None:
+            return None
+        value = self.entries.get(("msg",) + best_key)
+        if value is None:
+            # Expired or evicted: forget the vector too
+            with self._lock:
+                self._vectors.pop(best_key, None)
+        return value
+
+    def _count(self, tier):
+        with self._lock:
+            self.hits[tier] += 1
+
+    def clear(self):
+        self.entries.clear()
+        with self._lock:
+            self._vectors.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = dict(self.hits)
+            misses = self.misses
+        total = sum(hits.values()) + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(sum(hits.values()) / total, 3) if total else 0.0,
+            "entries": self.entries.stats()
+        }
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# --- 1. CONFIGURATION ---
+
+# Worker threads shared by every chat request (speculative geocoding, API fan-out)
+CHAT_WORKERS = int(os.getenv("CHAT_WORKERS", "8"))
+
+executor = ThreadPoolExecutor(max_workers=CHAT_WORKERS, thread_name_prefix="chat")
+
+_metrics = {}
+_last = {}
+_metrics_lock = threading.Lock()
+
+
+# --- 2. STAGE TIMER ---
+
+class StageTimer:
+    """
+    Wall-clock breakdown of one chat request. Stages may run in the request
+    thread (stage) or on the shared pool (submit); finish() adds them to the
+    per-pipeline metrics.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.start = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def _add(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - start)
+
+    def submit(self, name, fn, *args, **kwargs):
+        """
+        Run fn on the shared pool, timing it as stage name. Returns the Future.
+        """
+        def run():
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return executor.submit(run)
+
+    def finish(self):
+        total = time.perf_counter() - self.start
+        with self._lock:
+            breakdown = {name: round(s * 1000, 1) for name, s in self.stages.items()}
+        breakdown["total"] = round(total * 1000, 1)
+
+        with _metrics_lock:
+            stages = _metrics.setdefault(self.pipeline, {})
+            for name, ms in breakdown.items():
+                m = stages.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                m["count"] += 1
+                m["total_ms"] += ms
+                m["max_ms"] = max(m["max_ms"], ms)
+            _last[self.pipeline] = breakdown
+
+        print(f"-> Timings [{self.pipeline}]: {breakdown}")
+        return breakdown
+
+
+def stats():
+    with _metrics_lock:
+        return {
+            pipeline: {
+                "stages": {
+                    name: dict(m, total_ms=round(m["total_ms"], 1), avg_ms=round(m["total_ms"] / m["count"], 1))
+                    for name, m in stages.items()
+                },
+                "last": dict(_last.get(pipeline, {}))
+            }
+            for pipeline, stages in _metrics.items()
+        }
+
+
+def reset_stats():
+    with _metrics_lock:
+        _metrics.clear()
+        _last.clear()
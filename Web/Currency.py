@@ -1,9 +1,13 @@
-import requests
 import os
 import json
+import threading
 import google.generativeai as genai
+from google.api_core.exceptions import TooManyRequests
 from dotenv import load_dotenv
 
+import HttpClient
+from LLMClient import generate, LLMBusyError, TRANSIENT_LLM_ERRORS
+
 # --- 1. CONFIGURATION ---
 load_dotenv()
 
@@ -16,6 +20,10 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if GOOGLE_API_KEY:
     genai.configure(api_key=GOOGLE_API_KEY)
 
+# Tỷ giá lấy thành công gần nhất, dùng khi API lỗi hoặc circuit breaker đang mở
+_last_rates = {}
+_last_rates_lock = threading.Lock()
+
 # Supported Currencies for Dropdown
 SUPPORTED_CURRENCIES = {
     "1": "USD",
@@ -51,16 +59,19 @@ def get_exchange_rate(foreign_currency):
     url = f"{BASE_URL}/{CURRENCY_API_KEY}/pair/{foreign_currency}/VND"
 
     try:
-        response = requests.get(url)
+        response = HttpClient.get(url, label="exchangerate")
         response.raise_for_status()
         data = response.json()
 
         if data.get("result") == "success":
-            return {
+            result = {
                 "success": True,
                 "rate": float(data["conversion_rate"]),
                 "name": CURRENCY_NAMES.get(foreign_currency, foreign_currency)
             }
+            with _last_rates_lock:
+                _last_rates[foreign_currency] = result
+            return result
         else:
             return {
                 "success": False,
@@ -68,9 +79,30 @@ def get_exchange_rate(foreign_currency):
             }
 
     except Exception as e:
+        with _last_rates_lock:
+            cached = _last_rates.get(foreign_currency)
+        if cached:
+            print(f"Exchange rate API error, using last known rate: {e}")
+            return dict(cached, stale=True)
         return {"success": False, "error": str(e)}
 
 
+def upload_image(image_path):
+    """
+    Uploads the image to Gemini through the 'gemini' circuit breaker, retrying
+    transient errors. Raises LLMBusyError on 429 or while the breaker is open.
+    """
+    try:
+        return HttpClient.call(
+            "gemini",
+            lambda: genai.upload_file(path=image_path, display_name="User Money Upload"),
+            is_transient=lambda e: isinstance(e, TRANSIENT_LLM_ERRORS) or HttpClient.is_transient_error(e),
+            label="gemini:money_upload"
+        )
+    except (TooManyRequests, HttpClient.CircuitOpenError) as e:
+        raise LLMBusyError(str(e)) from e
+
+
 def scan_money_image(image_path):
     """
     Uses Gemini 2.5 Flash to analyze an image of money.
@@ -81,10 +113,13 @@ def scan_money_image(image_path):
             return {"success": False, "error": "Google API Key missing"}
 
         # Upload the file to Gemini
-        sample_file = genai.upload_file(path=image_path, display_name="User Money Upload")
-
-        # Initialize Model
-        model = genai.GenerativeModel(model_name="gemini-2.5-flash")
+        try:
+            sample_file = upload_image(image_path)
+        except LLMBusyError:
+            raise
+        except Exception as e:
+            print(f"Gemini upload error: {e}")
+            return {"success": False, "error": "Could not upload the image, please try again later."}
 
         # Prompt asking for item count and value
         prompt = (
@@ -97,7 +132,7 @@ def scan_money_image(image_path):
             "{ \"amount\": number, \"currency\": \"CODE\", \"item_count\": number, \"warning\": \"message_or_null\" }"
         )
 
-        response = model.generate_content([sample_file, prompt])
+        response = generate([sample_file, prompt], label="money_scan")
 
         # Parse result
         text_resp = response.text.replace("```json", "").replace("```", "").strip()
@@ -113,6 +148,10 @@ def scan_money_image(image_path):
 
         return {"success": True, "data": data}
 
+    except LLMBusyError as e:
+        print(f"Gemini Vision busy: {e}")
+        return {"success": False, "busy": True, "error": "Service is busy, please try again later."}
+
     except Exception as e:
         print(f"Gemini Vision Error: {e}")
         return {"success": False, "error": "Could not recognize money in this image."}
@@ -0,0 +1,232 @@
+import re
+import threading
+from collections import Counter, defaultdict
+
+from RestaurantIndex import get_restaurant_index
+from SearchIndex import fold_text, tokenize, parse_district
+
+# --- 1. CONFIGURATION ---
+
+# A name n-gram becomes a dish when at least this many restaurant names start with it
+MIN_DISH_COUNT = 5
+MAX_DISH_TOKENS = 3
+MAX_STREET_TOKENS = 4
+
+# Words that appear in restaurant names but are not dishes
+STOPWORDS = {
+    "quan", "an", "nha", "hang", "tiem", "co", "ba", "chu", "di", "anh", "chi", "em", "ong",
+    "shop", "online", "store", "the", "and", "va", "ngon", "sai", "gon", "ha", "noi",
+    "mon", "dac", "am", "thuc", "viet", "nam", "nhanh", "tp", "hcm",
+    "mr", "la", "cac", "ut", "kim", "phuc", "saigon", "aeon", "vincom", "gigamall"
+}
+
+NUMBERED_DISTRICT_RE = re.compile(r"\b(?:quan|q|district|dist)\s*\.?\s*(\d{1,2})\b")
+HOUSE_NUMBER_RE = re.compile(r"^\S*\d\S*$")
+NAME_SEGMENT_RE = re.compile(r"\s+-\s+|[&|()/]")
+
+BUDGET_AMOUNT_RE = re.compile(
+    r"\b(duoi|under|below|less than|toi da|max|khoang|around|tam|about)\s*(\d+(?:[.,]\d+)?)\s*(k|nghin|ngan|tr|trieu)?\b"
+)
+BUDGET_WORDS = {
+    "cheap": ["gia re", "re", "binh dan", "cheap", "affordable", "sinh vien", "student"],
+    "high-end": ["sang trong", "cao cap", "fancy", "expensive", "luxury"]
+}
+DIET_ALIASES = {
+    "an chay": "vegetarian", "do chay": "vegetarian", "thuan chay": "vegan",
+    "hoi giao": "halal", "muslim": "halal", "do thai": "kosher", "jewish": "kosher", "an do": "hindu"
+}
+OPEN_NOW_PHRASES = ["dang mo", "con mo", "mo cua bay gio", "open now", "still open", "open right now"]
+
+# Nuance the local rules cannot express: let Gemini read these prompts
+NEGATION_PHRASES = ["khong phai", "ngoai tru", "tru", "not", "except", "without", "no"]
+
+
+def _phrase_in(phrase, tokens_text):
+    return f" {phrase} " in f" {tokens_text} "
+
+
+def _most_common_label(counter):
+    return counter.most_common(1)[0][0] if counter else None
+
+
+# --- 2. EXTRACTOR ---
+
+class EntityExtractor:
+    """
+    Rule-based version of the Gemini router built from the catalogue:
+    a gazetteer of districts and streets from restaurants.location, a dish lexicon
+    from n-grams shared by many restaurant names, the diet keys and budget patterns.
+    """
+
+    def __init__(self, rows, diet_keys=()):
+        self.districts = {}
+        self.streets = {}
+        self.dishes = {}
+        self.diet_keys = {fold_text(k): k for k in diet_keys}
+
+        street_labels = defaultdict(Counter)
+        street_grams = Counter()
+        for row in rows:
+            location = row.get("location") or ""
+            key, label = parse_district(location)
+            if key:
+                self.districts.setdefault(key, label)
+
+            street = self._street_of(location)
+            if street:
+                street_labels[" ".join(tokenize(street))][street] += 1
+                street_grams.update(set(self._ngrams(tokenize(street), MAX_DISH_TOKENS)))
+
+        self.streets = {
+            key: _most_common_label(labels)
+            for key, labels in street_labels.items()
+            if len(key.split()) >= 2 and key not in self.districts
+        }
+
+        # Dishes lead a name segment ('Phở Lệ', 'Cơm Tấm Phúc Lộc Thọ - Lê Văn Sỹ'),
+        # owner and street names trail it, so only segment-leading n-grams are kept
+        lead_grams = Counter()
+        name_labels = defaultdict(Counter)
+        for row in rows:
+            leads = {}
+            for segment in NAME_SEGMENT_RE.split(row.get("name") or ""):
+                words = re.findall(r"\w+", segment)
+                folded = [fold_text(w) for w in words]
+                for n in range(1, min(MAX_DISH_TOKENS, len(words)) + 1):
+                    leads.setdefault(" ".join(folded[:n]), " ".join(w.capitalize() for w in words[:n]))
+            lead_grams.update(leads.keys())
+            for gram, label in leads.items():
+                name_labels[gram][label] += 1
+
+        for gram, count in lead_grams.items():
+            tokens = gram.split()
+            if count < MIN_DISH_COUNT or count < 2 * street_grams.get(gram, 0):
+                continue
+            if tokens[0] in STOPWORDS or tokens[-1] in STOPWORDS:
+                continue
+            if any(len(t) < 2 or any(ch.isdigit() for ch in t) for t in tokens):
+                continue
+            if gram in self.districts:
+                continue
+            self.dishes[gram] = _most_common_label(name_labels[gram])
+
+    @staticmethod
+    def _street_of(location):
+        """
+        '158-160 Lê Bình, P. 4, Quận Tân Bình, TP. HCM' -> 'Lê Bình'.
+        """
+        first = location.split(",")[0].split()
+        while first and HOUSE_NUMBER_RE.match(first[0]):
+            first = first[1:]
+        return " ".join(first) or None
+
+    @staticmethod
+    def _ngrams(tokens, max_n):
+        for n in range(1, max_n + 1):
+            for i in range(len(tokens) - n + 1):
+                yield " ".join(tokens[i:i + n])
+
+    def _match_longest(self, tokens, lexicon, max_n, taken=()):
+        """
+        (label, positions) of the earliest, then longest, token window found in lexicon.
+        """
+        for i in range(len(tokens)):
+            for n in range(max_n, 0, -1):
+                window = range(i, i + n)
+                if i + n > len(tokens) or any(p in taken for p in window):
+                    continue
+                label = lexicon.get(" ".join(tokens[i:i + n]))
+                if label:
+                    return label, set(window)
+        return None, set()
+
+    def _match_district(self, folded, tokens):
+        m = NUMBERED_DISTRICT_RE.search(folded)
+        if m:
+            key = f"quan {int(m.group(1))}"
+            if key in self.districts:
+                return self.districts[key]
+
+        named = {k: v for k, v in self.districts.items() if not k.startswith("quan ")}
+        label, _ = self._match_longest(tokens, named, 3)
+        return label
+
+    def extract(self, prompt):
+        """
+        (entities, confident). Only keys that were found are set; confident means
+        the prompt names both a place and a dish and has no negation.
+        """
+        folded = fold_text(prompt)
+        tokens = tokenize(prompt)
+        text = " ".join(tokens)
+        entities = {}
+
+        dish, dish_pos = self._match_longest(tokens, self.dishes, MAX_DISH_TOKENS)
+        if dish:
+            entities["cuisine"] = dish
+
+        district = self._match_district(folded, tokens)
+        street, _ = self._match_longest(tokens, self.streets, MAX_STREET_TOKENS, taken=dish_pos)
+        if street and district:
+            entities["location"] = f"{street}, {district}"
+        elif street or district:
+            entities["location"] = street or district
+
+        m = BUDGET_AMOUNT_RE.search(text)
+        if m:
+            entities["budget"] = m.group(0)
+        else:
+            for budget, phrases in BUDGET_WORDS.items():
+                if any(_phrase_in(p, text) for p in phrases):
+                    entities["budget"] = budget
+                    break
+
+        for phrase, diet in list(self.diet_keys.items()) + list(DIET_ALIASES.items()):
+            if _phrase_in(phrase, text):
+                entities["diet_ingredient"] = diet
+                break
+
+        if any(_phrase_in(p, text) for p in OPEN_NOW_PHRASES):
+            entities["open_now"] = True
+
+        negated = any(_phrase_in(p, text) for p in NEGATION_PHRASES)
+        confident = "cuisine" in entities and "location" in entities and not negated
+        return entities, confident
+
+
+# --- 3. SHARED EXTRACTOR ---
+
+_extractor = None
+_source = None
+_lock = threading.Lock()
+_stats = {"local": 0, "fallback": 0}
+
+
+def get_entity_extractor(diet_keys=()):
+    """
+    Extractor over the shared restaurant index, rebuilt when the index is reloaded.
+    """
+    global _extractor, _source
+    index = get_restaurant_index()
+    if _source is not index:
+        with _lock:
+            if _source is not index:
+                _extractor = EntityExtractor(index.rows, diet_keys)
+                _source = index
+    return _extractor
+
+
+def extract_entities(prompt, diet_keys=()):
+    """
+    Entities found locally, or None when the router should ask Gemini.
+    """
+    entities, confident = get_entity_extractor(diet_keys).extract(prompt)
+    with _lock:
+        _stats["local" if confident else "fallback"] += 1
+    return entities if confident else None
+
+
+def stats():
+    with _lock:
+        total = _stats["local"] + _stats["fallback"]
+        return dict(_stats, local_rate=round(_stats["local"] / total, 3) if total else 0.0)
@@ -1,9 +1,15 @@
 import sqlite3
 
+import numpy as np
+
+from CatalogueETL import ensure_catalogue_db, parse_opening_hours
+from SearchIndex import InvertedIndex, AreaIndex, HoursIndex
+
 def load_foods_from_sqlite(db_path="data/foody_data.sqlite"):
     foods = []
 
-    conn = sqlite3.connect(db_path)
+    # Đọc từ catalogue đã chuẩn hóa (tự build lại nếu file gốc thay đổi)
+    conn = sqlite3.connect(ensure_catalogue_db(db_path))
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -16,6 +22,7 @@ def load_foods_from_sqlite(db_path="data/foody_data.sqlite"):
             opening_hours,
             local_image_path
         FROM restaurants
+        ORDER BY id
     """)
 
     rows = cursor.fetchall()
@@ -28,8 +35,143 @@ def load_foods_from_sqlite(db_path="data/foody_data.sqlite"):
             "rating": row[3],
             "price": row[4] if row[4] else "Đang cập nhật",      
             "hours": row[5] if row[5] else "Đang cập nhật",      
-            "image": row[6].replace("\\", "/") if row[6] else None
+            "image": row[6]
         })
 
     conn.close()
-    return foods
\ No newline at end of file
+    return foods
+
+
+def load_restaurant_rows(db_path="data/foody_data.sqlite"):
+    """
+    Load every restaurant of the normalized catalogue for the chatbot.
+    Values are already typed by the ETL; only the prompt defaults are filled in here.
+    """
+    conn = sqlite3.connect(ensure_catalogue_db(db_path))
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT
+            r.id,
+            r.name,
+            (SELECT GROUP_CONCAT(t.name, ', ')
+             FROM restaurant_tags rt JOIN tags t ON t.id = rt.tag_id
+             WHERE rt.restaurant_id = r.id) AS tags,
+            r.location,
+            r.rating,
+            r.price_range,
+            r.opening_hours,
+            r.latitude,
+            r.longitude,
+            r.local_image_path,
+            r.original_image_url,
+            r.detail_page_url
+        FROM restaurants r
+        ORDER BY r.id
+    """)
+    rows = cursor.fetchall()
+    conn.close()
+
+    restaurants = []
+    for row in rows:
+        rest = dict(row)
+
+        if not rest['opening_hours']:
+            rest['opening_hours'] = "Updating"
+        if not rest['price_range']:
+            rest['price_range'] = "Updating"
+        if not rest['tags']:
+            rest['tags'] = "Family, Office workers"
+        if rest['rating'] is None:
+            rest['rating'] = 0.0
+        if rest['latitude'] is None or rest['longitude'] is None:
+            rest['latitude'] = None
+            rest['longitude'] = None
+
+        restaurants.append(rest)
+
+    return restaurants
+
+
+def load_opening_hours(db_path="data/foody_data.sqlite"):
+    """
+    {restaurant id: [(open_minute, close_minute), ...]} from the normalized catalogue.
+    """
+    conn = sqlite3.connect(ensure_catalogue_db(db_path))
+    cursor = conn.cursor()
+    cursor.execute("SELECT restaurant_id, open_minute, close_minute FROM opening_hours ORDER BY rowid")
+    rows = cursor.fetchall()
+    conn.close()
+
+    hours = {}
+    for restaurant_id, open_minute, close_minute in rows:
+        hours.setdefault(restaurant_id, []).append((open_minute, close_minute))
+    return hours
+
+
+class FoodCatalogue:
+    """
+    Foods shown on the home and forum pages plus the search indexes built over them.
+    """
+
+    def __init__(self, foods, opening_hours=None):
+        self.foods = foods
+        self.by_id = {str(food["id"]): food for food in foods}
+        self.name_index = InvertedIndex()
+        self.area_index = AreaIndex()
+
+        for pos, food in enumerate(foods):
+            self.name_index.add(pos, food["name"])
+            self.area_index.add(pos, food["location"])
+
+        # Giờ mở cửa đã tách sẵn thành phút; nếu không truyền vào thì parse từ chuỗi hiển thị
+        if opening_hours is None:
+            self.hours_index = HoursIndex([parse_opening_hours(food["hours"]) for food in foods])
+        else:
+            self.hours_index = HoursIndex([opening_hours.get(food["id"]) for food in foods])
+
+    def get(self, food_id):
+        return self.by_id.get(str(food_id))
+
+    def get_many(self, ids):
+        """
+        Foods for a batch of ids (int or str) in the same order, None where the id is unknown.
+        """
+        by_id = self.by_id
+        return [by_id.get(str(food_id)) for food_id in ids]
+
+    def search(self, q):
+        """
+        Foods whose name matches every word of q (accent-insensitive, prefix), in catalogue order.
+        """
+        return [self.foods[pos] for pos in self.name_index.search(q)]
+
+    def filter_ids(self, area="all", q="", open_at=None):
+        """
+        Sorted positions matching the area, the search words and (if open_at is a
+        minute of day) currently open, or None when nothing is filtered.
+        """
+        ids = None
+        if area and area.lower() != "all":
+            ids = self.area_index.lookup(area)
+        if q:
+            matched = self.name_index.search(q)
+            ids = matched if ids is None else sorted(set(ids).intersection(matched))
+        if open_at is not None:
+            is_open = self.hours_index.open_at(open_at)
+            ids = np.flatnonzero(is_open).tolist() if ids is None else [pos for pos in ids if is_open[pos]]
+        return ids
+
+    def filter(self, area="all", q="", open_at=None):
+        ids = self.filter_ids(area, q, open_at)
+        if ids is None:
+            return self.foods
+        return [self.foods[pos] for pos in ids]
+
+    def area_counts(self):
+        return self.area_index.counts()
+
+
+def load_catalogue(db_path="data/foody_data.sqlite"):
+    return FoodCatalogue(load_foods_from_sqlite(db_path), load_opening_hours(db_path))
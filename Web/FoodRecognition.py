@@ -4,6 +4,8 @@ from flask import jsonify
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from LLMClient import generate, LLMBusyError
+
 load_dotenv()
 GOOGLE_API = os.getenv("GOOGLE_API_KEY")
 
@@ -24,12 +26,10 @@ def replyToImage(img_file):
             "Nếu món ăn không có trong danh sách, hãy chọn món giống nhất."
         )
 
-        model = genai.GenerativeModel("gemini-2.5-flash")
-
-        response = model.generate_content([
+        response = generate([
             prompt,
             {"mime_type": img_file.mimetype, "data": img_bytes}
-        ])
+        ], label="food_image")
 
         food_name = response.text.strip()
         message = f"The food you are looking for is {food_name}."
@@ -39,6 +39,10 @@ def replyToImage(img_file):
             "message": message
         })
 
+    except LLMBusyError as e:
+        print("AI predict bị hoãn:", e)
+        return jsonify({"error": "Hệ thống đang bận, vui lòng thử lại sau."}), 429
+
     except Exception as e:
         print("Lỗi AI predict:", e)
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,384 @@
+import re
+import threading
+import time
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from FoodLoading import load_restaurant_rows
+from SearchIndex import NUMBERED_DISTRICT_RE, NAMED_DISTRICT_RE, CITY_KEYS, fold_text, tokenize
+
+# --- 1. CONFIGURATION ---
+
+DB_PATH = "data/foody_data.sqlite"
+
+# Cùng một tên: quận thắng phường, phường thắng đường
+KIND_PRIORITY = {"district": 0, "ward": 1, "street": 2}
+
+# Gợi ý theo tiền tố chỉ dùng cho truy vấn >= 2 từ, tránh 'nguyen' -> một đường bất kỳ
+PREFIX_MIN_TOKENS = 2
+# Độ giống tối thiểu (0..1) để chấp nhận một tên gõ sai
+FUZZY_MIN_SCORE = 0.85
+FUZZY_CANDIDATES = 20
+# Địa chỉ đầy đủ dài hơn tên đường nên cần giống hơn
+ADDRESS_MIN_SCORE = 0.9
+
+WARD_RE = re.compile(r"^(?:phuong|ward|p\.|p(?=\s|\d))\s*(.+)$")
+# Từ đứng trước tên đường: 'Số 2', 'Hẻm 600', 'Lô L'
+STREET_SKIP_WORDS = {"so", "hem", "kiet", "ngo", "lo"}
+
+
+# --- 2. ADDRESS PARSING ---
+
+def _district_of(part):
+    folded = fold_text(part).strip()
+    m = NUMBERED_DISTRICT_RE.match(folded.replace(" ", ""))
+    if m:
+        return f"quan {int(m.group(1))}"
+    m = NAMED_DISTRICT_RE.match(folded)
+    if m:
+        return " ".join(tokenize(m.group(2)))
+    # 'Tan Binh District'
+    if folded.endswith(" district"):
+        return " ".join(tokenize(folded[:-len(" district")]))
+    return None
+
+
+def _ward_of(part):
+    m = WARD_RE.match(fold_text(part).strip())
+    if not m:
+        return None
+    tokens = tokenize(m.group(1))
+    if not tokens:
+        return None
+    if len(tokens) == 1 and tokens[0].isdigit():
+        return f"phuong {int(tokens[0])}"
+    return "phuong " + " ".join(tokens)
+
+
+def _street_of(part):
+    """
+    '48F/2A Hoàng Sĩ Khải' -> 'hoang si khai', 'Số 38 Đường Số 45' -> 'duong so 45'.
+    """
+    tokens = tokenize(re.sub(r"\(.*?\)", " ", part))
+    i = 0
+    while i < len(tokens) and (any(ch.isdigit() for ch in tokens[i]) or len(tokens[i]) == 1
+                               or tokens[i] in STREET_SKIP_WORDS):
+        i += 1
+    tokens = tokens[i:]
+    if len(tokens) > 1 and tokens[0] == "duong" and tokens[1] != "so":
+        tokens = tokens[1:]
+    return " ".join(tokens) or None
+
+
+def parse_address(text):
+    """
+    (street, ward, district) keys of an address or a user location, None where missing:
+    '833A Tạ Quang Bửu, P. 5, Quận 8, TP. HCM' -> ('ta quang buu', 'phuong 5', 'quan 8').
+    """
+    parts = [p for p in str(text or "").split(",") if p.strip()]
+    parts = [p for p in parts if re.sub(r"[\W_]", "", fold_text(p)) not in CITY_KEYS]
+
+    street = ward = district = None
+    rest = []
+    for part in parts:
+        if district is None and _district_of(part):
+            district = _district_of(part)
+        elif ward is None and _ward_of(part):
+            ward = _ward_of(part)
+        elif district is None and ward is None:
+            rest.append(part)
+
+    if rest:
+        # Phần có số nhà gần phường/quận nhất ('Tầng 3, Aeon Mall, 1 Đường Số 17A' -> 'Đường Số 17A')
+        numbered = [p for p in rest if p.split() and any(ch.isdigit() for ch in p.split()[0])]
+        street = _street_of(numbered[-1] if numbered else rest[0])
+    return street, ward, district
+
+
+def address_key(text):
+    """
+    Canonical form of a full address, so spelling variants of the same place
+    compare equal: '28 Phan Phu Tien, P10, Q.5' and
+    '28 Phan Phú Tiên, Phường 10, Quận 5, TP. HCM' -> '28 phan phu tien phuong 10 quan 5'.
+    """
+    keys = []
+    for part in str(text or "").split(","):
+        if not part.strip() or re.sub(r"[\W_]", "", fold_text(part)) in CITY_KEYS:
+            continue
+        keys.append(_district_of(part) or _ward_of(part) or " ".join(tokenize(part)))
+    return " ".join(k for k in keys if k)
+
+
+def _house_numbers(key):
+    return [t for t in key.split() if any(ch.isdigit() for ch in t)]
+
+
+# --- 3. PREFIX TRIE ---
+
+class PrefixTrie:
+    """
+    Character trie over place keys for 'ben tha' -> 'ben thanh' completion.
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, key):
+        node = self.root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[""] = key
+
+    def complete(self, prefix, limit=50):
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        keys, stack = [], [node]
+        while stack and len(keys) < limit:
+            node = stack.pop()
+            for ch, child in node.items():
+                if ch == "":
+                    keys.append(child)
+                else:
+                    stack.append(child)
+        return keys
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _index_trigrams(keys):
+    grams = {}
+    for key in keys:
+        for gram in _trigrams(key):
+            grams.setdefault(gram, []).append(key)
+    return grams
+
+
+def fuzzy_match(key, grams, min_score, accept=None):
+    """
+    Indexed key most similar to key (difflib ratio >= min_score), only scoring the
+    FUZZY_CANDIDATES keys sharing the most trigrams with it. None if nothing is close.
+    """
+    shared = {}
+    for gram in _trigrams(key):
+        for candidate in grams.get(gram, ()):
+            shared[candidate] = shared.get(candidate, 0) + 1
+    best, best_score = None, min_score
+    for candidate in sorted(shared, key=shared.get, reverse=True)[:FUZZY_CANDIDATES]:
+        if accept is not None and not accept(candidate):
+            continue
+        score = SequenceMatcher(None, key, candidate).ratio()
+        if score >= best_score:
+            best, best_score = candidate, score
+    return best
+
+
+# --- 4. RESTAURANT ADDRESSES ---
+
+class AddressMap:
+    """
+    Full restaurant address -> coordinates: the raw text, then the canonical
+    address_key, then a fuzzy match that must keep every house/ward/district number.
+    """
+
+    def __init__(self, rows):
+        self.raw = {}
+        self.by_key = {}
+        for row in rows:
+            if row.get("latitude") is None or row.get("longitude") is None:
+                continue
+            coords = (row["latitude"], row["longitude"])
+            self.raw.setdefault(row.get("location"), coords)
+            self.by_key.setdefault(address_key(row.get("location")), coords)
+        self.grams = _index_trigrams(self.by_key)
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "exact": 0, "normalized": 0, "fuzzy": 0, "misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats[name] += 1
+
+    def lookup(self, text):
+        """
+        (lat, lon) of the restaurant at this address, (None, None) if unknown.
+        """
+        if text in self.raw:
+            self._count("exact")
+            return self.raw[text]
+
+        key = address_key(text)
+        if key in self.by_key:
+            self._count("normalized")
+            return self.by_key[key]
+
+        # '12 Lê Lợi' không được khớp sang '40 Lê Lợi' dù chuỗi rất giống
+        numbers = _house_numbers(key)
+        best = fuzzy_match(key, self.grams, ADDRESS_MIN_SCORE,
+                           accept=lambda candidate: _house_numbers(candidate) == numbers) if key else None
+        if best:
+            self._count("fuzzy")
+            return self.by_key[best]
+
+        self._count("misses")
+        return None, None
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=len(self.by_key))
+
+
+# --- 5. GAZETTEER ---
+
+class Gazetteer:
+    """
+    Place name -> centroid of the restaurants located there: districts, wards
+    (scoped by district when numbered) and streets (alone and per district).
+    Lookups try the most specific exact key first, then a trie completion,
+    then a trigram-pruned fuzzy match, all in memory.
+    """
+
+    def __init__(self, rows):
+        start = time.perf_counter()
+        points = {}
+        for row in rows:
+            if row.get("latitude") is None or row.get("longitude") is None:
+                continue
+            for key, kind in self._keys_for(row.get("location")):
+                points.setdefault((key, kind), []).append((row["latitude"], row["longitude"]))
+
+        self.places = {}
+        for (key, kind), coords in points.items():
+            coords = np.asarray(coords)
+            lat, lon = np.median(coords, axis=0)
+            place = {"name": key, "kind": kind, "lat": float(lat), "lon": float(lon), "count": len(coords)}
+            current = self.places.get(key)
+            if current is None or (KIND_PRIORITY[kind], -place["count"]) < (KIND_PRIORITY[current["kind"]], -current["count"]):
+                self.places[key] = place
+
+        self.trie = PrefixTrie()
+        for key in self.places:
+            self.trie.add(key)
+        self.grams = _index_trigrams(self.places)
+        self.addresses = AddressMap(rows)
+
+        self.build_ms = round((time.perf_counter() - start) * 1000, 1)
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "exact": 0, "prefix": 0, "fuzzy": 0, "misses": 0}
+
+    @staticmethod
+    def _keys_for(location):
+        street, ward, district = parse_address(location)
+        if district:
+            yield district, "district"
+        if ward:
+            if district:
+                yield f"{ward} {district}", "ward"
+            # 'Phường 5' có ở nhiều quận: chỉ phường có tên mới đứng riêng được
+            if not ward.split()[-1].isdigit():
+                yield ward, "ward"
+                yield ward[len("phuong "):], "ward"
+        if street:
+            yield street, "street"
+            if district:
+                yield f"{street} {district}", "street"
+
+    def _candidate_keys(self, text):
+        street, ward, district = parse_address(text)
+        keys = []
+        if street and district:
+            keys.append(f"{street} {district}")
+        if ward and district:
+            keys.append(f"{ward} {district}")
+        keys.extend(k for k in (street, ward, district) if k)
+        return keys
+
+    def _prefix(self, key):
+        if len(key.split()) < PREFIX_MIN_TOKENS:
+            return None
+        # Chỉ hoàn thành từ cuối, không tự thêm từ mới ('phuong 5' -/-> 'phuong 5 tan binh')
+        # Số phải giữ nguyên: 'quan 1' không được hoàn thành thành 'quan 12'
+        size = len(key.split())
+        numbers = _house_numbers(key)
+        keys = [k for k in self.trie.complete(key) if len(k.split()) == size and _house_numbers(k) == numbers]
+        return max((self.places[k] for k in keys), key=lambda p: p["count"], default=None)
+
+    def _fuzzy(self, key):
+        # 'Quận 14' (không có trong dữ liệu) không được khớp sang 'quận 1'
+        numbers = _house_numbers(key)
+        best = fuzzy_match(key, self.grams, FUZZY_MIN_SCORE,
+                           accept=lambda candidate: _house_numbers(candidate) == numbers)
+        return self.places[best] if best else None
+
+    def _count(self, name):
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats[name] += 1
+
+    def lookup(self, text):
+        """
+        Best place for a user location as a dict (name, kind, lat, lon, count, match),
+        or None when nothing close enough is known locally.
+        """
+        keys = self._candidate_keys(text)
+        for key in keys:
+            if key in self.places:
+                self._count("exact")
+                return dict(self.places[key], match="exact")
+        for match, finder in (("prefix", self._prefix), ("fuzzy", self._fuzzy)):
+            for key in keys:
+                place = finder(key)
+                if place:
+                    self._count(match)
+                    return dict(place, match=match)
+        self._count("misses")
+        return None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        kinds = {}
+        for place in self.places.values():
+            kinds[place["kind"]] = kinds.get(place["kind"], 0) + 1
+        return dict(stats, places=kinds, build_ms=self.build_ms, addresses=self.addresses.stats())
+
+
+# --- 6. SHARED GAZETTEER ---
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def load_gazetteer(db_path=DB_PATH):
+    return Gazetteer(load_restaurant_rows(db_path))
+
+
+def get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = load_gazetteer()
+    return _gazetteer
+
+
+def reload_gazetteer():
+    """
+    Rebuild from the current catalogue (registered as a catalogue listener).
+    """
+    global _gazetteer
+    _gazetteer = load_gazetteer()
+
+
+def lookup_place(text):
+    return get_gazetteer().lookup(text)
+
+
+def lookup_address(text):
+    return get_gazetteer().addresses.lookup(text)
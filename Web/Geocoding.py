@@ -0,0 +1,99 @@
+import os
+import time
+
+from SearchIndex import tokenize
+from SqliteStore import SqliteStore, shared
+
+# --- 1. CONFIGURATION ---
+
+GEOCODE_DB_PATH = "data/geocode.sqlite"
+
+# Toạ độ tìm được giữ 30 ngày, địa chỉ không tìm thấy giữ 1 ngày
+GEOCODE_TTL = int(os.getenv("GEOCODE_TTL", str(30 * 24 * 3600)))
+GEOCODE_MISS_TTL = int(os.getenv("GEOCODE_MISS_TTL", str(24 * 3600)))
+# Bản sao nóng trong bộ nhớ trước SQLite
+GEOCODE_MEMORY_SIZE = int(os.getenv("GEOCODE_MEMORY_SIZE", "2048"))
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS geocode (
+        provider TEXT NOT NULL,
+        address_key TEXT NOT NULL,
+        address TEXT NOT NULL,
+        latitude REAL,
+        longitude REAL,
+        -- found = 0 remembers that the provider had no result
+        found INTEGER NOT NULL,
+        fetched_at REAL NOT NULL,
+        PRIMARY KEY (provider, address_key)
+    );
+"""
+
+
+def address_key(address):
+    """
+    'Quận 1' and ' quan 1 ' -> 'quan 1'.
+    """
+    return " ".join(tokenize(address or ""))
+
+
+# --- 2. CACHE ---
+
+class GeocodeCache(SqliteStore):
+    """
+    Geocoding results per (provider, normalized address): an in-process TTL/LRU
+    in front of a SQLite table, both remembering 'not found' as well.
+    """
+
+    SCHEMA = SCHEMA
+    TABLE = "geocode"
+    COUNTERS = dict(SqliteStore.COUNTERS, upstream_calls={}, upstream_errors={})
+
+    def __init__(self, db_path=GEOCODE_DB_PATH, ttl=GEOCODE_TTL, miss_ttl=GEOCODE_MISS_TTL,
+                 memory_size=GEOCODE_MEMORY_SIZE, clock=time.time):
+        super().__init__(db_path, ttl, miss_ttl, memory_size=memory_size, clock=clock)
+
+    def _read(self, key):
+        row = self.conn.execute(
+            "SELECT latitude, longitude, found, fetched_at FROM geocode WHERE provider = ? AND address_key = ?",
+            key
+        ).fetchone()
+        if row is None:
+            return None
+        expires_at = row[3] + (self.ttl if row[2] else self.miss_ttl)
+        if self.clock() >= expires_at:
+            return None
+        return ((row[0], row[1]) if row[2] else None), expires_at
+
+    def _write(self, conn, key, coords, address=None):
+        lat, lon = coords if coords else (None, None)
+        return conn.execute(
+            "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*key, address or key[1], lat, lon, int(bool(coords)), self.clock())
+        ).rowcount
+
+    def get(self, provider, address):
+        """
+        (found, coords): (True, (lat, lon)), (True, None) for a remembered miss,
+        (False, None) when the provider should be asked.
+        """
+        return super().get((provider, address_key(address)))
+
+    def put(self, provider, address, coords):
+        super().put((provider, address_key(address)), tuple(coords) if coords else None, address=address)
+
+    def resolve(self, provider, address, fetch):
+        """
+        Cached coordinates, calling fetch(address) only on a miss. fetch returns
+        (lat, lon) or None when the provider has no result, and raises on errors
+        (which are not cached). Returns (lat, lon) or None.
+        """
+        def lookup():
+            coords = fetch(address)
+            return tuple(coords) if coords else None
+
+        return super().resolve((provider, address_key(address)), lookup, label=provider, address=address)
+
+
+# --- 3. SHARED CACHE ---
+
+get_geocode_cache = shared(GeocodeCache)
@@ -0,0 +1,259 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- 1. CONFIGURATION ---
+
+# Pool kết nối dùng chung cho các API bên ngoài (Spoonacular, Geoapify, Goong...)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+# (connect, read) timeout mặc định, giây
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Thử lại lỗi tạm thời với backoff mũ có jitter: ngẫu nhiên trong [0, base * 2^lần thử]
+DEFAULT_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 2.0
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+# Tra cứu chỉ đọc (geocode...) gửi thêm một bản sao nếu bản đầu chậm hơn ngưỡng này
+HEDGE_AFTER = float(os.getenv("HTTP_HEDGE_AFTER", "1.0"))
+
+# Circuit breaker theo từng upstream: mở sau N lỗi liên tiếp, thử lại sau reset_timeout giây
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+_session = None
+_session_lock = threading.Lock()
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+# Pool riêng cho request dự phòng (hedge), không chiếm chỗ của pool chat
+_hedge_executor = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="hedge")
+
+
+class CircuitOpenError(Exception):
+    """
+    The upstream's breaker is open: the call was not attempted.
+    """
+
+
+def is_transient_error(error):
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+# --- 2. SHARED SESSION ---
+
+def get_session():
+    """
+    One requests.Session for the whole app, so keep-alive connections and TLS
+    sessions are reused instead of opening a new TCP connection per call.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+# --- 3. CIRCUIT BREAKER ---
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold consecutive failures; after reset_timeout
+    one trial call is let through (half_open) and its result closes or reopens it.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "short_circuited": 0}
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self.trial_running = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self.trial_running:
+                self.trial_running = True
+                return True
+            self._stats["short_circuited"] += 1
+            return False
+
+    def on_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.trial_running = False
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self._stats["opened"] += 1
+                self.state = "open"
+                self.opened_at = self.clock()
+                self.trial_running = False
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, state=self.state, failures=self.failures)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(upstream):
+    with _breakers_lock:
+        breaker = _breakers.get(upstream)
+        if breaker is None:
+            breaker = _breakers[upstream] = CircuitBreaker()
+        return breaker
+
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+# --- 4. RESILIENT CALLS ---
+
+def _record(label, seconds, error=False, retries=0, hedged=False, hedge_won=False):
+    with _metrics_lock:
+        m = _metrics.setdefault(label, {
+            "calls": 0, "errors": 0, "retries": 0, "hedged": 0, "hedge_wins": 0, "total_ms": 0.0, "max_ms": 0.0
+        })
+        m["calls"] += 1
+        m["errors"] += int(error)
+        m["retries"] += retries
+        m["hedged"] += int(hedged)
+        m["hedge_wins"] += int(hedge_won)
+        m["total_ms"] += seconds * 1000
+        m["max_ms"] = max(m["max_ms"], seconds * 1000)
+
+
+def _hedged(fn, hedge_after, info):
+    """
+    Run fn; if it has not finished after hedge_after seconds start a second copy
+    and return whichever succeeds first.
+    """
+    first = _hedge_executor.submit(fn)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+
+    info["hedged"] = True
+    second = _hedge_executor.submit(fn)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                info["hedge_won"] = future is second
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def call(upstream, fn, retries=DEFAULT_RETRIES, backoff=BACKOFF_BASE, hedge_after=None,
+         is_transient=is_transient_error, retry_result=None, label=None):
+    """
+    fn() guarded by the upstream's circuit breaker, retried with jittered exponential
+    backoff on transient errors (is_transient) or results (retry_result), optionally
+    hedged. Raises CircuitOpenError without calling fn while the breaker is open.
+    """
+    label = label or upstream
+    breaker = get_breaker(upstream)
+    if not breaker.allow():
+        _record(label, 0.0, error=True)
+        raise CircuitOpenError(f"{upstream} circuit is open")
+
+    start = time.perf_counter()
+    info = {"hedged": False, "hedge_won": False}
+    attempt = 0
+    while True:
+        try:
+            result = _hedged(fn, hedge_after, info) if hedge_after else fn()
+        except Exception as e:
+            if not is_transient(e):
+                # Upstream vẫn trả lời (lỗi 4xx, dữ liệu sai...): không tính là upstream hỏng
+                breaker.on_success()
+                _record(label, time.perf_counter() - start, True, attempt, info["hedged"], info["hedge_won"])
+                raise
+            breaker.on_failure()
+            if attempt >= retries or not breaker.allow():
+                _record(label, time.perf_counter() - start, True, attempt, info["hedged"], info["hedge_won"])
+                raise
+        else:
+            if retry_result is None or not retry_result(result):
+                breaker.on_success()
+                _record(label, time.perf_counter() - start, False, attempt, info["hedged"], info["hedge_won"])
+                return result
+            breaker.on_failure()
+            if attempt >= retries or not breaker.allow():
+                # Hết lượt thử: trả kết quả lỗi cuối cùng cho nơi gọi tự xử lý
+                _record(label, time.perf_counter() - start, True, attempt, info["hedged"], info["hedge_won"])
+                return result
+
+        time.sleep(random.uniform(0, min(BACKOFF_CAP, backoff * 2 ** attempt)))
+        attempt += 1
+
+
+def get(url, params=None, timeout=DEFAULT_TIMEOUT, label="http", retries=DEFAULT_RETRIES,
+        hedge_after=None, **kwargs):
+    """
+    GET through the shared session, always with a timeout, retried on connection
+    errors, timeouts and 429/5xx, with a circuit breaker per label.
+    """
+    return call(
+        label,
+        lambda: get_session().get(url, params=params, timeout=timeout, **kwargs),
+        retries=retries,
+        hedge_after=hedge_after,
+        retry_result=lambda response: response.status_code in TRANSIENT_STATUS
+    )
+
+
+def stats():
+    with _metrics_lock:
+        calls = {
+            label: dict(m, total_ms=round(m["total_ms"], 1), max_ms=round(m["max_ms"], 1),
+                        avg_ms=round(m["total_ms"] / m["calls"], 1))
+            for label, m in _metrics.items()
+        }
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {"calls": calls, "breakers": {name: b.stats() for name, b in breakers.items()}}
+
+
+def reset_stats():
+    with _metrics_lock:
+        _metrics.clear()
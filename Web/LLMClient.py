@@ -0,0 +1,250 @@
+import os
+import re
+import json
+import threading
+import time
+
+import google.generativeai as genai
+from google.api_core.exceptions import TooManyRequests, ServiceUnavailable, InternalServerError, DeadlineExceeded
+from dotenv import load_dotenv
+
+import HttpClient
+
+import LLMScheduler
+from LLMScheduler import get_scheduler, LLMBusyError, PRIORITY_INTERACTIVE, PRIORITY_IMAGE
+
+# --- 1. CONFIGURATION ---
+
+load_dotenv()
+GOOGLE_API = os.getenv("GOOGLE_API_KEY")
+
+if GOOGLE_API:
+    genai.configure(api_key=GOOGLE_API)
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Thời gian tối đa cho một lần gọi Gemini (giây); lỗi tạm thời được thử lại qua HttpClient.call
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+TRANSIENT_LLM_ERRORS = (ServiceUnavailable, InternalServerError, DeadlineExceeded)
+
+# Quét ảnh (món ăn, tiền) nhường chỗ cho chat khi hàng đợi đông
+LABEL_PRIORITY = {"food_image": PRIORITY_IMAGE, "money_scan": PRIORITY_IMAGE}
+
+_models = {}
+_models_lock = threading.Lock()
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+# --- 2. MODEL CACHE ---
+
+def _model_key(model_name, system, schema):
+    schema_key = json.dumps(schema, sort_keys=True) if schema is not None else None
+    return model_name, system, schema_key
+
+
+def get_model(model_name=DEFAULT_MODEL, system=None, schema=None):
+    """
+    Long-lived GenerativeModel for one (model, system prompt, schema).
+    The schema is converted once when the model is created, and the model keeps
+    its client (and the SDK's shared connection) between calls.
+    """
+    key = _model_key(model_name, system, schema)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            kwargs = {}
+            if system:
+                kwargs["system_instruction"] = system
+            if schema is not None:
+                kwargs["generation_config"] = {
+                    "response_mime_type": "application/json",
+                    "response_schema": schema
+                }
+            model = genai.GenerativeModel(model_name, **kwargs)
+            _models[key] = model
+    return model
+
+
+def clear_models():
+    with _models_lock:
+        _models.clear()
+
+
+def warm_up():
+    """
+    Open the SDK's shared generative client at startup so the first chat turn
+    does not pay for it.
+    """
+    if not GOOGLE_API:
+        return
+    try:
+        from google.generativeai import client
+        client.get_default_generative_client()
+    except Exception as e:
+        print(f"LLM warm-up error: {e}")
+
+
+# --- 3. CALLS & METRICS ---
+
+def _token_count(usage, field):
+    value = getattr(usage, field, 0) if usage is not None else 0
+    return value if isinstance(value, int) else 0
+
+
+def _record(label, seconds, response=None, error=False, first_chunk=None):
+    usage = getattr(response, "usage_metadata", None)
+    with _metrics_lock:
+        m = _metrics.setdefault(label, {
+            "calls": 0, "errors": 0, "total_seconds": 0.0, "last_ms": 0.0,
+            "prompt_tokens": 0, "output_tokens": 0, "streams": 0, "first_chunk_seconds": 0.0
+        })
+        m["calls"] += 1
+        m["errors"] += 1 if error else 0
+        m["total_seconds"] += seconds
+        m["last_ms"] = round(seconds * 1000, 1)
+        m["prompt_tokens"] += _token_count(usage, "prompt_token_count")
+        m["output_tokens"] += _token_count(usage, "candidates_token_count")
+        if first_chunk is not None:
+            m["streams"] += 1
+            m["first_chunk_seconds"] += first_chunk
+
+
+def _chunk_text(chunk):
+    try:
+        return chunk.text
+    except ValueError:
+        # Chunk cuối (finish_reason, usage) không có phần text
+        return ""
+
+
+def generate(contents, system=None, schema=None, model_name=DEFAULT_MODEL, label="gemini", on_text=None,
+             priority=None):
+    """
+    generate_content on the cached model for (model_name, system, schema),
+    recording latency and token usage under label.
+    With on_text the reply is streamed and each text chunk is passed to on_text as
+    it arrives; the returned response is the same, fully resolved one.
+    Calls go through the model's scheduler and the 'gemini' circuit breaker, with
+    transient errors retried; LLMBusyError is raised when the call cannot start in
+    time, Gemini answers 429 or the breaker is open.
+    """
+    model = get_model(model_name, system, schema)
+    scheduler = get_scheduler(model_name)
+    if priority is None:
+        priority = LABEL_PRIORITY.get(label, PRIORITY_INTERACTIVE)
+
+    emitted = []
+
+    def attempt():
+        first_chunk = None
+        if on_text is None:
+            return model.generate_content(contents, request_options={"timeout": LLM_TIMEOUT}), first_chunk
+        response = model.generate_content(contents, stream=True, request_options={"timeout": LLM_TIMEOUT})
+        for chunk in response:
+            text = _chunk_text(chunk)
+            if text:
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                emitted.append(True)
+                on_text(text)
+        return response, first_chunk
+
+    def is_transient(error):
+        # Đã gửi một phần câu trả lời cho người dùng thì không thể thử lại từ đầu
+        return not emitted and (isinstance(error, TRANSIENT_LLM_ERRORS) or HttpClient.is_transient_error(error))
+
+    with scheduler.slot(priority):
+        start = time.perf_counter()
+        try:
+            response, first_chunk = HttpClient.call("gemini", attempt, is_transient=is_transient, label=f"gemini:{label}")
+        except TooManyRequests as e:
+            _record(label, time.perf_counter() - start, error=True)
+            scheduler.throttle()
+            raise LLMBusyError(f"Gemini quota exceeded: {e}") from e
+        except HttpClient.CircuitOpenError as e:
+            _record(label, time.perf_counter() - start, error=True)
+            raise LLMBusyError(str(e)) from e
+        except Exception:
+            _record(label, time.perf_counter() - start, error=True)
+            raise
+    _record(label, time.perf_counter() - start, response, first_chunk=first_chunk)
+    return response
+
+
+class JsonFieldStream:
+    """
+    on_text adapter for structured replies: forwards the decoded value of one
+    top-level JSON string field (e.g. 'explanation') while the JSON is still streaming.
+    """
+
+    ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+    def __init__(self, field, on_text):
+        self.on_text = on_text
+        self.pattern = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self.buffer = ""
+        self.pos = None
+        self.done = False
+
+    def __call__(self, chunk):
+        if self.done:
+            return
+        self.buffer += chunk
+        if self.pos is None:
+            m = self.pattern.search(self.buffer)
+            if not m:
+                return
+            self.pos = m.end()
+
+        buf, i, out = self.buffer, self.pos, []
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            # Escape chưa nhận đủ thì chờ chunk sau
+            if i + 1 >= len(buf):
+                break
+            esc = buf[i + 1]
+            if esc != "u":
+                out.append(self.ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            size = 12 if buf[i + 2:i + 4].lower() in ("d8", "d9", "da", "db") else 6
+            if i + size > len(buf):
+                break
+            out.append(json.loads('"%s"' % buf[i:i + size]))
+            i += size
+        self.pos = i
+        if out:
+            self.on_text("".join(out))
+
+
+def stats():
+    with _metrics_lock:
+        calls = {
+            label: dict(
+                m,
+                total_seconds=round(m["total_seconds"], 3),
+                first_chunk_seconds=round(m["first_chunk_seconds"], 3),
+                avg_ms=round(m["total_seconds"] * 1000 / m["calls"], 1) if m["calls"] else 0.0,
+                avg_first_chunk_ms=round(m["first_chunk_seconds"] * 1000 / m["streams"], 1) if m["streams"] else 0.0
+            )
+            for label, m in _metrics.items()
+        }
+    return {"models": len(_models), "calls": calls, "schedulers": LLMScheduler.stats()}
+
+
+def reset_stats():
+    with _metrics_lock:
+        _metrics.clear()
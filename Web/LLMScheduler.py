@@ -0,0 +1,166 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --- 1. CONFIGURATION ---
+
+# Giới hạn cho mỗi model Gemini, chỉnh theo quota của project
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_RPM = float(os.getenv("LLM_RPM", "60"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+# Chờ trong hàng đợi quá lâu thì trả lỗi ngay (HTTP 429) thay vì dồn request
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "8"))
+
+# Số nhỏ chạy trước: chat tương tác trước quét ảnh
+PRIORITY_INTERACTIVE = 0
+PRIORITY_IMAGE = 1
+
+
+class LLMBusyError(Exception):
+    """
+    An LLM call could not start before its queue deadline, or the API answered
+    with a quota error. Endpoints turn it into HTTP 429.
+    """
+
+
+# --- 2. TOKEN BUCKET ---
+
+class TokenBucket:
+    """
+    rate tokens per second, at most capacity saved up for bursts.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        """
+        Take one token. Returns 0 on success, otherwise the seconds until one is available.
+        """
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def drain(self):
+        # API đã báo hết quota: dừng phát token cho tới khi nạp lại
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+# --- 3. SCHEDULER ---
+
+class ModelScheduler:
+    """
+    Admission control for one model: at most max_concurrency calls in flight,
+    starts paced by a token bucket, waiting callers served by (priority, arrival).
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, rpm=LLM_RPM, burst=LLM_BURST,
+                 queue_timeout=LLM_QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.bucket = TokenBucket(rpm / 60.0, burst)
+        self.in_flight = 0
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stats = {"admitted": 0, "rejected": 0, "throttled": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+
+    def _remove(self, entry):
+        self._queue.remove(entry)
+        heapq.heapify(self._queue)
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_INTERACTIVE, timeout=None):
+        timeout = self.queue_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        entry = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            while True:
+                wait = None
+                if self._queue[0] == entry and self.in_flight < self.max_concurrency:
+                    wait = self.bucket.try_take()
+                    if wait == 0:
+                        break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._remove(entry)
+                    self._stats["rejected"] += 1
+                    self._cond.notify_all()
+                    raise LLMBusyError(f"LLM queue wait exceeded {timeout:.1f}s")
+                self._cond.wait(min(remaining, wait) if wait else remaining)
+
+            heapq.heappop(self._queue)
+            self.in_flight += 1
+            waited = (time.monotonic() - start) * 1000
+            self._stats["admitted"] += 1
+            self._stats["total_wait_ms"] += waited
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], waited)
+            # Người kế tiếp trong hàng có thể đã đủ điều kiện
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def throttle(self):
+        with self._cond:
+            self._stats["throttled"] += 1
+            self.bucket.drain()
+
+    def stats(self):
+        with self._cond:
+            admitted = self._stats["admitted"]
+            return dict(
+                self._stats,
+                total_wait_ms=round(self._stats["total_wait_ms"], 1),
+                max_wait_ms=round(self._stats["max_wait_ms"], 1),
+                avg_wait_ms=round(self._stats["total_wait_ms"] / admitted, 1) if admitted else 0.0,
+                queued=len(self._queue),
+                in_flight=self.in_flight
+            )
+
+
+# --- 4. SHARED SCHEDULERS ---
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model_name):
+    with _schedulers_lock:
+        scheduler = _schedulers.get(model_name)
+        if scheduler is None:
+            scheduler = _schedulers[model_name] = ModelScheduler()
+        return scheduler
+
+
+def reset_schedulers():
+    with _schedulers_lock:
+        _schedulers.clear()
+
+
+def stats():
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    return {name: s.stats() for name, s in schedulers.items()}
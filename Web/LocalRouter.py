@@ -0,0 +1,263 @@
+import heapq
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from RestaurantIndex import haversine_np
+
+# --- 1. CONFIGURATION ---
+
+# Đồ thị đường TP.HCM trích từ OpenStreetMap (không kèm trong repo, tạo bằng RoadGraphBuilder.py)
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH", "data/hcm_road_graph.npz")
+
+# Điểm đi/đến cách nút đường gần nhất quá xa thì coi như nằm ngoài đồ thị
+MAX_SNAP_KM = float(os.getenv("ROUTE_MAX_SNAP_KM", "1.0"))
+
+METERS_PER_DEGREE = 111320
+
+
+class LocalRouteError(Exception):
+    """
+    The local graph is missing, a point is off the graph, or no path connects them.
+    """
+
+
+# --- 2. ROAD GRAPH ---
+
+class RoadGraph:
+    """
+    Directed road graph in CSR form: the edges leaving node u are
+    indices[indptr[u]:indptr[u + 1]], with their length in metres and travel
+    time in seconds at the same positions. Node coordinates are plain arrays.
+    """
+
+    def __init__(self, lat, lon, indptr, indices, length_m, time_s):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.length_m = np.asarray(length_m, dtype=np.float32)
+        self.time_s = np.asarray(time_s, dtype=np.float32)
+
+        # Tốc độ lớn nhất trên đồ thị giữ cho heuristic A* không đánh giá quá cao
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speeds = self.length_m / self.time_s
+        speeds = speeds[np.isfinite(speeds)]
+        self.max_speed = float(speeds.max()) if len(speeds) else 1.0
+
+        # Vòng lặp A* chạy trên list Python (đọc phần tử numpy từng cái một chậm hơn nhiều)
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._time = self.time_s.tolist()
+        self._length = self.length_m.tolist()
+        # Toạ độ phẳng (mét) quanh vĩ độ trung bình cho heuristic
+        scale = METERS_PER_DEGREE * math.cos(math.radians(float(self.lat.mean()))) if len(self.lat) else 0
+        self._x = (self.lon * scale).tolist()
+        self._y = (self.lat * METERS_PER_DEGREE).tolist()
+
+    @classmethod
+    def from_edges(cls, lat, lon, edges):
+        """
+        Build from (u, v, length_m, time_s) tuples; add both directions for two-way roads.
+        """
+        edges = sorted(edges)
+        indptr = np.zeros(len(lat) + 1, dtype=np.int64)
+        for u, _, _, _ in edges:
+            indptr[u + 1] += 1
+        return cls(lat, lon, np.cumsum(indptr),
+                   [e[1] for e in edges], [e[2] for e in edges], [e[3] for e in edges])
+
+    @classmethod
+    def load(cls, path=ROAD_GRAPH_PATH):
+        if not os.path.exists(path):
+            raise LocalRouteError(f"Road graph not found: {path}")
+        data = np.load(path)
+        return cls(data["lat"], data["lon"], data["indptr"], data["indices"], data["length_m"], data["time_s"])
+
+    def save(self, path):
+        np.savez_compressed(path, lat=self.lat, lon=self.lon, indptr=self.indptr, indices=self.indices,
+                            length_m=self.length_m, time_s=self.time_s)
+
+    @property
+    def node_count(self):
+        return len(self.lat)
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    def nearest_node(self, lat, lon, max_km=MAX_SNAP_KM):
+        if not self.node_count:
+            raise LocalRouteError("Road graph is empty")
+        dist = haversine_np(lat, lon, self.lat, self.lon)
+        node = int(np.argmin(dist))
+        if dist[node] > max_km:
+            raise LocalRouteError(f"({lat}, {lon}) is {dist[node]:.1f} km from the road graph")
+        return node
+
+    def _heuristic(self, node, target):
+        return math.hypot(self._x[node] - self._x[target], self._y[node] - self._y[target]) / self.max_speed
+
+    def shortest_path(self, source, target):
+        """
+        A* on travel time. Returns (nodes, seconds, metres, settled node count).
+        """
+        indptr, indices, times, lengths = self._indptr, self._indices, self._time, self._length
+        best = {source: 0.0}
+        meters = {source: 0.0}
+        parent = {source: -1}
+        heap = [(self._heuristic(source, target), 0.0, source)]
+        settled = 0
+
+        while heap:
+            _, cost, u = heapq.heappop(heap)
+            if cost > best[u]:
+                continue
+            settled += 1
+            if u == target:
+                path = []
+                while u != -1:
+                    path.append(u)
+                    u = parent[u]
+                return path[::-1], cost, meters[target], settled
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                new_cost = cost + times[i]
+                if new_cost < best.get(v, math.inf):
+                    best[v] = new_cost
+                    meters[v] = meters[u] + lengths[i]
+                    parent[v] = u
+                    heapq.heappush(heap, (new_cost + self._heuristic(v, target), new_cost, v))
+
+        raise LocalRouteError("No road path between the two points")
+
+    def travel_from(self, source, targets):
+        """
+        One Dijkstra from source, stopped once every target is settled.
+        Returns {target: (seconds, metres)}; unreachable targets are left out.
+        """
+        indptr, indices, times, lengths = self._indptr, self._indices, self._time, self._length
+        remaining = set(targets)
+        best = {source: 0.0}
+        meters = {source: 0.0}
+        heap = [(0.0, source)]
+        found = {}
+
+        while heap and remaining:
+            cost, u = heapq.heappop(heap)
+            if cost > best[u]:
+                continue
+            if u in remaining:
+                remaining.discard(u)
+                found[u] = (cost, meters[u])
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                new_cost = cost + times[i]
+                if new_cost < best.get(v, math.inf):
+                    best[v] = new_cost
+                    meters[v] = meters[u] + lengths[i]
+                    heapq.heappush(heap, (new_cost, v))
+        return found
+
+
+# --- 3. ROUTER ---
+
+class LocalRouter:
+    """
+    Routes on a RoadGraph in-process, answering in the same GeoJSON geometry
+    shape as ORS directions.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._lock = threading.Lock()
+        self._stats = {"routes": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "settled": 0}
+
+    def _record(self, seconds, settled=0, error=False):
+        with self._lock:
+            self._stats["routes"] += 1
+            self._stats["errors"] += int(error)
+            self._stats["settled"] += settled
+            self._stats["total_ms"] += seconds * 1000
+            self._stats["max_ms"] = max(self._stats["max_ms"], seconds * 1000)
+
+    def route(self, user_lat, user_lon, dest_lat, dest_lon):
+        """
+        {"geometry": GeoJSON LineString, "distance_m", "duration_s"} between two points.
+        """
+        start = time.perf_counter()
+        try:
+            source = self.graph.nearest_node(user_lat, user_lon)
+            target = self.graph.nearest_node(dest_lat, dest_lon)
+            nodes, seconds, meters, settled = self.graph.shortest_path(source, target)
+        except LocalRouteError:
+            self._record(time.perf_counter() - start, error=True)
+            raise
+
+        self._record(time.perf_counter() - start, settled)
+        coordinates = [[float(self.graph.lon[n]), float(self.graph.lat[n])] for n in nodes]
+        return {
+            "geometry": {"type": "LineString", "coordinates": coordinates},
+            "distance_m": round(meters, 1),
+            "duration_s": round(seconds, 1)
+        }
+
+    def matrix(self, lat, lon, destinations):
+        """
+        [{"duration_s", "distance_m"} or None] from one origin to every (lat, lon)
+        in destinations, from a single graph search.
+        """
+        start = time.perf_counter()
+        try:
+            source = self.graph.nearest_node(lat, lon)
+        except LocalRouteError:
+            self._record(time.perf_counter() - start, error=True)
+            raise
+
+        targets = []
+        for dest_lat, dest_lon in destinations:
+            try:
+                targets.append(self.graph.nearest_node(dest_lat, dest_lon))
+            except LocalRouteError:
+                targets.append(None)
+
+        found = self.graph.travel_from(source, {t for t in targets if t is not None})
+        self._record(time.perf_counter() - start)
+        return [
+            {"duration_s": round(found[t][0], 1), "distance_m": round(found[t][1], 1)} if t in found else None
+            for t in targets
+        ]
+
+    def stats(self):
+        with self._lock:
+            routes = self._stats["routes"]
+            return dict(self._stats, total_ms=round(self._stats["total_ms"], 1),
+                        max_ms=round(self._stats["max_ms"], 1),
+                        avg_ms=round(self._stats["total_ms"] / routes, 1) if routes else 0.0,
+                        nodes=self.graph.node_count, edges=self.graph.edge_count)
+
+
+# --- 4. SHARED ROUTER ---
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_local_router():
+    """
+    Load the road graph on first use. Raises LocalRouteError if the file is missing.
+    """
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LocalRouter(RoadGraph.load())
+    return _router
+
+
+def stats():
+    # Không tự nạp đồ thị chỉ để báo số liệu
+    return _router.stats() if _router is not None else {"loaded": False, "path": ROAD_GRAPH_PATH}
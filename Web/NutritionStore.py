@@ -0,0 +1,127 @@
+import json
+import math
+import os
+import time
+
+from SearchIndex import tokenize
+from SqliteStore import SqliteStore, shared
+
+# --- 1. CONFIGURATION ---
+
+NUTRITION_DB_PATH = "data/nutrition.sqlite"
+NUTRITION_SEED_PATH = "data/nutrition_seed.json"
+
+# Kết quả từ Spoonacular được làm mới sau 30 ngày, món không tìm thấy sau 1 ngày
+NUTRITION_TTL = int(os.getenv("NUTRITION_TTL", str(30 * 24 * 3600)))
+NUTRITION_MISS_TTL = int(os.getenv("NUTRITION_MISS_TTL", str(24 * 3600)))
+
+FIELDS = ("Calories", "Protein", "Fat")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS nutrition (
+        dish_key TEXT PRIMARY KEY,
+        dish_name TEXT NOT NULL,
+        calories TEXT,
+        protein TEXT,
+        fat TEXT,
+        -- 'seed' rows never expire; found = 0 remembers a Spoonacular miss
+        source TEXT NOT NULL,
+        found INTEGER NOT NULL,
+        fetched_at REAL NOT NULL
+    );
+"""
+
+
+def dish_key(name):
+    """
+    'Phở Bò' and 'pho bo!' -> 'pho bo'.
+    """
+    return " ".join(tokenize(name or ""))
+
+
+# --- 2. STORE ---
+
+class NutritionStore(SqliteStore):
+    """
+    Nutrition per dish in SQLite, keyed by the normalized dish name.
+    Seeded from the bundled table; Spoonacular answers and misses are added with a TTL.
+    """
+
+    SCHEMA = SCHEMA
+    TABLE = "nutrition"
+    COUNTERS = dict(SqliteStore.COUNTERS, seed=0, expired=0)
+
+    def __init__(self, db_path=NUTRITION_DB_PATH, seed_path=NUTRITION_SEED_PATH,
+                 ttl=NUTRITION_TTL, miss_ttl=NUTRITION_MISS_TTL, clock=time.time):
+        super().__init__(db_path, ttl, miss_ttl, clock=clock)
+        if seed_path and os.path.exists(seed_path):
+            self.load_seed(seed_path)
+
+    def load_seed(self, seed_path):
+        with open(seed_path, encoding="utf-8") as f:
+            dishes = json.load(f)["dishes"]
+        now = self.clock()
+        with self.conn as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO nutrition VALUES (?, ?, ?, ?, ?, 'seed', 1, ?)",
+                [(dish_key(name), name, n["Calories"], n["Protein"], n["Fat"], now)
+                 for name, n in dishes.items()]
+            )
+        self.clear_memory()
+        return len(dishes)
+
+    def _read(self, key):
+        row = self.conn.execute(
+            "SELECT calories, protein, fat, source, found, fetched_at FROM nutrition WHERE dish_key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        calories, protein, fat, source, found, fetched_at = row
+        nutrition = dict(zip(FIELDS, (calories, protein, fat))) if found else None
+        if source == "seed":
+            self._count("seed")
+            return nutrition, math.inf
+
+        expires_at = fetched_at + (self.ttl if found else self.miss_ttl)
+        if self.clock() >= expires_at:
+            self._count("expired")
+            return None
+        return nutrition, expires_at
+
+    def _write(self, conn, key, nutrition, name=None, source="spoonacular"):
+        values = [nutrition.get(f) for f in FIELDS] if nutrition else [None, None, None]
+        return conn.execute(
+            """
+            INSERT INTO nutrition VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (dish_key) DO UPDATE SET
+                dish_name = excluded.dish_name, calories = excluded.calories,
+                protein = excluded.protein, fat = excluded.fat, source = excluded.source,
+                found = excluded.found, fetched_at = excluded.fetched_at
+            WHERE nutrition.source != 'seed'
+            """,
+            (key, name or key, *values, source, int(bool(nutrition)), self.clock())
+        ).rowcount
+
+    def get(self, name):
+        """
+        (found, nutrition): (True, {...}) for a known dish, (True, {}) for a remembered
+        miss, (False, None) when Spoonacular should be asked.
+        """
+        found, nutrition = super().get(dish_key(name))
+        if not found:
+            return False, None
+        return True, dict(nutrition) if nutrition else {}
+
+    def put(self, name, nutrition, source="spoonacular"):
+        """
+        Remember a lookup; an empty/None nutrition is stored as a miss.
+        Seed rows are never overwritten by the API.
+        """
+        super().put(dish_key(name), nutrition or None, name=name, source=source)
+
+
+# --- 3. SHARED STORE ---
+
+get_nutrition_store = shared(NutritionStore)
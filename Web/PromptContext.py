@@ -0,0 +1,93 @@
+import math
+import os
+
+# --- 1. CONFIGURATION ---
+
+# Ước lượng token của bảng nhà hàng gửi cho Gemini (không gọi count_tokens qua mạng).
+# Tiếng Việt có dấu tốn token hơn tiếng Anh nên lấy ~3 ký tự / token.
+CHARS_PER_TOKEN = 3
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+MIN_CONTEXT_ROWS = 5
+MAX_CONTEXT_ROWS = int(os.getenv("MAX_CONTEXT_ROWS", "40"))
+MAX_TAGS = 3
+
+HEADER = "id|name|address|rating|price|hours|km|tags"
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _cell(value):
+    return " ".join(str(value if value is not None else "").replace("|", "/").split())
+
+
+def _short_address(location):
+    """
+    '28 Phan Phú Tiên, P. 10, Quận 5, TP. HCM' -> '28 Phan Phú Tiên, P. 10, Quận 5'.
+    """
+    parts = [p.strip() for p in str(location or "").split(",")]
+    if parts and parts[-1].lower().replace(" ", "") in ("tp.hcm", "hcm", "hochiminh"):
+        parts = parts[:-1]
+    return ", ".join(parts)
+
+
+def format_row(row):
+    tags = ", ".join(t.strip() for t in str(row.get("tags") or "").split(",")[:MAX_TAGS])
+    return "|".join(_cell(v) for v in (
+        row.get("id"),
+        row.get("name"),
+        _short_address(row.get("location")),
+        row.get("rating"),
+        row.get("price_range"),
+        row.get("opening_hours"),
+        round(float(row.get("distance_km") or 0), 1),
+        tags
+    ))
+
+
+# --- 2. CONTEXT BUILDER ---
+
+def build_restaurant_context(rows, token_budget=CONTEXT_TOKEN_BUDGET, max_rows=MAX_CONTEXT_ROWS):
+    """
+    Compact table of the best ranked rows for the prompt: only the columns the model
+    reads, one line per restaurant, as many rows as fit in token_budget
+    (at least MIN_CONTEXT_ROWS, at most max_rows). Returns (text, used_rows).
+    """
+    lines = [HEADER]
+    used = []
+    tokens = estimate_tokens(HEADER)
+    for row in rows[:max_rows]:
+        line = format_row(row)
+        cost = estimate_tokens(line) + 1
+        if tokens + cost > token_budget and len(used) >= MIN_CONTEXT_ROWS:
+            break
+        lines.append(line)
+        used.append(row)
+        tokens += cost
+    return "\n".join(lines), used
+
+
+def hydrate_recommendations(recommendations, rows):
+    """
+    Fill the display fields of the model's picks from the catalogue by id, so
+    image paths and addresses never have to round-trip through the prompt.
+    """
+    by_id = {row.get("id"): row for row in rows}
+    for rec in recommendations:
+        try:
+            row = by_id.get(int(rec.get("id")))
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            continue
+        rec["id"] = row["id"]
+        rec["Name"] = row.get("name")
+        rec["Address"] = row.get("location")
+        rec["Rating"] = row.get("rating")
+        rec["Budget"] = row.get("price_range")
+        rec["OpeningHour"] = row.get("opening_hours")
+        rec["Tags"] = row.get("tags")
+        rec["distance_km"] = round(float(row.get("distance_km") or 0), 2)
+        rec["img"] = row.get("local_image_path") or ""
+    return recommendations
@@ -0,0 +1,263 @@
+import math
+import threading
+
+import numpy as np
+
+from CatalogueETL import parse_opening_hours
+from FoodLoading import load_restaurant_rows, load_opening_hours
+from SearchIndex import InvertedIndex, HoursIndex, fold_text
+
+# --- 1. CONFIGURATION ---
+
+DB_PATH = "data/foody_data.sqlite"
+
+# Grid cell size in degrees (0.02° ≈ 2.2 km at Ho Chi Minh City latitude)
+CELL_DEG = 0.02
+
+EARTH_RADIUS_KM = 6371
+
+# Number of name filters whose row masks are kept per index
+NAME_MASK_CACHE_SIZE = 256
+
+# Ranking key is -rating * RANK_SCALE + distance_km, so the scale must exceed any distance
+RANK_SCALE = 1e6
+
+
+# --- 2. HELPER FUNCTIONS ---
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * math.asin(math.sqrt(a))
+
+
+def haversine_np(lat, lon, lats, lons):
+    """
+    Distance in km from one point to every point of the lats/lons arrays.
+    """
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+
+def top_k_by_rating(rating, dist, pos, k):
+    """
+    Indices into rating/dist/pos ordered by (-rating, dist, pos), cut to k.
+    argpartition selects the k best without sorting the whole candidate set;
+    ties on the k-th key are broken by pos so the result equals a stable full sort.
+    """
+    n = len(pos)
+    if k is None or k >= n:
+        return np.lexsort((pos, dist, -rating))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    key = -rating * RANK_SCALE + dist
+    kth = key[np.argpartition(key, k - 1)[k - 1]]
+
+    better = np.flatnonzero(key < kth)
+    ties = np.flatnonzero(key == kth)
+    ties = ties[np.argsort(pos[ties], kind="stable")][:k - len(better)]
+
+    chosen = np.concatenate([better, ties])
+    return chosen[np.lexsort((pos[chosen], dist[chosen], -rating[chosen]))]
+
+
+# --- 3. COLUMNAR STORE ---
+
+class RestaurantArrays:
+    """
+    Array-backed copy of the catalogue: latitude, longitude, rating, opening
+    hours and an inverted index from accent-folded name tokens to row positions.
+    """
+
+    def __init__(self, rows, opening_hours=None):
+        n = len(rows)
+        self.size = n
+        self.lat = np.full(n, np.nan)
+        self.lon = np.full(n, np.nan)
+        self.rating = np.zeros(n)
+        self.name_index = InvertedIndex()
+
+        for pos, row in enumerate(rows):
+            if row.get('latitude') is not None and row.get('longitude') is not None:
+                self.lat[pos] = row['latitude']
+                self.lon[pos] = row['longitude']
+            self.rating[pos] = row.get('rating') or 0.0
+            self.name_index.add(pos, row['name'])
+
+        if opening_hours is None:
+            self.hours_index = HoursIndex([parse_opening_hours(row.get('opening_hours')) for row in rows])
+        else:
+            self.hours_index = HoursIndex([opening_hours.get(row.get('id')) for row in rows])
+
+        self._name_masks = {}
+
+    def match_name(self, term):
+        """
+        Boolean mask of rows whose name matches every word of term
+        ('pho' matches 'Phở', prefixes allowed).
+        """
+        key = fold_text(term).strip()
+        mask = self._name_masks.get(key)
+        if mask is not None:
+            return mask
+
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.name_index.search(key)] = True
+
+        if len(self._name_masks) >= NAME_MASK_CACHE_SIZE:
+            self._name_masks.clear()
+        self._name_masks[key] = mask
+        return mask
+
+    def open_at(self, minute):
+        """
+        Boolean mask of rows open at minute of day (unknown hours count as open).
+        """
+        return self.hours_index.open_at(minute)
+
+
+# --- 4. SPATIAL GRID ---
+
+class RestaurantIndex:
+    """
+    In-process grid over restaurant coordinates.
+    Each row is bucketed once into a (lat, lon) cell so a radius lookup only
+    visits the cells overlapping the search circle instead of the whole table.
+    """
+
+    def __init__(self, rows, cell_deg=CELL_DEG, opening_hours=None):
+        self.rows = rows
+        self.by_id = {row['id']: row for row in rows}
+        self.cell_deg = cell_deg
+        self.arrays = RestaurantArrays(rows, opening_hours)
+
+        cells = {}
+        for pos, row in enumerate(rows):
+            if row.get('latitude') is None or row.get('longitude') is None:
+                continue
+            cells.setdefault(self._cell(row['latitude'], row['longitude']), []).append(pos)
+        self.cells = {cell: np.array(bucket, dtype=np.intp) for cell, bucket in cells.items()}
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def candidates(self, lat, lon, radius_km):
+        """
+        Positions of rows in every cell touched by the circle's bounding box.
+        """
+        lat_change = radius_km / 111.0
+        lon_change = radius_km / (111.0 * max(math.cos(math.radians(lat)), 1e-6))
+        min_x, min_y = self._cell(lat - lat_change, lon - lon_change)
+        max_x, max_y = self._cell(lat + lat_change, lon + lon_change)
+
+        buckets = []
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                bucket = self.cells.get((x, y))
+                if bucket is not None:
+                    buckets.append(bucket)
+
+        if not buckets:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(buckets))
+
+    def _within(self, lat, lon, radius_km, mask=None):
+        """
+        (positions, rounded distances) of rows inside the radius,
+        optionally restricted by a boolean row mask.
+        """
+        cand = self.candidates(lat, lon, radius_km)
+        if mask is not None:
+            cand = cand[mask[cand]]
+
+        dist = haversine_np(lat, lon, self.arrays.lat[cand], self.arrays.lon[cand])
+        inside = dist <= radius_km
+        return cand[inside], np.round(dist[inside], 2)
+
+    def _materialize(self, positions, dist):
+        return [dict(self.rows[pos], distance_km=float(d)) for pos, d in zip(positions.tolist(), dist.tolist())]
+
+    def nearest(self, lat, lon, radius_km=10, k=None):
+        """
+        Restaurants within radius_km of (lat, lon), nearest first.
+        Each result is a copy of the row with an extra 'distance_km' field.
+        """
+        pos, dist = self._within(lat, lon, radius_km)
+        order = np.lexsort((pos, dist))
+        if k is not None:
+            order = order[:k]
+        return self._materialize(pos[order], dist[order])
+
+    def rank(self, lat=None, lon=None, radius_km=10, k=None, name_term=None, open_at=None):
+        """
+        Top-k restaurants ordered by (-rating, distance_km), optionally limited
+        to names matching name_term and to places open at minute of day open_at.
+        Without a location every row is a candidate and distance_km is 0.
+        """
+        mask = self.arrays.match_name(name_term) if name_term else None
+        if open_at is not None:
+            is_open = self.arrays.open_at(open_at)
+            mask = is_open if mask is None else mask & is_open
+
+        if lat is not None and lon is not None:
+            pos, dist = self._within(lat, lon, radius_km, mask)
+        else:
+            pos = np.flatnonzero(mask) if mask is not None else np.arange(len(self.rows))
+            dist = np.zeros(len(pos))
+
+        order = top_k_by_rating(self.arrays.rating[pos], dist, pos, k)
+        return self._materialize(pos[order], dist[order])
+
+
+# --- 5. SHARED INDEX ---
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def load_restaurant_index(db_path=DB_PATH):
+    return RestaurantIndex(load_restaurant_rows(db_path), opening_hours=load_opening_hours(db_path))
+
+
+def get_restaurant_index():
+    """
+    Build the shared index on first use and reuse it for every chat turn.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_restaurant_index()
+    return _index
+
+
+def reload_restaurant_index():
+    """
+    Rebuild the shared index from the current database and swap it in.
+    Calls already running keep using the index they started with.
+    """
+    global _index
+    _index = load_restaurant_index()
+
+
+def nearest_restaurants(lat, lon, radius_km=10, k=None):
+    return get_restaurant_index().nearest(lat, lon, radius_km, k)
+
+
+def rank_restaurants(lat=None, lon=None, radius_km=10, k=None, name_term=None, open_at=None):
+    return get_restaurant_index().rank(lat, lon, radius_km, k, name_term, open_at)
+
+
+def restaurants_by_ids(ids):
+    """
+    Rows for a batch of restaurant ids in the same order, None where the id is unknown.
+    """
+    by_id = get_restaurant_index().by_id
+    return [by_id.get(i) for i in ids]
+
+
+def all_restaurants():
+    return [dict(row, distance_km=0) for row in get_restaurant_index().rows]
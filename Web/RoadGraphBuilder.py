@@ -0,0 +1,142 @@
+import bz2
+import gzip
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+from LocalRouter import RoadGraph, ROAD_GRAPH_PATH
+from RestaurantIndex import haversine_km
+
+# --- 1. CONFIGURATION ---
+
+# Tốc độ trung bình (km/h) theo loại đường OSM khi way không có maxspeed.
+# Thấp hơn tốc độ cho phép vì giờ cao điểm ở TP.HCM; loại không có trong bảng bị bỏ qua.
+HIGHWAY_SPEED_KMH = {
+    "motorway": 60, "motorway_link": 40,
+    "trunk": 40, "trunk_link": 30,
+    "primary": 30, "primary_link": 25,
+    "secondary": 25, "secondary_link": 20,
+    "tertiary": 22, "tertiary_link": 20,
+    "unclassified": 18, "residential": 15,
+    "living_street": 10, "service": 10,
+}
+
+ONEWAY_FORWARD = {"yes", "true", "1"}
+ONEWAY_REVERSE = {"-1", "reverse"}
+
+# Lệnh tải dữ liệu gợi ý (Overpass API, khung bao quanh TP.HCM):
+#   curl -o data/hcm_roads.osm 'https://overpass-api.de/api/interpreter?data=[out:xml][timeout:300];(way["highway"](10.35,106.35,11.20,107.05);>;);out;'
+# Hoặc cắt từ bản Geofabrik bằng osmium, rồi: python RoadGraphBuilder.py data/hcm_roads.osm
+
+
+def _open(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def way_speed_kmh(tags):
+    """
+    Speed for a highway way: its numeric maxspeed (capped by the road class), else the class default.
+    None for ways cars cannot use.
+    """
+    default = HIGHWAY_SPEED_KMH.get(tags.get("highway"))
+    if default is None or tags.get("access") in ("no", "private") or tags.get("motor_vehicle") == "no":
+        return None
+    maxspeed = tags.get("maxspeed", "").split()[0] if tags.get("maxspeed") else ""
+    if maxspeed.isdigit():
+        return min(int(maxspeed), default * 2)
+    return default
+
+
+def way_direction(tags):
+    """
+    (forward, backward) travel allowed along the way's node order.
+    """
+    oneway = tags.get("oneway", "").lower()
+    if oneway in ONEWAY_REVERSE:
+        return False, True
+    if oneway in ONEWAY_FORWARD or (oneway != "no" and tags.get("junction") in ("roundabout", "circular")):
+        return True, False
+    if oneway != "no" and tags.get("highway") in ("motorway", "motorway_link"):
+        return True, False
+    return True, True
+
+
+# --- 2. BUILD ---
+
+def parse_osm(path):
+    """
+    (node coordinates {osm id: (lat, lon)}, [(speed km/h, forward, backward, [osm node ids])])
+    for the drivable highway ways of an OSM XML extract (.osm, .osm.bz2 or .osm.gz).
+    """
+    coords = {}
+    ways = []
+    with _open(path) as f:
+        for _, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag == "node":
+                coords[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+            elif elem.tag == "way":
+                tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+                speed = way_speed_kmh(tags)
+                refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                if speed is not None and len(refs) > 1:
+                    ways.append((speed, *way_direction(tags), refs))
+            elif elem.tag == "relation":
+                break
+            else:
+                continue
+            # Nút/way đã xử lý thì giải phóng, file OSM của cả thành phố khá lớn
+            elem.clear()
+    return coords, ways
+
+
+def build_road_graph(osm_path):
+    """
+    RoadGraph of the drivable roads in an OSM XML extract, keeping only nodes used by them.
+    """
+    coords, ways = parse_osm(osm_path)
+    index = {}
+    lat, lon, edges = [], [], []
+
+    def node(osm_id):
+        if osm_id not in index:
+            index[osm_id] = len(lat)
+            lat.append(coords[osm_id][0])
+            lon.append(coords[osm_id][1])
+        return index[osm_id]
+
+    for speed, forward, backward, refs in ways:
+        # Way bị cắt ở rìa vùng tải có thể tham chiếu nút nằm ngoài file
+        refs = [ref for ref in refs if ref in coords]
+        meters_per_second = speed / 3.6
+        for a, b in zip(refs, refs[1:]):
+            u, v = node(a), node(b)
+            length_m = haversine_km(lat[u], lon[u], lat[v], lon[v]) * 1000
+            time_s = length_m / meters_per_second
+            if forward:
+                edges.append((u, v, length_m, time_s))
+            if backward:
+                edges.append((v, u, length_m, time_s))
+
+    return RoadGraph.from_edges(lat, lon, edges)
+
+
+def main(argv):
+    if not argv or len(argv) > 2:
+        print("Usage: python RoadGraphBuilder.py <extract.osm[.bz2|.gz]> [output.npz]")
+        return 1
+    out_path = argv[1] if len(argv) > 1 else ROAD_GRAPH_PATH
+    graph = build_road_graph(argv[0])
+    folder = os.path.dirname(out_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    graph.save(out_path)
+    print(f"{graph.node_count} nodes, {graph.edge_count} edges -> {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,169 @@
+import json
+import math
+import os
+import threading
+import time
+
+from Cache import TTLCache
+from SqliteStore import SqliteStore, shared
+
+# --- 1. CONFIGURATION ---
+
+ROUTE_DB_PATH = "data/routes.sqlite"
+
+# Điểm đi/đến được làm tròn vào ô lưới cạnh ~50 m: hai người đứng gần nhau dùng chung tuyến
+ROUTE_SNAP_METERS = float(os.getenv("ROUTE_SNAP_METERS", "50"))
+ROUTE_TTL = int(os.getenv("ROUTE_TTL", str(7 * 24 * 3600)))
+ROUTE_MEMORY_SIZE = int(os.getenv("ROUTE_MEMORY_SIZE", "512"))
+# Giới hạn số tuyến giữ trên đĩa, xóa tuyến cũ nhất khi vượt
+ROUTE_DB_MAX_ROWS = int(os.getenv("ROUTE_DB_MAX_ROWS", "20000"))
+
+# Ma trận thời gian di chuyển: nhớ kết quả theo từng điểm xuất phát (đã làm tròn ô lưới)
+MATRIX_TTL = int(os.getenv("MATRIX_TTL", "3600"))
+MATRIX_ORIGIN_CACHE_SIZE = int(os.getenv("MATRIX_ORIGIN_CACHE_SIZE", "256"))
+
+METERS_PER_DEGREE = 111320
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS routes (
+        route_key TEXT PRIMARY KEY,
+        geometry TEXT NOT NULL,
+        fetched_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_routes_fetched_at ON routes(fetched_at);
+"""
+
+
+def snap(lat, lon, meters=ROUTE_SNAP_METERS):
+    """
+    (row, col) of the grid cell holding the point; cells are about meters wide.
+    """
+    step_lat = meters / METERS_PER_DEGREE
+    step_lon = step_lat / max(math.cos(math.radians(lat)), 0.01)
+    return math.floor(lat / step_lat), math.floor(lon / step_lon)
+
+
+def route_key(profile, origin, destination, meters=ROUTE_SNAP_METERS):
+    (a, b), (c, d) = snap(*origin, meters), snap(*destination, meters)
+    return f"{profile}:{a},{b}:{c},{d}"
+
+
+# --- 2. CACHE ---
+
+class RouteCache(SqliteStore):
+    """
+    Route geometries per (profile, snapped origin, snapped destination): a TTL/LRU
+    in memory in front of a SQLite table that survives restarts.
+    """
+
+    SCHEMA = SCHEMA
+    TABLE = "routes"
+
+    def __init__(self, db_path=ROUTE_DB_PATH, ttl=ROUTE_TTL, memory_size=ROUTE_MEMORY_SIZE,
+                 snap_meters=ROUTE_SNAP_METERS, max_rows=ROUTE_DB_MAX_ROWS, clock=time.time):
+        self.snap_meters = snap_meters
+        self.max_rows = max_rows
+        super().__init__(db_path, ttl, memory_size=memory_size, memory_ttl=ttl, clock=clock)
+
+    def key(self, origin, destination, profile="driving-car"):
+        return route_key(profile, origin, destination, self.snap_meters)
+
+    def _read(self, key):
+        row = self.conn.execute("SELECT geometry, fetched_at FROM routes WHERE route_key = ?", (key,)).fetchone()
+        if row is None or self.clock() - row[1] >= self.ttl:
+            return None
+        return json.loads(row[0]), row[1] + self.ttl
+
+    def _write(self, conn, key, geometry):
+        now = self.clock()
+        changed = conn.execute("INSERT OR REPLACE INTO routes VALUES (?, ?, ?)",
+                               (key, json.dumps(geometry), now)).rowcount
+        conn.execute("DELETE FROM routes WHERE fetched_at < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM routes WHERE route_key IN "
+            "(SELECT route_key FROM routes ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,)
+        )
+        return changed
+
+    def get(self, key):
+        """
+        Cached geometry for a route key, or None.
+        """
+        return super().get(key)[1]
+
+    def resolve(self, origin, destination, fetch, profile="driving-car"):
+        """
+        Cached geometry of the route, calling fetch() only on a miss. Errors raised
+        by fetch are not cached.
+        """
+        return super().resolve(self.key(origin, destination, profile), fetch)
+
+    def stats(self):
+        return dict(super().stats(), snap_meters=self.snap_meters)
+
+
+# --- 3. MATRIX CACHE ---
+
+class MatrixCache:
+    """
+    Travel times per snapped origin: {snapped destination: result} kept in a TTL/LRU,
+    so a later request from the same place only computes destinations not seen yet.
+    """
+
+    def __init__(self, ttl=MATRIX_TTL, maxsize=MATRIX_ORIGIN_CACHE_SIZE, snap_meters=ROUTE_SNAP_METERS,
+                 clock=time.monotonic):
+        self.snap_meters = snap_meters
+        self.origins = TTLCache(maxsize=maxsize, ttl=ttl, clock=clock)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "cached": 0, "computed": 0, "batches": 0, "errors": 0}
+
+    def resolve(self, origin, destinations, fetch, backend="ors"):
+        """
+        One result per destination (lat, lon), calling fetch(missing destinations)
+        at most once for those not cached for this origin. fetch returns a list of
+        results in the same order (None for unreachable); its errors are not cached.
+        """
+        origin_key = f"{backend}:{snap(*origin, self.snap_meters)}"
+        keys = [snap(*dest, self.snap_meters) for dest in destinations]
+        known = self.origins.get(origin_key) or {}
+
+        missing = {}
+        for key, dest in zip(keys, destinations):
+            if key not in known:
+                missing.setdefault(key, dest)
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["cached"] += len(keys) - sum(1 for key in keys if key in missing)
+
+        if missing:
+            try:
+                results = fetch(list(missing.values()))
+            except Exception:
+                with self._lock:
+                    self._stats["errors"] += 1
+                raise
+            # Bản mới thay cả dict: request khác đang đọc bản cũ không bị ảnh hưởng
+            known = {**known, **dict(zip(missing, results))}
+            self.origins.set(origin_key, known)
+            with self._lock:
+                self._stats["computed"] += len(missing)
+                self._stats["batches"] += 1
+
+        return [known.get(key) for key in keys]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, origins=self.origins.stats())
+
+
+# --- 4. SHARED CACHES ---
+
+_matrix_cache = MatrixCache()
+
+get_route_cache = shared(RouteCache)
+
+
+def get_matrix_cache():
+    return _matrix_cache
@@ -1,94 +1,222 @@
-import sqlite3
 from flask import jsonify
 import openrouteservice
 import os
+import threading
 from dotenv import load_dotenv
-import requests
+from openrouteservice.exceptions import ApiError, Timeout
+
+import HttpClient
+from Geocoding import get_geocode_cache
+from Gazetteer import lookup_place, lookup_address
+from RouteCache import get_route_cache, get_matrix_cache
+from LocalRouter import get_local_router, LocalRouteError, ROAD_GRAPH_PATH
+from RestaurantIndex import restaurants_by_ids
 
 load_dotenv()
 ORS_API_KEY = os.getenv("ORS_API_KEY")
 GEOAPIFY_API_KEY = os.getenv("GEOAPIFY_API_KEY")
 GOONG_API_KEY = os.getenv("GOONG_API_KEY")
-ors_client = openrouteservice.Client(key=ORS_API_KEY)
+# Client ORS tạo ở lần gọi đầu (get_ors_client): import module không cần ORS_API_KEY
+ors_client = None
+_ors_client_lock = threading.Lock()
+# "ors" (OpenRouteService qua mạng) hoặc "local" (đồ thị đường trong data/, không cần mạng)
+ROUTING_BACKEND = os.getenv("ROUTING_BACKEND", "ors")
+# Số nhà hàng tối đa cho một lần tính ma trận thời gian di chuyển
+MATRIX_MAX_DESTINATIONS = int(os.getenv("MATRIX_MAX_DESTINATIONS", "50"))
 
+_local_fallback_reported = False
 
-def geocode_address(address: str):
+
+def get_ors_client():
     """
-    Chỉ dùng để geocode địa chỉ người dùng nhập (origin)
+    Client OpenRouteService dùng chung, tạo khi cần lần đầu.
+    Thử lại/timeout do HttpClient.call đảm nhận, client ORS không tự chờ 429 thêm 60s
     """
-    if not GOONG_API_KEY:
-        raise ValueError("GOONG_API_KEY not found")
-    
+    global ors_client
+    if ors_client is None:
+        with _ors_client_lock:
+            if ors_client is None:
+                ors_client = openrouteservice.Client(key=ORS_API_KEY, timeout=10, retry_timeout=0)
+    return ors_client
+
+
+def is_transient_ors_error(error):
+    if isinstance(error, ApiError):
+        return str(error.status).isdigit() and int(error.status) in HttpClient.TRANSIENT_STATUS
+    return isinstance(error, Timeout) or HttpClient.is_transient_error(error)
+
+
+def _goong_lookup(address):
     url = "https://rsapi.goong.io/Geocode"
     params = {"address": address, "api_key": GOONG_API_KEY}
-    res = requests.get(url, params=params)
-    data = res.json()
+    res = HttpClient.get(url, params=params, label="goong", hedge_after=HttpClient.HEDGE_AFTER)
 
     if res.status_code != 200:
         raise Exception(f"Lỗi kết nối Goong.io: {res.status_code}")
 
+    data = res.json()
     if "results" in data and data["results"]:
         loc = data["results"][0]["geometry"]["location"]
         return loc["lat"], loc["lng"]
-    else:
+    return None
+
+
+def geocode_address(address: str):
+    """
+    Chỉ dùng để geocode địa chỉ người dùng nhập (origin)
+    """
+    if not GOONG_API_KEY:
+        raise ValueError("GOONG_API_KEY not found")
+
+    coords = get_geocode_cache().resolve("goong", address, _goong_lookup)
+    if coords is None:
         raise ValueError(f"Không tìm thấy toạ độ cho địa chỉ: {address}")
+    return coords
 
 
 def get_coordinates_from_db(location: str):
     """
-    Lấy trực tiếp Latitude/Longitude của nhà hàng từ SQLite
-    Kết nối vào bảng restaurants để lấy dữ liệu vị trí
+    Latitude/Longitude của nhà hàng theo địa chỉ, tra trong bộ nhớ (nạp một lần từ
+    SQLite): khớp nguyên văn, rồi bỏ qua dấu/khoảng trắng/cách viết P./Q., rồi gần đúng
     """
-    db_path = 'data/foody_data.sqlite'
-    if not os.path.exists(db_path):
-        db_path = 'data/foody_data.sqlite'
-        
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    if not location:
+        return None, None
+    return lookup_address(location)
 
-    cursor.execute("SELECT latitude, longitude FROM restaurants WHERE location = ?", (location,))
-    row = cursor.fetchone()
-    conn.close()
 
-    if row:
-        return row["latitude"], row["longitude"]
-    else:
-        return None, None
+def active_backend(backend=None):
+    """
+    Backend thực sự dùng: ROUTING_BACKEND (hoặc backend), nhưng "local" mà không nạp
+    được đồ thị đường thì chuyển sang ORS (báo một lần) thay vì lỗi ở mọi request
+    """
+    global _local_fallback_reported
+    backend = backend or ROUTING_BACKEND
+    if backend != "local":
+        return backend
+    try:
+        get_local_router()
+    except LocalRouteError as e:
+        if not _local_fallback_reported:
+            _local_fallback_reported = True
+            print(f"ROUTING_BACKEND=local nhưng không dùng được đồ thị đường ({e}). "
+                  f"Tạo {ROAD_GRAPH_PATH} bằng: python RoadGraphBuilder.py <extract.osm>. Tạm dùng ORS.")
+        return "ors"
+    return "local"
 
 
-def get_route(user_lat: float, user_lon: float, dest_lat: float, dest_lon: float):
+def get_route(user_lat: float, user_lon: float, dest_lat: float, dest_lon: float, backend=None):
     """
-    Lấy tuyến đường từ OpenRouteService giữa hai điểm
+    Lấy geometry tuyến đường giữa hai điểm từ backend đã cấu hình (ROUTING_BACKEND)
+    """
+    backend = active_backend(backend)
+    if backend == "local":
+        return get_local_route(user_lat, user_lon, dest_lat, dest_lon)
+    if backend != "ors":
+        raise ValueError(f"Unknown routing backend: {backend}")
+    return get_ors_route(user_lat, user_lon, dest_lat, dest_lon)
+
+
+def get_local_route(user_lat: float, user_lon: float, dest_lat: float, dest_lon: float):
+    """
+    Tính tuyến ngay trong tiến trình bằng A* trên đồ thị đường đã trích sẵn
     """
     try:
-        coords = [(user_lon, user_lat), (dest_lon, dest_lat)]
-        route = ors_client.directions(
-            coordinates=coords,
-            profile="driving-car",
-            format="geojson"
+        return get_local_router().route(user_lat, user_lon, dest_lat, dest_lon)["geometry"]
+    except Exception as e:
+        raise Exception(f"Lỗi khi tính route bằng đồ thị cục bộ: {e}")
+
+
+def get_ors_route(user_lat: float, user_lon: float, dest_lat: float, dest_lon: float):
+    """
+    Lấy tuyến đường từ OpenRouteService giữa hai điểm.
+    Tuyến đã tính cho cùng ô lưới ~50 m ở hai đầu được lấy lại từ cache
+    """
+    coords = [(user_lon, user_lat), (dest_lon, dest_lat)]
+
+    def fetch():
+        route = HttpClient.call(
+            "ors",
+            lambda: get_ors_client().directions(coordinates=coords, profile="driving-car", format="geojson"),
+            is_transient=is_transient_ors_error
         )
-        return route["features"][0]["geometry"] 
-        
+        return route["features"][0]["geometry"]
+
+    try:
+        return get_route_cache().resolve((user_lat, user_lon), (dest_lat, dest_lon), fetch)
     except Exception as e:
         raise Exception(f"Lỗi khi tính route bằng ORS: {e}")
 
 
+def get_travel_matrix(origin, destinations, backend=None):
+    """
+    Thời gian/quãng đường từ một điểm đi tới nhiều điểm đến trong một lần tính:
+    [{"duration_s", "distance_m"} hoặc None nếu không có đường], cùng thứ tự destinations.
+    Kết quả được nhớ theo điểm đi, lần sau chỉ tính các điểm đến mới
+    """
+    backend = active_backend(backend)
+    if backend == "local":
+        fetch = lambda dests: get_local_router().matrix(origin[0], origin[1], dests)
+    elif backend == "ors":
+        fetch = lambda dests: get_ors_matrix(origin, dests)
+    else:
+        raise ValueError(f"Unknown routing backend: {backend}")
+    return get_matrix_cache().resolve(origin, destinations, fetch, backend)
+
+
+def get_ors_matrix(origin, destinations):
+    """
+    Dịch vụ matrix của OpenRouteService, tối đa MATRIX_MAX_DESTINATIONS điểm đến mỗi request
+    """
+    results = []
+    for i in range(0, len(destinations), MATRIX_MAX_DESTINATIONS):
+        chunk = destinations[i:i + MATRIX_MAX_DESTINATIONS]
+        locations = [[origin[1], origin[0]]] + [[lon, lat] for lat, lon in chunk]
+        matrix = HttpClient.call(
+            "ors",
+            lambda: get_ors_client().distance_matrix(
+                locations=locations, profile="driving-car", sources=[0],
+                destinations=list(range(1, len(locations))), metrics=["duration", "distance"]
+            ),
+            is_transient=is_transient_ors_error
+        )
+        for duration, distance in zip(matrix["durations"][0], matrix["distances"][0]):
+            results.append(
+                {"duration_s": round(duration, 1), "distance_m": round(distance, 1)} if duration is not None else None
+            )
+    return results
+
+
+def resolve_location(location: str):
+    """
+    Toạ độ của một địa chỉ: nhà hàng trong database, rồi gazetteer (quận/phường/đường),
+    cuối cùng mới gọi Goong
+    """
+    lat, lon = get_coordinates_from_db(location)
+
+    if lat is None:
+        place = lookup_place(location)
+        if place:
+            lat, lon = place["lat"], place["lon"]
+
+    if lat is None:
+        print(f"Không tìm thấy '{location}' trong DB, đang gọi Goong...")
+        lat, lon = geocode_address(location)
+
+    return lat, lon
+
+
 def drawMarkerByCoordinate(data):
     """
     Xử lý API lấy tọa độ để vẽ marker lên bản đồ.
-    Kiểm tra địa chỉ trong database trước, nếu không có sẽ dùng Geoapify.
+    Kiểm tra địa chỉ trong database trước, rồi tới gazetteer (quận/phường/đường),
+    nếu không có sẽ dùng Goong.
     """
     try:
         location = data.get('address')
         if not location:
             return jsonify({'error': 'Thiếu địa chỉ'}), 400
 
-        lat, lon = get_coordinates_from_db(location)
-        
-        if lat is None:
-            print(f"Không tìm thấy '{location}' trong DB, đang gọi Geoapify...")
-            lat, lon = geocode_address(location)
+        lat, lon = resolve_location(location)
 
         return jsonify({'lat': lat, 'lng': lon})
     except Exception as e:
@@ -133,4 +261,55 @@ def drawPathToDestionation(data):
         })
     except Exception as e:
         print(f"Lỗi tìm đường: {e}")
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+def travelTimeMatrix(data):
+    """
+    Xử lý API ma trận: một điểm xuất phát (địa chỉ hoặc {lat, lng}) và danh sách id
+    nhà hàng -> thời gian, quãng đường đi thực tế tới từng quán, gần nhất trước.
+    """
+    origin = data.get('origin')
+    ids = data.get('restaurant_ids')
+
+    if not origin or not isinstance(ids, list) or not ids:
+        return jsonify({'error': 'Thiếu điểm xuất phát hoặc danh sách nhà hàng'}), 400
+    if len(ids) > MATRIX_MAX_DESTINATIONS:
+        return jsonify({'error': f'Tối đa {MATRIX_MAX_DESTINATIONS} nhà hàng mỗi lần'}), 400
+    try:
+        ids = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Id nhà hàng không hợp lệ'}), 400
+
+    try:
+        if isinstance(origin, dict):
+            user_lat, user_lon = float(origin['lat']), float(origin['lng'])
+        else:
+            user_lat, user_lon = resolve_location(origin)
+    except Exception as e:
+        print(f"Lỗi Geocode: {e}")
+        return jsonify({'error': 'Không tìm thấy tọa độ điểm xuất phát'}), 404
+
+    rows = [row for row in restaurants_by_ids(ids) if row and row.get('latitude') is not None]
+    known = {row['id'] for row in rows}
+
+    try:
+        matrix = get_travel_matrix((user_lat, user_lon), [(row['latitude'], row['longitude']) for row in rows])
+    except Exception as e:
+        print(f"Lỗi ma trận: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    results = [
+        {'id': row['id'], 'name': row['name'],
+         'duration_s': cell['duration_s'] if cell else None,
+         'distance_m': cell['distance_m'] if cell else None}
+        for row, cell in zip(rows, matrix)
+    ]
+    # Quán không có đường đi xếp cuối
+    results.sort(key=lambda r: (r['duration_s'] is None, r['duration_s'] or 0))
+
+    return jsonify({
+        'origin': [user_lat, user_lon],
+        'backend': active_backend(),
+        'results': results,
+        'missing_ids': [i for i in ids if i not in known]
+    })
@@ -0,0 +1,202 @@
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+")
+
+# "Quận 5", "Q.5", "Q5", "District 5" -> numbered district
+NUMBERED_DISTRICT_RE = re.compile(r"^(?:quan|q|district|dist)\.?\s*(\d+)$")
+# "Quận Tân Bình", "Huyện Bình Chánh", "Tp. Thủ Đức" -> named district
+NAMED_DISTRICT_RE = re.compile(r"^(quan|huyen|district|thanh pho|tp|thi xa|tx)(?:\.\s*|\s+)(\D.*)$")
+CITY_KEYS = {"tphcm", "hcm", "tphochiminh", "thanhphohochiminh", "hochiminh", "hochiminhcity", "saigon"}
+
+
+def fold_text(text):
+    """
+    Lowercase and strip Vietnamese diacritics: 'Phở Bò Đặc Biệt' -> 'pho bo dac biet'.
+    """
+    text = unicodedata.normalize("NFD", str(text).lower())
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return text.replace("đ", "d")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold_text(text))
+
+
+def parse_district(text):
+    """
+    (key, label) of the district in an address or a filter value, e.g.
+    '28 Phan Phú Tiên, P. 10, Quận 5, TP. HCM' -> ('quan 5', 'Quận 5') and
+    'Tp. Thủ Đức' / 'Thủ Đức' -> ('thu duc', 'Thủ Đức'). (None, None) if not found.
+    """
+    parts = [" ".join(re.sub(r"\.\s*", ". ", p).split()) for p in str(text or "").split(",")]
+
+    for part in reversed(parts):
+        folded = fold_text(part)
+        if not folded or re.sub(r"[\W_]", "", folded) in CITY_KEYS:
+            continue
+
+        m = NUMBERED_DISTRICT_RE.match(folded.replace(" ", ""))
+        if m:
+            number = int(m.group(1))
+            return f"quan {number}", f"Quận {number}"
+
+        m = NAMED_DISTRICT_RE.match(folded)
+        if m:
+            prefix_words = len(m.group(1).split())
+            label = " ".join(part.split()[prefix_words:])
+            return " ".join(tokenize(label)), label
+
+    # A bare filter value such as "Tân Bình" or "5"
+    if len(parts) == 1 and parts[0]:
+        if parts[0].isdigit():
+            return f"quan {int(parts[0])}", f"Quận {int(parts[0])}"
+        return " ".join(tokenize(parts[0])), parts[0]
+
+    return None, None
+
+
+def district_key(text):
+    return parse_district(text)[0]
+
+
+class InvertedIndex:
+    """
+    Token -> sorted doc id list, built once at load time.
+    Query tokens are accent-folded and matched as prefixes of indexed tokens,
+    so 'pho' finds 'Phở' and 'bun b' finds 'Bún Bò'.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self._vocab = []
+
+    def add(self, doc_id, text):
+        for token in set(tokenize(text)):
+            self.postings.setdefault(token, []).append(doc_id)
+        self._vocab = None
+
+    @property
+    def vocab(self):
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        return self._vocab
+
+    def _prefix_docs(self, prefix):
+        vocab = self.vocab
+        docs = set()
+        i = bisect_left(vocab, prefix)
+        while i < len(vocab) and vocab[i].startswith(prefix):
+            docs.update(self.postings[vocab[i]])
+            i += 1
+        return docs
+
+    def search(self, query, prefix=True):
+        """
+        Sorted ids of docs containing every query token.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        matches = []
+        for token in set(tokens):
+            docs = self._prefix_docs(token) if prefix else set(self.postings.get(token, ()))
+            if not docs:
+                return []
+            matches.append(docs)
+
+        matches.sort(key=len)
+        result = matches[0].intersection(*matches[1:])
+        return sorted(result)
+
+
+class AreaIndex:
+    """
+    District key -> sorted doc id list, parsed once from each address at load time.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.labels = {}
+
+    def add(self, doc_id, location):
+        key, label = parse_district(location)
+        if key is None:
+            return
+        self.ids.setdefault(key, []).append(doc_id)
+        self.labels.setdefault(key, label)
+
+    def lookup(self, area):
+        return self.ids.get(district_key(area), [])
+
+    def counts(self):
+        """
+        [(label, count)] for the filter dropdown: numbered districts first, then by name.
+        """
+        def order(key):
+            number = key[5:] if key.startswith("quan ") else ""
+            return (0, int(number), "") if number.isdigit() else (1, 0, key)
+
+        return [(self.labels[key], len(self.ids[key])) for key in sorted(self.ids, key=order)]
+
+
+def split_overnight(ranges):
+    """
+    [(1080, 120)] -> [(1080, 1440), (0, 120)]: ranges ending after midnight become two.
+    A range that opens and closes at the same minute means open all day.
+    """
+    result = []
+    for open_minute, close_minute in ranges:
+        if open_minute < close_minute:
+            result.append((open_minute, close_minute))
+        elif open_minute > close_minute:
+            result.append((open_minute, 1440))
+            result.append((0, close_minute))
+        else:
+            result.append((0, 1440))
+    return result
+
+
+def is_open_at(ranges, minute):
+    return any(o <= minute <= c for o, c in split_overnight(ranges))
+
+
+class HoursIndex:
+    """
+    Opening hours of every position as flat (position, open, close) minute arrays,
+    so checking the whole catalogue is one array comparison instead of a parse per row.
+    Positions without known hours count as open, like Search_Clone_2.is_open_now.
+    """
+
+    def __init__(self, ranges_per_pos):
+        self.size = len(ranges_per_pos)
+        self.known = np.zeros(self.size, dtype=bool)
+        positions, opens, closes = [], [], []
+
+        for pos, ranges in enumerate(ranges_per_pos):
+            if not ranges:
+                continue
+            self.known[pos] = True
+            for open_minute, close_minute in split_overnight(ranges):
+                positions.append(pos)
+                opens.append(open_minute)
+                closes.append(close_minute)
+
+        self.pos = np.array(positions, dtype=np.intp)
+        self.open = np.array(opens, dtype=np.int16)
+        self.close = np.array(closes, dtype=np.int16)
+
+    def open_at(self, minute, unknown_open=True):
+        """
+        Boolean mask of positions open at minute of day (0-1439).
+        """
+        hit = (self.open <= minute) & (minute <= self.close)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.pos[hit]] = True
+        if unknown_open:
+            mask |= ~self.known
+        return mask
@@ -1,13 +1,25 @@
 import os
 import json
-import sqlite3
 import math
-import requests
 from datetime import datetime
+from concurrent.futures import wait
 from dotenv import load_dotenv
 import google.generativeai as genai
 
 from SaveAnswer import saveAnswerForUser
+from LLMClient import generate, JsonFieldStream, LLMBusyError
+from ChatCache import ResponseCache
+from EntityExtractor import extract_entities, get_entity_extractor
+from ChatPipeline import StageTimer, executor
+import HttpClient
+from NutritionStore import get_nutrition_store
+from Geocoding import get_geocode_cache
+from Gazetteer import lookup_place
+from Routing import get_travel_matrix
+from PromptContext import build_restaurant_context, hydrate_recommendations
+from RestaurantIndex import rank_restaurants
+from CatalogueETL import parse_opening_hours
+from SearchIndex import is_open_at, fold_text
 
 # --- 1. CONFIGURATION ---
 
@@ -30,6 +42,15 @@ if not SPOONACULAR_API_KEY:
     print("Error: SPOONACULAR_API_KEY not found.")
     exit()
 
+# Timeout cho mỗi lần gọi Spoonacular và hạn chót cho cả thực đơn (giây)
+SPOONACULAR_TIMEOUT = (3.05, 5)
+NUTRITION_DEADLINE = float(os.getenv("NUTRITION_DEADLINE", "6"))
+NUTRITION_UNAVAILABLE = "Nutrition data unavailable"
+
+# Xếp lại các quán gần nhất theo thời gian đi thực tế (một lần gọi ma trận) thay vì đường chim bay
+RANK_BY_TRAVEL_TIME = os.getenv("RANK_BY_TRAVEL_TIME", "0") == "1"
+TRAVEL_TIME_CANDIDATES = int(os.getenv("TRAVEL_TIME_CANDIDATES", "25"))
+
 # --- DIET KNOWLEDGE BASE ---
 DIET_RULES = {
     "vegan": {
@@ -59,9 +80,14 @@ DIET_RULES = {
     }
 }
 
+# Câu trả lời đã sinh, dùng lại cho câu hỏi trùng/gần trùng (TTL + LRU).
+# Câu gần trùng phải cùng địa điểm/món theo bộ trích xuất cục bộ (không gọi Gemini)
+response_cache = ResponseCache(extract=lambda message: get_entity_extractor(DIET_RULES).extract(message)[0])
+
+
 # --- 2. HELPER FUNCTIONS ---
 
-def get_nutrition_from_spoonacular(dish_name):
+def get_nutrition_from_spoonacular(dish_name, timeout=SPOONACULAR_TIMEOUT):
     """
     Searches Spoonacular for a specific dish and returns its nutrition string.
     """
@@ -76,7 +102,7 @@ def get_nutrition_from_spoonacular(dish_name):
     }
 
     try:
-        response = requests.get(url, params=params)
+        response = HttpClient.get(url, params=params, timeout=timeout, label="spoonacular")
         data = response.json()
 
         if data['results']:
@@ -100,6 +126,48 @@ def get_nutrition_from_spoonacular(dish_name):
         print(f"Spoonacular Error for {dish_name}: {e}")
         return {}
 
+    # Spoonacular không có món này (khác với lỗi mạng/hết quota ở trên)
+    return None
+
+
+def lookup_and_store_nutrition(dish_name, store):
+    """
+    Ask Spoonacular and remember the answer, including 'no match'.
+    Errors are not cached so the next plan retries them.
+    """
+    nutrition = get_nutrition_from_spoonacular(dish_name)
+    if nutrition != {}:
+        store.put(dish_name, nutrition)
+    return nutrition or {}
+
+
+def fetch_nutrition(dish_names, deadline=NUTRITION_DEADLINE):
+    """
+    Nutrition for every dish at once. Dishes in the local store are answered
+    directly; the rest are looked up concurrently on the shared pool and anything
+    not back before the deadline is left out ({} like a failed lookup).
+    """
+    store = get_nutrition_store()
+    results = {}
+    futures = {}
+    for name in set(dish_names):
+        found, nutrition = store.get(name)
+        if found:
+            results[name] = nutrition
+        else:
+            futures[name] = executor.submit(lookup_and_store_nutrition, name, store)
+    done = set()
+    if futures:
+        done, _ = wait(futures.values(), timeout=deadline)
+
+    for name, future in futures.items():
+        if future in done and not future.exception():
+            results[name] = future.result() or {}
+        else:
+            print(f"Spoonacular: no nutrition for {name} before the deadline")
+            results[name] = {}
+    return results
+
 
 def haversine(lat1, lon1, lat2, lon2):
     try:
@@ -110,24 +178,61 @@ def haversine(lat1, lon1, lat2, lon2):
         return 0
 
 
+def _geoapify_lookup(location_name):
+    url = "https://api.geoapify.com/v1/geocode/search"
+    params = {
+        'text': f"{location_name}, Ho Chi Minh City",
+        'apiKey': GEOAPIFY_API_KEY,
+        'limit': 1,
+        'bias': 'proximity:106.660172,10.762622'
+    }
+    resp = HttpClient.get(url, params=params, label="geoapify", hedge_after=HttpClient.HEDGE_AFTER)
+    # Lỗi HTTP không được lưu vào cache, chỉ "không tìm thấy" mới được nhớ
+    resp.raise_for_status()
+    features = resp.json()['features']
+    if not features:
+        return None
+    coords = features[0]['geometry']['coordinates']
+    return coords[1], coords[0]  # Lat, Lon
+
+
 def get_coords_for_location(location_name):
     try:
-        url = "https://api.geoapify.com/v1/geocode/search"
-        params = {
-            'text': f"{location_name}, Ho Chi Minh City",
-            'apiKey': GEOAPIFY_API_KEY,
-            'limit': 1,
-            'bias': 'proximity:106.660172,10.762622'
-        }
-        resp = requests.get(url, params=params)
-        if resp.ok and resp.json()['features']:
-            coords = resp.json()['features'][0]['geometry']['coordinates']
-            return coords[1], coords[0]  # Lat, Lon
+        # Quận/phường/đường đã có trong dữ liệu nhà hàng: không cần gọi mạng
+        place = lookup_place(location_name)
+        if place:
+            return place["lat"], place["lon"]
+        coords = get_geocode_cache().resolve("geoapify", location_name, _geoapify_lookup)
+        if coords:
+            return coords
     except Exception as e:
         print(f"Geocoding error: {e}")
     return None, None
 
 
+def rank_by_travel_time(lat, lon, rows, n=TRAVEL_TIME_CANDIDATES):
+    """
+    Re-order the first n candidates by road travel time from one matrix call and
+    replace their straight-line km with road km. Keeps the given order on failure.
+    """
+    head, tail = rows[:n], rows[n:]
+    try:
+        matrix = get_travel_matrix((lat, lon), [(row["latitude"], row["longitude"]) for row in head])
+    except Exception as e:
+        print(f"Travel time error: {e}")
+        return rows
+
+    timed = []
+    for row, cell in zip(head, matrix):
+        row = dict(row)
+        if cell:
+            row["distance_km"] = round(cell["distance_m"] / 1000, 2)
+            row["travel_min"] = round(cell["duration_s"] / 60, 1)
+        timed.append(row)
+    timed.sort(key=lambda row: (row.get("travel_min") is None, row.get("travel_min") or 0))
+    return timed + tail
+
+
 def get_bounding_box(lat, lon, km):
     lat_change = km / 111.0
     lon_change = km / (111.0 * math.cos(math.radians(lat)))
@@ -139,39 +244,45 @@ def get_bounding_box(lat, lon, km):
 
 def is_open_now(hours_str):
     """
-    Parses '09:00 - 22:00' and checks against current system time.
+    Parses '09:00 - 22:00' (or several '|'-separated ranges) and checks against current system time.
     Returns True if Open, False if Closed.
     """
-    if not hours_str or hours_str.lower() == 'updating' or not '-' in hours_str:
+    ranges = parse_opening_hours(hours_str)
+    if not ranges:
         return True  # Default to Open if unknown
 
-    try:
-        now = datetime.now().time()
-        start_str, end_str = hours_str.split(' - ')
-        start_time = datetime.strptime(start_str.strip(), "%H:%M").time()
-        end_time = datetime.strptime(end_str.strip(), "%H:%M").time()
-
-        if start_time < end_time:
-            # Normal range (e.g., 09:00 - 22:00)
-            return start_time <= now <= end_time
-        else:
-            # Cross-midnight range (e.g., 16:00 - 02:00)
-            return now >= start_time or now <= end_time
-    except:
-        return True  # Default to True on parse error
+    return is_open_at(ranges, current_minute())
+
+
+def current_minute():
+    now = datetime.now().time()
+    return now.hour * 60 + now.minute
 
 
 # --- 3. MISSION HANDLERS ---
 
-def handle_culture_query(prompt):
+def explanation_stream(on_text):
+    """
+    For structured replies only the 'explanation' text is streamed; the cards
+    are sent once the whole JSON has been parsed.
+    """
+    return JsonFieldStream("explanation", on_text) if on_text else None
+
+
+def handle_culture_query(prompt, on_text=None):
     print("-> Executing: Culture Query")
-    model = genai.GenerativeModel('gemini-2.5-flash')
     sys_msg = "You are a Vietnamese cultural expert. Always respond in the same language that the user used in their prompt. If the topic involves food taboos (e.g. Pork in Islam), explicitly mention them."
-    return model.generate_content([sys_msg, prompt]).text
+    return generate([prompt], system=sys_msg, label="culture", on_text=on_text).text
 
 
 def route_user_request(prompt):
 
+    # Thử trích xuất cục bộ trước (quận/đường, món, ngân sách, chế độ ăn); chỉ gọi Gemini khi không chắc
+    entities = extract_entities(prompt, DIET_RULES)
+    if entities is not None:
+        print(f"-> Router (local): {entities}")
+        return entities
+
     # Có thể viết thêm context prompt để lọc chuẩn hơn
     schema = {
         "type": "OBJECT",
@@ -179,18 +290,12 @@ def route_user_request(prompt):
             "location": {"type": "STRING"},
             "cuisine": {"type": "STRING"},
             "budget": {"type": "STRING"},
-            "diet_ingredient": {"type": "STRING"}
+            "diet_ingredient": {"type": "STRING"},
+            "open_now": {"type": "BOOLEAN"}
         },
     }
 
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    response = model.generate_content(
-        ["User prompt: " + prompt],
-        generation_config={
-            "response_mime_type": "application/json",
-            "response_schema": schema
-        }
-    )
+    response = generate(["User prompt: " + prompt], schema=schema, label="router")
 
     try:
         return json.loads(response.text)
@@ -198,78 +303,50 @@ def route_user_request(prompt):
         print(f"Error parsing router response: {e}")
         return {"task": "unknown"}
 
-def handle_restaurant_recommendation(prompt, entities):
+def start_speculative_geocode(prompt, timer):
+    """
+    Geocode the place the local extractor already sees in the prompt while the router runs.
+    Returns (location, Future) or None.
+    """
+    guess = get_entity_extractor(DIET_RULES).extract(prompt)[0].get('location')
+    if not guess:
+        return None
+    return guess, timer.submit("geocode", get_coords_for_location, guess)
+
+
+def handle_restaurant_recommendation(prompt, entities, speculative=None, timer=None, on_text=None):
+    timer = timer or StageTimer("place")
     location = entities.get('location')
     cuisine = entities.get('cuisine')
     budget = entities.get('budget','')
+    # Người dùng hỏi "quán đang mở" -> lọc theo giờ mở cửa hiện tại
+    open_at = current_minute() if entities.get('open_now') else None
 
-    print(f"-> Executing: Restaurant Recommendation (Location: {location}, Cuisine: {cuisine})")
+    print(f"-> Executing: Restaurant Recommendation (Location: {location}, Cuisine: {cuisine}, Open now: {open_at is not None})")
 
     user_lat, user_lon = None, None
     if location and location.lower() != 'none':
-        user_lat, user_lon = get_coords_for_location(location)
-
-    conn = sqlite3.connect('data/foody_data.sqlite')
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM Restaurants"
-    params = []
-    conditions = []
-
-    if user_lat and user_lon:
-        bbox = get_bounding_box(user_lat, user_lon, km=10)
-        conditions.append("Latitude BETWEEN ? AND ?")
-        conditions.append("Longitude BETWEEN ? AND ?")
-        params.extend([bbox['min_lat'], bbox['max_lat'], bbox['min_lon'], bbox['max_lon']])
-
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
-
-    # 3. Process & Filter
-    results = []
-    search_term = cuisine.lower() if cuisine else ""
-
-    for row in rows:
-        rest = dict(row)
-        rest_name = str(rest['name']).lower()
-
-        if search_term and search_term not in rest_name:
-            continue
-        
-        if not rest['opening_hours']:
-            rest['opening_hours'] = "Updating"
-        if not rest['price_range']:
-            rest['price_range'] = "Updating"
-        if not rest['tags']:
-            rest['tags'] = "Family, Office workers"
-
-        try:
-            rest['rating'] = float(rest['rating'])
-        except (ValueError, TypeError):
-            rest['rating'] = 0.0
+        if speculative and fold_text(speculative[0]) == fold_text(location):
+            # Router agreed with the local guess: the geocode already ran in parallel
+            with timer.stage("geocode_wait"):
+                user_lat, user_lon = speculative[1].result()
+        else:
+            with timer.stage("geocode"):
+                user_lat, user_lon = get_coords_for_location(location)
 
+    # 2. Rank candidates from the in-memory index: top 100 by (-rating, distance_km)
+    with timer.stage("rank"):
         if user_lat and user_lon:
-            try:
-                r_lat = float(rest['latitude'])
-                r_lon = float(rest['longitude'])
-                dist = haversine(user_lat, user_lon, r_lat, r_lon)
-                rest['distance_km'] = round(dist, 2)
-            except (ValueError, TypeError):
-                rest['distance_km'] = 9999
+            top_results = rank_restaurants(user_lat, user_lon, radius_km=10, k=100, name_term=cuisine, open_at=open_at)
         else:
-            rest['distance_km'] = 0
+            top_results = rank_restaurants(k=100, name_term=cuisine, open_at=open_at)
 
-        results.append(rest)
+    if RANK_BY_TRAVEL_TIME and user_lat and user_lon and top_results:
+        with timer.stage("travel_time"):
+            top_results = rank_by_travel_time(user_lat, user_lon, top_results)
 
     # --- FALLBACK LOGIC STARTS HERE ---
-    model = genai.GenerativeModel('gemini-2.5-flash')
-
-    if not results:
+    if not top_results:
         print("-> No matches in DB. Switching to Cultural Fallback.")
         fallback_system_context = (
             "You are a knowledgeable local guide for Vietnam. "
@@ -278,23 +355,22 @@ def handle_restaurant_recommendation(prompt, entities):
             "2. Then, pivot to providing helpful **General/Cultural Knowledge** about the food they asked for. "
             "Describe what the dish is, its history, or general tips on where to find it in Vietnam (e.g., 'You can usually find this dish in street stalls...')."
         )
-        response = model.generate_content([fallback_system_context, f"User Query: {prompt}"])
+        with timer.stage("llm"):
+            response = generate([f"User Query: {prompt}"], system=fallback_system_context, label="restaurant_fallback", on_text=on_text)
         return response.text
     # --- FALLBACK LOGIC ENDS HERE ---
 
-    # 4. Rank
-    results.sort(key=lambda x: (-x['rating'], x['distance_km']))
-    top_results = results[:100]
-
-    # 5. Send Database Results to Gemini
-    restaurant_context = json.dumps(top_results, ensure_ascii=False)
+    # 3. Send Database Results to Gemini: compact table within the token budget
+    with timer.stage("context"):
+        restaurant_context, context_rows = build_restaurant_context(top_results)
+    print(f"-> Context: {len(context_rows)}/{len(top_results)} restaurants")
 
     system_context = (
         "You are a local restaurant guide. Your job is to recommend 3-5 top restaurants to the user. "
-        "Use the provided JSON database. "
-        "The JSON includes an 'img' field containing an image path. For example 'foody_images/img_name.jpg' "
-        "The JSON includes a 'distance_km' field showing how far the restaurant is from the user. "
+        "Use the provided DATABASE table: one restaurant per line, columns separated by '|'. "
+        "The 'km' column shows how far the restaurant is from the user. "
         "Mention this distance in your answer. "
+        "For each recommendation return the restaurant's 'id' from the table and its Name. "
         "Always respond in the same language that the user used in their prompt."
         f"USER LOCATION: {location}\n"
         f"USER CUISINE: {cuisine}\n"
@@ -311,6 +387,7 @@ def handle_restaurant_recommendation(prompt, entities):
                 "items": {
                     "type": "OBJECT",
                     "properties": {
+                        "id": {"type": "INTEGER"},
                         "Name": {"type": "STRING"},
                         "Address": {"type": "STRING"},
                         "Rating": {"type": "NUMBER"},
@@ -328,24 +405,19 @@ def handle_restaurant_recommendation(prompt, entities):
     }
 
 
-    response = model.generate_content(
-        [system_context, prompt],
-        generation_config={
-            "response_mime_type": "application/json",
-            "response_schema": schema
-        }
-    )
+    with timer.stage("llm"):
+        response = generate([system_context, prompt], schema=schema, label="restaurant", on_text=explanation_stream(on_text))
 
     result = json.loads(response.text)
 
     return {
         "text": result.get("explanation", ""),
-        "restaurants": result.get("recommendations", {})
+        "restaurants": hydrate_recommendations(result.get("recommendations", []), context_rows)
     }
 
 
 
-def handle_food_recommendation(prompt, entities):
+def handle_food_recommendation(prompt, entities, on_text=None):
     diet = entities.get('diet_ingredient', 'General')
     print(f"-> Food Rec (Direct LLM): {diet}")
 
@@ -375,7 +447,6 @@ def handle_food_recommendation(prompt, entities):
         "required": ["recommendations"]
     }
 
-    model = genai.GenerativeModel('gemini-2.5-flash')
     sys_msg = (
         f"You are an expert Vietnamese culinary. User wants a dish suggestion. Diet: {diet}.\n"
         "1. Recommend 3 specific authentic Vietnamese dishes (english reply) or if users mention certain dishes, focus the answer on them.\n"
@@ -383,12 +454,7 @@ def handle_food_recommendation(prompt, entities):
         "3. Provide estimated Calories/Protein/Carbs/Fat and cost."
         "Always respond in the same language that the user used in their prompt."
     )
-    response = model.generate_content(
-        [sys_msg, prompt],
-        generation_config={
-        "response_mime_type": "application/json",
-        "response_schema": schema
-    })
+    response = generate([sys_msg, prompt], schema=schema, label="food", on_text=explanation_stream(on_text))
 
     result = json.loads(response.text)
 
@@ -397,15 +463,13 @@ def handle_food_recommendation(prompt, entities):
         "restaurants": result.get("recommendations", {})
     }
 
-def handle_daily_menu(prompt, entities):
+def handle_daily_menu(prompt, entities, on_text=None):
     budget = entities.get('budget', 'moderate')
     diet = entities.get('diet_ingredient', '')
 
     print(f"-> Daily Menu (Hybrid): Diet={diet}, Budget={budget}")
 
     # --- STAGE 1: ASK GEMINI FOR DISH NAMES (Structured JSON) ---
-    model = genai.GenerativeModel('gemini-2.5-flash')
-
     # We force Gemini to output JSON so we can read it easily in Python
     context = (
         f"Create a 1-Day Vietnamese Meal Plan (Breakfast, Lunch, Dinner) (english reply). Diet: {diet}.\n"
@@ -434,13 +498,11 @@ def handle_daily_menu(prompt, entities):
     }
     try:
         # Get dish names
-        response = model.generate_content(
-            [context, prompt],
-            generation_config={
-            "response_mime_type": "application/json",
-            "response_schema": schema
-        })
+        response = generate([context, prompt], schema=schema, label="daily_menu", on_text=explanation_stream(on_text))
         menu_plan = json.loads(response.text)
+    except LLMBusyError:
+        # Hàng đợi LLM đầy: để endpoint trả 429
+        raise
     except Exception as e:
         # Fallback if JSON fails
         print("Lỗi:",e)
@@ -451,16 +513,17 @@ def handle_daily_menu(prompt, entities):
     # --- STAGE 2: FETCH NUTRITION FOR THESE DISHES ---
 
     print("   Fetching Spoonacular Data...")
+    nutrition = fetch_nutrition([meal["FoodName"] for meal in menu_plan["recommendations"]])
     for meal in menu_plan["recommendations"]:
-        stats = get_nutrition_from_spoonacular(meal["FoodName"])
+        stats = nutrition.get(meal["FoodName"])
         if stats:
             meal["Calories"] = stats["Calories"]
             meal["Protein"] = stats["Protein"]
             meal["Fat"] = stats["Fat"]
         else:
-            meal["Calories"] = "Nutrition data unavailable"
-            meal["Protein"] = "Nutrition data unavailable"
-            meal["Fat"] = "Nutrition data unavailable"
+            meal["Calories"] = NUTRITION_UNAVAILABLE
+            meal["Protein"] = NUTRITION_UNAVAILABLE
+            meal["Fat"] = NUTRITION_UNAVAILABLE
     
     return {
         "text": menu_plan.get("explanation", ""),
@@ -503,45 +566,90 @@ def main_chatbot():
 # ============================================================
 
 
-def replyToUser(data,users = "users"):
+PIPELINE_NAMES = {"": "culture", "/place_": "place", "/recipe_": "recipe", "/plan_": "plan"}
+
+
+def replyToUser(data,users = "users", on_event=None):
+    """
+    on_event(name, payload), when given, receives the reply while it is produced:
+    'delta' ({"text"}) for each piece of the answer text, then 'cards' ({"food_data"}).
+    The full result is still returned at the end.
+    """
     user_msg = data.get("message", "").strip()
     task = data.get("mode")
+    emit = on_event or (lambda name, payload: None)
+    on_text = (lambda text: emit("delta", {"text": text})) if on_event else None
 
     # CASE 1: Empty Input
     if not user_msg:
         return {"reply": "Bạn chưa nhập câu hỏi.", "restaurants": []}
 
-    entities = route_user_request(user_msg)
+    timer = StageTimer(PIPELINE_NAMES.get(task, "unknown"))
+
+    # Câu hỏi giống (hoặc gần giống) vừa được trả lời -> dùng lại, không gọi Gemini
+    with timer.stage("cache"):
+        cached = response_cache.lookup(task, user_msg)
+    if cached is None:
+        # /place_: geocode địa điểm đoán được song song với bước router
+        speculative = start_speculative_geocode(user_msg, timer) if task == "/place_" else None
+        with timer.stage("route"):
+            entities = route_user_request(user_msg)
+        cached = response_cache.lookup_entities(task, user_msg, entities)
+    if cached is not None:
+        emit("delta", {"text": cached["reply"]})
+        emit("cards", {"food_data": cached["food_data"]})
+        with timer.stage("save"):
+            saveAnswerForUser(cached["reply"] if task == "" else cached["food_data"], task, users)
+        timer.finish()
+        return cached
+
     food_data = []
 
     # Execute the logic and get the text string
     if task == "":
-        reply_text = handle_culture_query(user_msg)
-        saveAnswerForUser(reply_text,task,users)
+        with timer.stage("llm"):
+            reply_text = handle_culture_query(user_msg, on_text=on_text)
+        emit("cards", {"food_data": food_data})
+        with timer.stage("save"):
+            saveAnswerForUser(reply_text,task,users)
     elif task == "/place_":
-        response = handle_restaurant_recommendation(user_msg, entities)
+        response = handle_restaurant_recommendation(user_msg, entities, speculative, timer, on_text=on_text)
         reply_text =  response["text"]
         food_data = response["restaurants"]
-        saveAnswerForUser(food_data,task,users)
+        emit("cards", {"food_data": food_data})
+        with timer.stage("save"):
+            saveAnswerForUser(food_data,task,users)
     elif task == '/recipe_':
-        response = handle_food_recommendation(user_msg, entities)
+        with timer.stage("handler"):
+            response = handle_food_recommendation(user_msg, entities, on_text=on_text)
         reply_text =  response["text"]
         food_data = response["restaurants"]
-        saveAnswerForUser(food_data,task,users)
+        emit("cards", {"food_data": food_data})
+        with timer.stage("save"):
+            saveAnswerForUser(food_data,task,users)
     elif task == '/plan_':
-        response = handle_daily_menu(user_msg, entities)
+        with timer.stage("handler"):
+            response = handle_daily_menu(user_msg, entities, on_text=on_text)
         reply_text =  response["text"]
         food_data = response["menu"]
-        saveAnswerForUser(food_data,task,users)
+        emit("cards", {"food_data": food_data})
+        with timer.stage("save"):
+            saveAnswerForUser(food_data,task,users)
     else:
         reply_text = "I'm not sure how to help with that."
     
     # CASE 2: Valid Response
     # Wrap the text in a dictionary so app.py converts it to {"reply": "..."}
-    return {
+    result = {
         "reply": reply_text,
         "food_data": food_data  # Add this if your frontend expects it to prevent errors
     }
+
+    # Chỉ cache câu trả lời thật (không cache lỗi/fallback rỗng)
+    if reply_text and (task == "" or food_data):
+        response_cache.store(task, user_msg, entities, result)
+    timer.finish()
+    return result
 if __name__ == "__main__":
     print("=== Search_Clone.py (New) ===")
     while True:
@@ -0,0 +1,170 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from Cache import TTLCache
+
+# --- 1. CONFIGURATION ---
+
+# Bản sao nóng trong bộ nhớ trước SQLite (mỗi store)
+MEMORY_SIZE = int(os.getenv("STORE_MEMORY_SIZE", "2048"))
+MEMORY_TTL = 3600
+
+_MISSING = object()
+
+
+# --- 2. BASE STORE ---
+
+class SqliteStore(ABC):
+    """
+    Skeleton of the SQLite-backed caches: one connection per thread, a bounded
+    TTL/LRU memory tier in front of the table, and lookup counters.
+    Subclasses set SCHEMA and TABLE and implement _read / _write.
+    A cached value of None means "the upstream had no result" (negative cache).
+    """
+
+    SCHEMA = ""
+    TABLE = ""
+    COUNTERS = {"memory_hits": 0, "db_hits": 0, "negative_hits": 0, "misses": 0,
+                "upstream_calls": 0, "upstream_errors": 0}
+
+    def __init__(self, db_path, ttl, miss_ttl=None, memory_size=MEMORY_SIZE, memory_ttl=MEMORY_TTL,
+                 clock=time.time):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.miss_ttl = ttl if miss_ttl is None else miss_ttl
+        self.clock = clock
+        # Mỗi mục là (value, hạn của dòng SQLite): không bao giờ sống lâu hơn dữ liệu trên đĩa
+        self.memory = TTLCache(maxsize=memory_size, ttl=memory_ttl, clock=clock)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {k: (dict(v) if isinstance(v, dict) else v) for k, v in self.COUNTERS.items()}
+
+        self.conn.executescript(self.SCHEMA)
+
+    @property
+    def conn(self):
+        """
+        This thread's connection, opened on first use and reused afterwards.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            folder = os.path.dirname(self.db_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = self._local.conn = sqlite3.connect(self.db_path)
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _count(self, name, label=None):
+        with self._lock:
+            if label is None:
+                self._stats[name] += 1
+            else:
+                self._stats[name][label] = self._stats[name].get(label, 0) + 1
+
+    @abstractmethod
+    def _read(self, key):
+        """
+        (value, expires_at) of a fresh row, or None if the row is missing or stale.
+        """
+
+    @abstractmethod
+    def _write(self, conn, key, value, **fields):
+        """
+        Store one row inside the open transaction; returns the number of rows changed.
+        """
+
+    def expires_at(self, value):
+        return self.clock() + (self.ttl if value is not None else self.miss_ttl)
+
+    def get(self, key):
+        """
+        (found, value): (True, value), (True, None) for a remembered miss,
+        (False, None) when the upstream should be asked.
+        """
+        return self._lookup(key)
+
+    def put(self, key, value, **fields):
+        self._store(key, value, **fields)
+
+    # Subclass nào đổi chữ ký get/put (vd. nhận tên món thay cho khóa) vẫn dùng chung hai hàm này
+    def _lookup(self, key):
+        entry = self.memory.get(key, _MISSING)
+        if entry is not _MISSING and entry[1] > self.clock():
+            self._count("memory_hits")
+        else:
+            entry = self._read(key)
+            if entry is None:
+                self._count("misses")
+                return False, None
+            self._count("db_hits")
+            self.memory.set(key, entry)
+
+        if entry[0] is None:
+            self._count("negative_hits")
+        return True, entry[0]
+
+    def _store(self, key, value, **fields):
+        with self.conn as conn:
+            changed = self._write(conn, key, value, **fields)
+        # Dòng không được ghi (vd. dữ liệu seed được bảo vệ): giữ nguyên bản trong bộ nhớ
+        if changed:
+            self.memory.set(key, (value, self.expires_at(value)))
+
+    def resolve(self, key, fetch, label=None, **fields):
+        """
+        Cached value for key, calling fetch() only on a miss and remembering its
+        result (None included) with the extra row fields. Errors raised by fetch
+        are not cached; upstream counters are kept per label when one is given.
+        """
+        found, value = self._lookup(key)
+        if found:
+            return value
+
+        self._count("upstream_calls", label)
+        try:
+            value = fetch()
+        except Exception:
+            self._count("upstream_errors", label)
+            raise
+        self._store(key, value, **fields)
+        return value
+
+    def clear_memory(self):
+        self.memory.clear()
+
+    def stats(self):
+        rows = self.conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+        with self._lock:
+            stats = {k: (dict(v) if isinstance(v, dict) else v) for k, v in self._stats.items()}
+        hits = stats["memory_hits"] + stats["db_hits"]
+        lookups = hits + stats["misses"]
+        return dict(stats, rows=rows, hit_rate=round(hits / lookups, 3) if lookups else 0.0,
+                    memory=self.memory.stats())
+
+
+# --- 3. SHARED INSTANCES ---
+
+def shared(factory):
+    """
+    Getter building factory() once, on first use, for the whole process.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    return get
@@ -1,7 +1,10 @@
-from flask import Flask, render_template, request, jsonify, session, flash, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, flash, redirect, url_for, Response, copy_current_request_context
 import os
+import hmac
 import math
-import re # Import re để dùng trong search
+import json
+import queue
+import threading
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 from datetime import datetime
@@ -9,11 +12,22 @@ import sqlite3
 
 # Import các module tự viết
 import Routing
+import RestaurantIndex
+import LLMClient
+import EntityExtractor
+import ChatPipeline
+import HttpClient
+import NutritionStore
+import Geocoding
+import Gazetteer
+import RouteCache
+import LocalRouter
 import Currency  # Import the new file
 from FoodRecognition import replyToImage
 from auth import auth_bp, login_required
-from FoodLoading import load_foods_from_sqlite
-from Search_Clone_2 import replyToUser
+from Catalogue import CatalogueService
+from Search_Clone_2 import replyToUser, response_cache
+from LLMScheduler import LLMBusyError
 from extensions import oauth
 from lang import translations
 from database import (
@@ -33,6 +47,10 @@ app = Flask(__name__)
 # Lấy SECRET_KEY từ .env, nếu không có thì dùng chuỗi mặc định (chỉ dùng cho dev)
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY", "dev_secret_key_12345") 
 
+# /api/metrics lộ thông tin nội bộ (token Gemini, cache, breaker): đặt METRICS_TOKEN thì phải gửi
+# header X-Metrics-Token khớp, không đặt thì chỉ trả lời request từ chính máy chủ
+app.config['METRICS_TOKEN'] = os.getenv("METRICS_TOKEN")
+
 # Khởi tạo OAuth
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1' # Chỉ dùng khi chạy localhost (HTTP)
 oauth.init_app(app)
@@ -71,10 +89,33 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def get_favorite_ids():
+    """Tập id (chuỗi) các quán yêu thích của user đang đăng nhập"""
+    if 'user_id' not in session:
+        return set()
+    # Chỉ dùng để đánh dấu quán đang hiển thị: id cũ không còn trong catalogue không ảnh hưởng
+    return {str(item['place_id']) for item in get_favorites_by_user(session['user_id'])}
+
+def current_open_at(open_now):
+    """Phút hiện tại trong ngày để lọc quán đang mở cửa, None nếu không lọc"""
+    if not open_now:
+        return None
+    now = datetime.now()
+    return now.hour * 60 + now.minute
+
 # Khởi tạo DB và Load dữ liệu
 with app.app_context():
     init_db()
-    foods_data = load_foods_from_sqlite() # Load 1 lần khi start app
+    catalogue_service = CatalogueService() # Load khi start app (kèm chỉ mục tìm kiếm)
+    # Tự nạp lại khi file SQLite thay đổi, không cần restart server
+    catalogue_service.add_listener(RestaurantIndex.reload_restaurant_index)
+    catalogue_service.add_listener(Gazetteer.reload_gazetteer)
+    catalogue_service.start_watching()
+    LLMClient.warm_up() # Mở sẵn kết nối tới Gemini cho lượt chat đầu tiên
+    Routing.active_backend() # ROUTING_BACKEND=local: nạp đồ thị đường ngay, thiếu file thì báo và dùng ORS
+
+# Số món mỗi trang
+PER_PAGE = 9
 
 # --- ROUTES CHÍNH ---
 
@@ -83,39 +124,23 @@ def index():
     page = int(request.args.get("page", 1))
     area = request.args.get("area", "all").strip()
     q = request.args.get("q", "").strip().lower()
+    open_now = request.args.get("open_now") == "1"
 
-    favorite_ids = []
-    if 'user_id' in session:
-        user_favs = get_favorites_by_user(session['user_id'])
-        favorite_ids = [str(item['place_id']) for item in user_favs]
-    # ---------------------------------------------------------
-
-    filtered_foods = []
-    for food in foods_data:
-        location = food["location"].strip()
-        name = food["name"].strip().lower()
-
-        if area.lower() != "all":
-            pattern = r'\b{}\b'.format(re.escape(area.lower()))
-            if not re.search(pattern, location.lower()):
-                continue
-
-        if q and q not in name:
-            continue
-
-        filtered_foods.append(food)
+    favorite_ids = get_favorite_ids()
 
-    per_page = 9
-    total_pages = math.ceil(len(filtered_foods) / per_page)
-    foods_to_render = filtered_foods[(page-1)*per_page : page*per_page]
+    # Lọc theo quận và tên qua chỉ mục dựng sẵn lúc load (không dấu, theo tiền tố)
+    foods_to_render, total = catalogue_service.query(area, q, page, PER_PAGE, open_at=current_open_at(open_now))
+    total_pages = math.ceil(total / PER_PAGE)
 
     return render_template(
         "index.html",
         foods=foods_to_render,
         page=page,
         total_pages=total_pages,
+        areas=catalogue_service.catalogue.area_counts(),
         area_selected=area,
         search_query=q,
+        open_now=open_now,
         favorite_ids=favorite_ids  
     )
 
@@ -134,34 +159,11 @@ def forum_page():
     area = request.args.get("area", "all").strip()
     q = request.args.get("q", "").strip().lower()
 
-    favorite_ids = []
-    if 'user_id' in session:
-        user_favs = get_favorites_by_user(session['user_id'])
-        favorite_ids = [str(item['place_id']) for item in user_favs]
-
-    filtered_foods = []
-    for food in foods_data:
-        location = food["location"].strip()
-        name = food["name"].strip().lower()
-
-        # Lọc theo khu vực
-        if area.lower() != "all":
-            pattern = r'\b{}\b'.format(re.escape(area.lower()))
-            if not re.search(pattern, location.lower()):
-                continue
-
-        # Lọc theo từ khóa tìm kiếm
-        if q and q not in name:
-            continue
-
-        filtered_foods.append(food)
+    favorite_ids = get_favorite_ids()
 
-    # Phân trang
-    per_page = 9
-    total_pages = math.ceil(len(filtered_foods) / per_page)
-    start = (page - 1) * per_page
-    end = start + per_page
-    foods_to_render = filtered_foods[start:end]
+    # Lọc theo khu vực, từ khóa tìm kiếm và phân trang qua dịch vụ catalogue
+    foods_to_render, total = catalogue_service.query(area, q, page, PER_PAGE)
+    total_pages = math.ceil(total / PER_PAGE)
 
     return render_template(
         "forum.html",
@@ -195,11 +197,11 @@ def account_page():
     user_posts = get_food_posts_by_user(user_id)
     raw_favorites = get_favorites_by_user(user_id) 
 
+    # Tra tất cả món yêu thích một lần qua bản đồ id (O(1) mỗi món)
+    found_foods = catalogue_service.catalogue.get_many(fav['place_id'] for fav in raw_favorites)
+
     enriched_favorites = []
-    for fav in raw_favorites:
-        fav_id = str(fav['place_id'])
-        found_food = next((f for f in foods_data if str(f['id']) == fav_id), None)
-        
+    for fav, found_food in zip(raw_favorites, found_foods):
         if found_food:
             enriched_favorites.append({
                 "place_id": fav['place_id'],
@@ -316,15 +318,122 @@ def api_chat():
         data = request.get_json()
         result = replyToUser(data,makeCollection)
         return jsonify(result)
+    except LLMBusyError as e:
+        print("Chat bị từ chối (hàng đợi LLM đầy):", e)
+        return jsonify({"reply": "Hệ thống đang bận, vui lòng thử lại sau.", "food_data": [], "busy": True}), 429
     except Exception as e:
         print("Lỗi xử lý chat:", e)
         return jsonify({"reply": "Hệ thống đang bận, vui lòng thử lại sau.", "food_data": []}), 500
 
+def sse_event(name, payload):
+    return f"event: {name}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+class ChatStreamClosed(Exception):
+    """Client đã ngắt kết nối: dừng tạo câu trả lời cho stream này"""
+
+@app.route('/api/chat/stream', methods=['POST'])
+def api_chat_stream():
+    """
+    /api/chat qua Server-Sent Events: 'delta' (từng đoạn câu trả lời), 'cards'
+    (danh sách quán/món) rồi 'done' với toàn bộ kết quả, hoặc 'error'.
+    """
+    makeCollection = ""
+    if 'user_id' in session:
+        makeCollection = session.get('username')
+    data = request.get_json(silent=True) or {}
+    events = queue.Queue()
+    closed = threading.Event()
+
+    def emit(name, payload):
+        # Không ai đọc nữa: ném lỗi để replyToUser (và luồng Gemini đang stream) dừng sớm
+        if closed.is_set():
+            raise ChatStreamClosed()
+        events.put((name, payload))
+
+    @copy_current_request_context
+    def run():
+        try:
+            result = replyToUser(data, makeCollection, on_event=emit)
+            emit("done", result)
+        except ChatStreamClosed:
+            pass
+        except LLMBusyError as e:
+            print("Chat bị từ chối (hàng đợi LLM đầy):", e)
+            events.put(("error", {"reply": "Hệ thống đang bận, vui lòng thử lại sau.", "food_data": [], "busy": True}))
+        except Exception as e:
+            print("Lỗi xử lý chat (stream):", e)
+            events.put(("error", {"reply": "Hệ thống đang bận, vui lòng thử lại sau.", "food_data": []}))
+
+    # Luồng riêng: replyToUser tự đưa việc con (geocode, Spoonacular) lên pool chung
+    threading.Thread(target=run, daemon=True).start()
+
+    def stream():
+        try:
+            while True:
+                name, payload = events.get()
+                yield sse_event(name, payload)
+                if name in ("done", "error"):
+                    break
+        finally:
+            # Cả khi client ngắt giữa chừng (GeneratorExit)
+            closed.set()
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/foods')
+def api_foods():
+    """Trả danh sách món theo trang dạng JSON (dùng cho infinite scroll)"""
+    page = request.args.get("page", 1, type=int)
+    per_page = max(1, min(request.args.get("per_page", PER_PAGE, type=int), 50))
+    area = request.args.get("area", "all").strip()
+    q = request.args.get("q", "").strip().lower()
+    open_now = request.args.get("open_now") == "1"
+
+    items, total = catalogue_service.query(area, q, page, per_page, open_at=current_open_at(open_now))
+    return jsonify({
+        "items": items,
+        "total": total,
+        "page": page,
+        "has_more": page * per_page < total
+    })
+
+def metrics_allowed():
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('X-Metrics-Token', ''), token)
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@app.route('/api/metrics')
+def api_metrics():
+    """Thông số vận hành: phiên bản catalogue, thời gian nạp lại, cache, độ trễ và token của Gemini"""
+    if not metrics_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({
+        "catalogue": catalogue_service.stats(),
+        "llm": LLMClient.stats(),
+        "chat_cache": response_cache.stats(),
+        "router": EntityExtractor.stats(),
+        "chat_pipeline": ChatPipeline.stats(),
+        "http": HttpClient.stats(),
+        "nutrition": NutritionStore.get_nutrition_store().stats(),
+        "geocode": Geocoding.get_geocode_cache().stats(),
+        "gazetteer": Gazetteer.get_gazetteer().stats(),
+        "routes": RouteCache.get_route_cache().stats(),
+        "matrix": RouteCache.get_matrix_cache().stats(),
+        "local_router": LocalRouter.stats()
+    })
+
 @app.route('/api/find_path', methods=['POST'])
 def find_path():
     data = request.get_json()
     return Routing.drawPathToDestionation(data)
     
+@app.route('/api/matrix', methods=['POST'])
+def travel_matrix():
+    data = request.get_json()
+    return Routing.travelTimeMatrix(data)
+
 @app.route('/api/geocode', methods=['POST'])
 def get_coordinates(): 
     data = request.get_json()
@@ -387,6 +496,8 @@ def api_scan_money():
         except:
             pass
 
+        if result.get("busy"):
+            return jsonify(result), 429
         return jsonify(result)
 
     return jsonify({"success": False, "error": "Invalid file type"})
@@ -26,6 +26,7 @@ translations = {
         "all_area": "Tất cả khu vực",
         "search_placeholder": "Tìm món hoặc tên quán...",
         "clear": "Xóa",
+        "open_now": "Đang mở cửa",
 
         "trend_food": "Món ăn nổi bật",
         "rcm": "Gợi ý cho bạn",
@@ -205,6 +206,7 @@ translations = {
         "all_area": "All areas",
         "search_placeholder": "Search for food or restaurant...",
         "clear": "Clear",
+        "open_now": "Open now",
 
         "trend_food": "Trending food",
         "rcm": "Recommended for you",
@@ -53,6 +53,8 @@ window.applyFilters = function () {
     const area = document.getElementById('areaSelect').value;
     const q = document.getElementById('searchInput').value.trim();
     const params = new URLSearchParams({ area: area, q: q, page: 1 });
+    const openNow = document.getElementById('openNowToggle');
+    if (openNow && openNow.checked) params.set('open_now', 1);
     window.location.href = "?" + params.toString();
 };
 
@@ -60,6 +62,8 @@ window.applyFilters = function () {
 window.clearFilters = function () {
     document.getElementById('areaSelect').value = 'all';
     document.getElementById('searchInput').value = '';
+    const openNow = document.getElementById('openNowToggle');
+    if (openNow) openNow.checked = false;
     applyFilters();
 };
 
@@ -222,6 +226,7 @@ function displayBotMessage(botText, chatWindow) {
     chatWindow.appendChild(botMessageDiv);
 
     chatWindow.scrollTop = chatWindow.scrollHeight;
+    return botMessageDiv.querySelector('.botchat-btn');
 }
 function displayForError(errMess,chatWindow)
 {
@@ -260,12 +265,6 @@ function removeOutput(container)
     if (menuBox)
         menuBox.remove();
 }
-function displayForChatWindow(text,chatWindow)
-{
-    text = text.replace(/\n/g, '<br>');
-    removeLoadingBubble();
-    displayBotMessage(text, chatWindow);
-}
 function displayForRestaurant(container,data)
 {
     renderFoodCards(container, data.food_data);
@@ -474,54 +473,122 @@ async function sendText(messageText) {
     // Create loading bubble
     createLoadingBubble(chatWindow);
 
-    // DEBUG: Check console (F12) to see if prefix is attached
     let botText = "";
     try {
-        const response = await fetch('/api/chat', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                message: messageText,
-                mode: currentPrefix
-            }) // <--- Send the combined text
-        });
+        await streamChatReply(messageText, chatWindow, "");
+    }
+    catch (err) {
+        console.error("Lỗi khi gọi API:", err);
+        botText = "Xin lỗi, hệ thống đang gặp sự cố. Bạn vui lòng thử lại sau.";
+        removeLoadingBubble();
+        displayForError(botText, chatWindow);
+    }
+    isProcess = false;
+}
 
-        // Nhận dữ liệu JSON trả về
-        const data = await response.json();
-        console.log("DEBUG: toàn bộ data nhận về từ API:", data);
+function renderChatCards(container, data) {
+    if (currentPrefix == "/place_")
+    {
+        displayForRestaurant(container,data);
+    }
+    else if (currentPrefix == "/recipe_")
+    {
+        displayForRecipe(container,data);
+    }
+    else if (currentPrefix == "/plan_")
+    {
+        displayForMenu(container,data);
+    }
+}
 
-        // Lấy nội dung trả lời từ key 'reply' (đã định nghĩa trong app.py)
-        const container = document.getElementById("carousel");
-        
-        if (currentPrefix == "/place_")
-        {
-            displayForChatWindow(data.reply,chatWindow);
-            displayForRestaurant(container,data);
+function parseSSEEvent(raw) {
+    let name = "message";
+    let data = "";
+    raw.split("\n").forEach(line => {
+        if (line.startsWith("event:"))
+            name = line.slice(6).trim();
+        else if (line.startsWith("data:"))
+            data += line.slice(5).trim();
+    });
+    return { name: name, payload: data ? JSON.parse(data) : {} };
+}
+
+// Gọi /api/chat/stream: hiện câu trả lời ngay khi từng đoạn tới, sau đó là các card
+async function streamChatReply(messageText, chatWindow, leadText) {
+    const container = document.getElementById("carousel");
+    const isCulture = !["/place_", "/recipe_", "/plan_"].includes(currentPrefix);
+    const lead = leadText ? leadText + "\n" : "";
+    let replyText = "";
+    let bubble = null;
+
+    function showText(text) {
+        const html = text.replace(/\n/g, '<br>');
+        if (!bubble) {
+            removeLoadingBubble();
+            bubble = displayBotMessage(html, chatWindow);
         }
-        else if (currentPrefix == "/recipe_")
-        {
-            displayForChatWindow(data.reply,chatWindow);
-            displayForRecipe(container,data);
+        else {
+            bubble.innerHTML = html;
+            chatWindow.scrollTop = chatWindow.scrollHeight;
         }
-        else if (currentPrefix == "/plan_")
-        {
-            displayForChatWindow(data.reply,chatWindow);
-            displayForMenu(container,data);
+    }
+
+    function onDelta(payload) {
+        replyText += payload.text;
+        if (isCulture) {
+            showText(lead + "Here is your answer about Vietnamese culture!");
+            displayForCulture(container, { reply: replyText });
         }
-        else
-        {
-            displayForChatWindow("Here is your answer about Vietnamese culture!",chatWindow);
-            displayForCulture(container,data,chatWindow);
+        else {
+            showText(lead + replyText);
         }
+    }
 
+    const response = await fetch('/api/chat/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            message: messageText,
+            mode: currentPrefix
+        })
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`HTTP error! status: ${response.status}`);
     }
-    catch (err) {
-        console.error("Lỗi khi gọi API:", err);
-        botText = "Xin lỗi, hệ thống đang gặp sự cố. Bạn vui lòng thử lại sau.";
-        removeLoadingBubble();
-        displayForError(botText, chatWindow);
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+            const event = parseSSEEvent(buffer.slice(0, sep));
+            buffer = buffer.slice(sep + 2);
+
+            if (event.name === "delta") {
+                onDelta(event.payload);
+            }
+            else if (event.name === "cards") {
+                renderChatCards(container, event.payload);
+            }
+            else if (event.name === "done") {
+                // Không có đoạn nào được stream (vd. câu hỏi rỗng): hiện câu trả lời đầy đủ
+                if (!bubble) {
+                    onDelta({ text: event.payload.reply || "" });
+                    renderChatCards(container, event.payload);
+                }
+                return event.payload;
+            }
+            else if (event.name === "error") {
+                throw new Error(event.payload.reply);
+            }
+        }
     }
-    isProcess = false;
+    throw new Error("Stream ended before the answer was complete");
 }
 
 async function sendImage(text) {
@@ -585,54 +652,11 @@ async function sendImage(text) {
         botText1 = "Xin lỗi, hệ thống gặp sự cố khi gửi ảnh.";
     }
 
-    // 3.2. Gửi câu prompt lên API để xử lý và trả lời
+    // 3.2. Gửi câu prompt lên API để xử lý và trả lời (stream)
     let botText2 = "";
     let messageText = (food_predict || '') + " " + (text || '');
     try {
-        // Gửi yêu cầu POST đến endpoint /api/chat của Flask
-        const response = await fetch('/api/chat', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            // Gửi tin nhắn dưới dạng JSON
-            body: JSON.stringify({
-                message: messageText,
-                mode: currentPrefix
-            })
-        });
-
-        if (!response.ok) {
-            // Xử lý lỗi nếu server trả về 4xx, 5xx
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-
-        // Nhận dữ liệu JSON trả về
-        const data = await response.json();
-        console.log("DEBUG: toàn bộ data nhận về từ API:", data);
-
-        const container = document.getElementById("carousel");
-        if (currentPrefix == "/place_")
-        {
-            displayForChatWindow(botText1+"\n"+data.reply,chatWindow);
-            displayForRestaurant(container,data);
-        }
-        else if (currentPrefix == "/recipe_")
-        {
-            displayForChatWindow(botText1+"\n"+data.reply,chatWindow);
-            displayForRecipe(container,data);
-        }
-        else if (currentPrefix == "/plan_")
-        {
-            displayForChatWindow(botText1+"\n"+data.reply,chatWindow);
-            displayForMenu(container,data);
-        }
-        else
-        {
-            displayForChatWindow(botText1+"\n"+"Here is your answer about Vietnamese culture!",chatWindow);
-            displayForCulture(container,data);
-        }
-
+        await streamChatReply(messageText, chatWindow, botText1);
     }
     catch (err) {
         console.error("Lỗi khi gọi API:", err);
@@ -1079,6 +1103,7 @@ function main() {
         const areaSelect = document.getElementById("areaSelect");
         const searchInput = document.getElementById("searchInput");
         const clearBtn = document.getElementById("clearFilters");
+        const openNowToggle = document.getElementById("openNowToggle");
 
         // === Apply Filters ===
         function applyFilters() {
@@ -1090,6 +1115,9 @@ function main() {
                 q: q,
                 page: 1
             });
+            if (openNowToggle && openNowToggle.checked) {
+                params.set("open_now", 1);
+            }
 
             console.log("Redirect to:", "?" + params.toString());
             window.location.href = "?" + params.toString();
@@ -1100,6 +1128,10 @@ function main() {
             areaSelect.addEventListener("change", applyFilters);
         }
 
+        if (openNowToggle) {
+            openNowToggle.addEventListener("change", applyFilters);
+        }
+
         if (searchInput) {
             searchInput.addEventListener("keydown", (e) => {
                 if (e.key === "Enter") {
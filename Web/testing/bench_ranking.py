@@ -0,0 +1,100 @@
+"""
+Micro-benchmark: per-row ranking loop (old handle_restaurant_recommendation)
+versus the vectorized RestaurantIndex.rank at 2k, 100k and 1M rows.
+
+Run from the Web folder:  python testing/bench_ranking.py
+"""
+import math
+import random
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from RestaurantIndex import RestaurantIndex
+
+USER_LAT, USER_LON = 10.762622, 106.660172
+RADIUS_KM = 10
+TOP_K = 100
+DISHES = ["Phở", "Bún Bò", "Cơm Tấm", "Bánh Mì", "Hủ Tiếu", "Lẩu", "Trà Sữa", "Ốc"]
+STREETS = ["Nguyễn Trãi", "Lê Lợi", "Phan Xích Long", "Cách Mạng Tháng 8", "Võ Văn Tần", "Trần Hưng Đạo"]
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    try:
+        lon1, lat1, lon2, lat2 = map(math.radians, [float(lon1), float(lat1), float(lon2), float(lat2)])
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return 6371 * 2 * math.asin(math.sqrt(a))
+    except (ValueError, TypeError):
+        return 0
+
+
+def make_rows(n, seed=42):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        rows.append({
+            'id': i + 1,
+            'name': f"{rnd.choice(DISHES)} Quán {rnd.randint(1, 500)} - {rnd.choice(STREETS)}",
+            'latitude': rnd.uniform(10.40, 11.00),
+            'longitude': rnd.uniform(106.45, 107.00),
+            'rating': str(round(rnd.uniform(2.0, 5.0), 1)),
+        })
+    return rows
+
+
+def legacy_rank(raw_rows, cuisine):
+    """
+    Copy of the per-row loop: bounding box, float(), haversine() and a dict per candidate.
+    """
+    lat_change = RADIUS_KM / 111.0
+    lon_change = RADIUS_KM / (111.0 * math.cos(math.radians(USER_LAT)))
+
+    results = []
+    search_term = cuisine.lower()
+    for row in raw_rows:
+        if not (USER_LAT - lat_change <= row['latitude'] <= USER_LAT + lat_change
+                and USER_LON - lon_change <= row['longitude'] <= USER_LON + lon_change):
+            continue
+        rest = dict(row)
+        if search_term not in str(rest['name']).lower():
+            continue
+        try:
+            rest['rating'] = float(rest['rating'])
+        except (ValueError, TypeError):
+            rest['rating'] = 0.0
+        rest['distance_km'] = round(haversine(USER_LAT, USER_LON, float(rest['latitude']), float(rest['longitude'])), 2)
+        if rest['distance_km'] <= RADIUS_KM:
+            results.append(rest)
+
+    results.sort(key=lambda x: (-x['rating'], x['distance_km']))
+    return results[:TOP_K]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    print(f"{'rows':>9} | {'loop (ms)':>10} | {'arrays (ms)':>11} | {'speedup':>7} | same order")
+    for n in (2_000, 100_000, 1_000_000):
+        raw_rows = make_rows(n)
+        rows = [dict(r, rating=float(r['rating'])) for r in raw_rows]
+        index = RestaurantIndex(rows)
+        repeat = 5 if n < 1_000_000 else 2
+
+        for cuisine in ("phở", "quán"):
+            loop_ms, expected = timed(lambda: legacy_rank(raw_rows, cuisine), repeat)
+            arr_ms, got = timed(lambda: index.rank(USER_LAT, USER_LON, RADIUS_KM, TOP_K, cuisine), repeat)
+            same = [r['id'] for r in expected] == [r['id'] for r in got]
+            print(f"{n:>9,} | {loop_ms:>10.2f} | {arr_ms:>11.2f} | {loop_ms / arr_ms:>6.1f}x | {same} ({cuisine})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+Shared test fixtures.
+"""
+
+
+class FakeClock:
+    """
+    Callable clock for code that takes clock=time.time / time.monotonic: tests move
+    time forward by changing .now.
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,127 @@
+import unittest
+import sqlite3
+import tempfile
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để import được Catalogue.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Catalogue import CatalogueService
+
+SCHEMA = """
+    CREATE TABLE restaurants (
+        id INTEGER, name TEXT, tags TEXT, location TEXT, rating TEXT,
+        price_range TEXT, opening_hours TEXT, latitude REAL, longitude REAL,
+        local_image_path TEXT, original_image_url TEXT, detail_page_url TEXT
+    )
+"""
+
+
+def create_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE IF EXISTS restaurants")
+    conn.execute(SCHEMA)
+    conn.executemany(
+        "INSERT INTO restaurants (id, name, location, rating, opening_hours, latitude, longitude, local_image_path) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def sample_rows(n_pho=12):
+    rows = []
+    for i in range(n_pho):
+        rows.append((i + 1, f"Phở Bò {i}", f"{i} Nguyễn Trãi, P. 7, Quận 5, TP. HCM", "4.0",
+                     "06:00 - 22:00", 10.75, 106.66, f"foody_images\\{i}.jpg"))
+    rows.append((100, "Cơm Tấm Cali", "1 Lê Lợi, P. Bến Nghé, Quận 1, TP. HCM", "3.8",
+                 None, 10.77, 106.70, None))
+    return rows
+
+
+class TestCatalogueService(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "foody.sqlite")
+        create_db(self.db_path, sample_rows())
+        self.service = CatalogueService(self.db_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_query_pagination(self):
+        items, total = self.service.query("Quận 5", "pho", page=1, per_page=9)
+        self.assertEqual(total, 12)
+        self.assertEqual(len(items), 9)
+
+        items, total = self.service.query("Quận 5", "pho", page=2, per_page=9)
+        self.assertEqual([f["id"] for f in items], [10, 11, 12])
+
+    def test_query_all(self):
+        items, total = self.service.query("all", "", page=1, per_page=50)
+        self.assertEqual(total, 13)
+        self.assertEqual(items[-1]["image"], None)
+        self.assertEqual(items[0]["image"], "foody_images/0.jpg")
+
+    def test_query_open_at(self):
+        """Lúc 23h chỉ còn quán chưa rõ giờ mở cửa (mặc định coi là mở)."""
+        items, total = self.service.query("all", "", open_at=23 * 60)
+        self.assertEqual([f["id"] for f in items], [100])
+        self.assertEqual(self.service.query("all", "", open_at=12 * 60)[1], 13)
+
+    def test_get_many(self):
+        """Tra theo lô bằng id int hoặc chuỗi, giữ đúng thứ tự, None nếu không có."""
+        found = self.service.catalogue.get_many([3, "100", 999, "1"])
+        self.assertEqual([f["id"] if f else None for f in found], [3, 100, None, 1])
+        self.assertEqual(self.service.catalogue.get("100")["name"], "Cơm Tấm Cali")
+
+    def test_paging_reuses_cached_ids(self):
+        """Lật trang trên cùng bộ lọc chỉ cắt danh sách đã lưu, không lọc lại."""
+        self.service.query("Q.5", "phở", page=1)
+        self.service.query("Quận 5", "pho", page=2)
+        stats = self.service.cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+    def test_reload_invalidates_cache(self):
+        self.service.query("Quận 1", "", page=1)
+        create_db(self.db_path, sample_rows(n_pho=2))
+        self.service.reload()
+
+        items, total = self.service.query("Quận 5", "", page=1)
+        self.assertEqual(total, 2)
+        self.assertEqual(len(self.service.cache), 1)
+
+    def test_hot_reload_on_file_change(self):
+        """File SQLite đổi thì catalogue mới được swap vào và listener được gọi."""
+        reloaded = []
+        self.service.add_listener(lambda: reloaded.append(True))
+        self.assertFalse(self.service.check_for_update())
+
+        old_catalogue = self.service.catalogue
+        create_db(self.db_path, sample_rows(n_pho=3))
+        st = os.stat(self.db_path)
+        os.utime(self.db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        self.assertTrue(self.service.check_for_update())
+        self.assertEqual(self.service.version, 2)
+        self.assertEqual(reloaded, [True])
+        self.assertIsNot(self.service.catalogue, old_catalogue)
+        self.assertEqual(self.service.query("Quận 5", "")[1], 3)
+        self.assertEqual(self.service.stats()["size"], 4)
+
+    def test_failed_reload_keeps_snapshot(self):
+        old_catalogue = self.service.catalogue
+        with open(self.db_path, "wb") as f:
+            f.write(b"not a database")
+
+        self.assertFalse(self.service.check_for_update())
+        self.assertIs(self.service.catalogue, old_catalogue)
+        self.assertEqual(self.service.version, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import sqlite3
+import tempfile
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để import được CatalogueETL.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from CatalogueETL import (
+    parse_opening_hours, clean_tags, canonical_image_path,
+    build_catalogue_db, ensure_catalogue_db, catalogue_db_path
+)
+from FoodLoading import load_foods_from_sqlite, load_restaurant_rows
+
+RAW_SCHEMA = """
+    CREATE TABLE restaurants (
+        id INTEGER, name TEXT, tags TEXT, location TEXT, rating TEXT,
+        price_range TEXT, opening_hours TEXT, latitude REAL, longitude REAL,
+        local_image_path TEXT, original_image_url TEXT, detail_page_url TEXT
+    )
+"""
+
+RAW_ROWS = [
+    (1, "Phở Lệ", "Student,\xa0Couple,\xa0Family", "413 Nguyễn Trãi, P. 7, Quận 5, TP. HCM", "4.2",
+     "50.000đ - 90.000đ", "06:00 - 23:00", 10.754, 106.668, "foody_images\\1.jpg", None, None),
+    (2, "Ốc Đêm", "Couple", "13 Đường Số 3, P. Tân Phú, Quận 7, TP. HCM", "N/A",
+     None, "17:00 - 14:00 | 18:00 - 02:00", 10.73, 106.72, None, None, None),
+    (3, "Bánh Mì Chưa Rõ", None, "1 Lê Lợi, P. Bến Nghé, Quận 1, TP. HCM", None,
+     None, None, None, None, None, None, None),
+]
+
+
+def create_raw_db(path, rows=RAW_ROWS):
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE IF EXISTS restaurants")
+    conn.execute(RAW_SCHEMA)
+    conn.executemany("INSERT INTO restaurants VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+class TestCleanupHelpers(unittest.TestCase):
+
+    def test_parse_opening_hours(self):
+        self.assertEqual(parse_opening_hours("07:00 - 14:00 | 16:00 - 21:00"), [(420, 840), (960, 1260)])
+        self.assertEqual(parse_opening_hours("18:00 - 02:00"), [(1080, 120)])
+        self.assertEqual(parse_opening_hours("Updating"), [])
+        self.assertEqual(parse_opening_hours(None), [])
+
+    def test_clean_tags(self):
+        self.assertEqual(clean_tags("Student,\xa0Couple,\xa0Family, Couple"), ["Student", "Couple", "Family"])
+        self.assertEqual(clean_tags(None), [])
+
+    def test_canonical_image_path(self):
+        self.assertEqual(canonical_image_path("foody_images\\a\\1.jpg"), "foody_images/a/1.jpg")
+        self.assertIsNone(canonical_image_path(""))
+
+
+class TestCatalogueETL(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_path = os.path.join(self.tmp.name, "foody.sqlite")
+        create_raw_db(self.raw_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_normalized_schema(self):
+        out_path = ensure_catalogue_db(self.raw_path)
+        self.assertEqual(out_path, catalogue_db_path(self.raw_path))
+
+        conn = sqlite3.connect(out_path)
+        ratings = conn.execute("SELECT id, typeof(rating), rating, district_key FROM restaurants ORDER BY id").fetchall()
+        self.assertEqual(ratings[0], (1, "real", 4.2, "quan 5"))
+        self.assertEqual(ratings[1][1], "null")
+
+        hours = conn.execute("SELECT open_minute, close_minute FROM opening_hours WHERE restaurant_id = 2").fetchall()
+        self.assertEqual(sorted(hours), [(1020, 840), (1080, 120)])
+
+        tags = conn.execute("""
+            SELECT t.name FROM restaurant_tags rt JOIN tags t ON t.id = rt.tag_id
+            WHERE rt.restaurant_id = 1 ORDER BY t.name
+        """).fetchall()
+        self.assertEqual([t[0] for t in tags], ["Couple", "Family", "Student"])
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM tags").fetchone()[0], 3)
+
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn("idx_restaurants_district", indexes)
+        self.assertIn("idx_opening_hours_restaurant", indexes)
+        conn.close()
+
+    def test_rebuild_only_when_raw_changes(self):
+        out_path = ensure_catalogue_db(self.raw_path)
+        built = os.stat(out_path).st_mtime_ns
+        ensure_catalogue_db(self.raw_path)
+        self.assertEqual(os.stat(out_path).st_mtime_ns, built)
+
+        create_raw_db(self.raw_path, RAW_ROWS[:1])
+        st = os.stat(self.raw_path)
+        os.utime(self.raw_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        ensure_catalogue_db(self.raw_path)
+        self.assertEqual(len(load_foods_from_sqlite(self.raw_path)), 1)
+
+    def test_duplicate_ids_are_skipped(self):
+        create_raw_db(self.raw_path, RAW_ROWS + [RAW_ROWS[0]])
+        stats = build_catalogue_db(self.raw_path)
+        self.assertEqual(stats["restaurants"], 3)
+        self.assertEqual(stats["skipped"], 1)
+
+    def test_loaders_read_normalized_db(self):
+        foods = load_foods_from_sqlite(self.raw_path)
+        self.assertEqual(foods[0]["image"], "foody_images/1.jpg")
+        self.assertEqual(foods[0]["rating"], 4.2)
+        self.assertEqual(foods[2]["hours"], "Đang cập nhật")
+
+        rows = load_restaurant_rows(self.raw_path)
+        self.assertEqual(rows[0]["tags"].count(","), 2)
+        self.assertEqual(rows[1]["rating"], 0.0)
+        self.assertEqual(rows[2]["tags"], "Family, Office workers")
+        self.assertIsNone(rows[2]["latitude"])
+
+
+if __name__ == '__main__':
+    unittest.main()
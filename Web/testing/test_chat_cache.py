@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để import được ChatCache.py, Cache.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Cache import TTLCache
+from ChatCache import ResponseCache, normalize_message, entity_key
+from helpers import FakeClock
+
+REPLY = {"reply": "Phở Hòa", "food_data": [{"Name": "Phở Hòa"}]}
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        clock.now = 9
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 10
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expired"], 1)
+
+    def test_lru_cap(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache(maxsize=16, ttl=60, similarity=0.8)
+
+    def test_normalization(self):
+        self.assertEqual(normalize_message("  Phở ngon Quận 1!! "), "pho ngon quan 1")
+        self.assertEqual(
+            entity_key({"cuisine": "Phở", "location": "Quận 1", "budget": None, "open_now": False}),
+            entity_key({"location": "quan 1", "cuisine": "pho"})
+        )
+        self.assertIsNone(entity_key({"location": "None"}))
+
+    def test_exact_hit_returns_copy(self):
+        self.cache.store("", "What is Tết?", {}, REPLY)
+        hit = self.cache.lookup("", "what is tet")
+        self.assertEqual(hit, REPLY)
+        hit["reply"] = "changed"
+        self.assertEqual(self.cache.lookup("", "What is Tết?")["reply"], "Phở Hòa")
+        self.assertIsNone(self.cache.lookup("/place_", "What is Tết?"))
+
+    def test_similar_hit_requires_same_numbers(self):
+        self.cache.store("/place_", "quán phở ngon nhất quận 10", {}, REPLY)
+        self.assertEqual(self.cache.lookup("/place_", "quan pho ngon nhat o quan 10"), REPLY)
+        self.assertIsNone(self.cache.lookup("/place_", "quán phở ngon nhất quận 1"))
+        self.assertEqual(self.cache.stats()["hits"]["similar"], 1)
+
+    def test_similar_hit_requires_same_place(self):
+        places = {"binh thanh": "Bình Thạnh", "binh tan": "Bình Tân", "nguyen hue": "Nguyễn Huệ",
+                  "nguyen trai": "Nguyễn Trãi"}
+
+        def extract(message):
+            entities = {"cuisine": "Phở"} if "pho" in message else {}
+            for phrase, place in places.items():
+                if phrase in message:
+                    entities["location"] = place
+            return entities
+
+        cache = ResponseCache(maxsize=16, ttl=60, similarity=0.8, extract=extract)
+        cache.store("/place_", "quán phở ngon ở quận Bình Tân", {}, REPLY)
+        cache.store("/place_", "pho near Nguyen Trai", {}, REPLY)
+
+        # Chỉ khác tên quận/đường: không dùng chung câu trả lời
+        self.assertIsNone(cache.lookup("/place_", "quán phở ngon ở quận Bình Thạnh"))
+        self.assertIsNone(cache.lookup("/place_", "pho near Nguyen Hue"))
+        self.assertEqual(cache.lookup("/place_", "quan pho ngon o quan binh tan nha"), REPLY)
+        # Không nhận ra địa điểm: bỏ qua tầng gần giống
+        cache.store("/place_", "quán phở ngon ở gần chợ", {}, REPLY)
+        self.assertIsNone(cache.lookup("/place_", "quán phở ngon ở gần chợ lớn"))
+        self.assertEqual(cache.stats()["hits"]["similar"], 1)
+
+    def test_entity_tier_only_for_entity_modes(self):
+        entities = {"location": "Quận 1", "cuisine": "Phở"}
+        self.cache.store("/place_", "best phở in Quận 1", entities, REPLY)
+        self.cache.store("/recipe_", "món nước", {"diet_ingredient": "none"}, REPLY)
+
+        self.assertEqual(self.cache.lookup_entities("/place_", "phở ngon quận 1", entities), REPLY)
+        self.assertIsNone(self.cache.lookup_entities("/recipe_", "món khô", {"diet_ingredient": "none"}))
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"]["entities"], 1)
+        self.assertEqual(stats["misses"], 1)
+        # Câu vừa trúng theo entities được nhớ lại cho lần sau
+        self.assertEqual(self.cache.lookup("/place_", "phở ngon quận 1"), REPLY)
+
+
+if __name__ == '__main__':
+    unittest.main()
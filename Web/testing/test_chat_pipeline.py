@@ -0,0 +1,51 @@
+import unittest
+import sys
+import os
+import time
+
+# Thêm thư mục cha vào sys.path để import được ChatPipeline.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ChatPipeline
+from ChatPipeline import StageTimer
+
+
+class TestStageTimer(unittest.TestCase):
+
+    def setUp(self):
+        ChatPipeline.reset_stats()
+
+    def test_stages_overlap_on_pool(self):
+        """Hai bước 50ms chạy song song: tổng thời gian gần 50ms, không phải 100ms."""
+        timer = StageTimer("place")
+        future = timer.submit("geocode", time.sleep, 0.05)
+        with timer.stage("route"):
+            time.sleep(0.05)
+        future.result()
+
+        breakdown = timer.finish()
+        self.assertGreaterEqual(breakdown["geocode"], 45)
+        self.assertGreaterEqual(breakdown["route"], 45)
+        self.assertLess(breakdown["total"], 95)
+
+    def test_metrics_aggregate_per_pipeline(self):
+        for _ in range(2):
+            timer = StageTimer("culture")
+            with timer.stage("llm"):
+                pass
+            timer.finish()
+
+        stats = ChatPipeline.stats()["culture"]
+        self.assertEqual(stats["stages"]["llm"]["count"], 2)
+        self.assertIn("total", stats["last"])
+
+    def test_submit_propagates_errors(self):
+        timer = StageTimer("place")
+        future = timer.submit("geocode", lambda: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            future.result()
+        self.assertIn("geocode", timer.stages)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch
+
+# --- 1. SETUP ENVIRONMENT ---
+for key in ("GOOGLE_API_KEY", "GEOAPIFY_API_KEY", "SPOONACULAR_API_KEY"):
+    os.environ.setdefault(key, "TEST_KEY")
+
+# Thêm thư mục cha vào sys.path để import được app.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as web
+
+
+class TestChatStream(unittest.TestCase):
+
+    def setUp(self):
+        web.app.config["TESTING"] = True
+        self.client = web.app.test_client()
+
+    def test_stream_sends_deltas_then_done(self):
+        def reply(data, users, on_event):
+            on_event("delta", {"text": "Phở "})
+            on_event("cards", {"food_data": []})
+            return {"reply": "Phở Hòa", "food_data": []}
+
+        with patch.object(web, "replyToUser", side_effect=reply):
+            body = self.client.post("/api/chat/stream", json={"message": "phở", "mode": ""}).get_data(as_text=True)
+
+        self.assertEqual([line for line in body.splitlines() if line.startswith("event:")],
+                         ["event: delta", "event: cards", "event: done"])
+
+    def test_worker_stops_after_client_disconnects(self):
+        first_sent = threading.Event()
+        resume = threading.Event()
+        outcome = []
+
+        def reply(data, users, on_event):
+            on_event("delta", {"text": "Phở "})
+            first_sent.set()
+            resume.wait(5)
+            try:
+                on_event("delta", {"text": "Hòa"})
+                outcome.append("continued")
+            except Exception as e:
+                outcome.append(type(e).__name__)
+                raise
+            return {"reply": "Phở Hòa", "food_data": []}
+
+        with patch.object(web, "replyToUser", side_effect=reply):
+            response = self.client.post("/api/chat/stream", json={"message": "phở", "mode": ""}, buffered=False)
+            chunks = iter(response.response)
+            self.assertIn(b"event: delta", next(chunks))
+            self.assertTrue(first_sent.wait(5))
+            # Client đóng kết nối giữa chừng
+            response.close()
+            resume.set()
+            for _ in range(50):
+                if outcome:
+                    break
+                time.sleep(0.05)
+
+        self.assertEqual(outcome, ["ChatStreamClosed"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,11 @@ import unittest
 import sys
 import os
 import json
+import subprocess
+import tempfile
 from unittest.mock import patch, MagicMock
 from datetime import datetime, time
+from time import perf_counter, sleep
 
 # --- 1. SETUP ENVIRONMENT ---
 os.environ["GOOGLE_API_KEY"] = "TEST_KEY"
@@ -26,6 +29,10 @@ except ImportError:
     sys.path.append(os.path.join(current_dir, '..'))
     import Search_Clone_2
 
+import LLMClient
+from NutritionStore import NutritionStore
+from Geocoding import GeocodeCache
+
 
 # Helper Class for Gemini Responses
 class MockGeminiResponse:
@@ -35,6 +42,23 @@ class MockGeminiResponse:
 
 class TestSearchClone(unittest.TestCase):
 
+    def setUp(self):
+        # Model được cache theo (model, system, schema): xóa để mỗi test nhận mock mới
+        LLMClient.clear_models()
+        Search_Clone_2.response_cache.clear()
+        # Kho dinh dưỡng tạm, không seed, để test không đụng data/nutrition.sqlite
+        self.tmp = tempfile.TemporaryDirectory()
+        self.nutrition_store = NutritionStore(os.path.join(self.tmp.name, "nutrition.sqlite"), seed_path=None)
+        store_patch = patch('Search_Clone_2.get_nutrition_store', return_value=self.nutrition_store)
+        store_patch.start()
+        self.addCleanup(store_patch.stop)
+        # Tương tự cho cache geocode (data/geocode.sqlite)
+        geocode_patch = patch('Search_Clone_2.get_geocode_cache',
+                              return_value=GeocodeCache(os.path.join(self.tmp.name, "geocode.sqlite")))
+        geocode_patch.start()
+        self.addCleanup(geocode_patch.stop)
+        self.addCleanup(self.tmp.cleanup)
+
     # =========================================================================
     # A. HELPER FUNCTIONS
     # =========================================================================
@@ -62,6 +86,8 @@ class TestSearchClone(unittest.TestCase):
             self.assertTrue(Search_Clone_2.is_open_now("09:00 - 22:00"))
             self.assertFalse(Search_Clone_2.is_open_now("17:00 - 22:00"))
             self.assertTrue(Search_Clone_2.is_open_now("08:00 - 02:00"))
+            self.assertFalse(Search_Clone_2.is_open_now("06:00 - 09:30 | 16:00 - 21:00"))
+            self.assertTrue(Search_Clone_2.is_open_now("06:00 - 09:30 | 09:45 - 13:00"))
 
         self.assertTrue(Search_Clone_2.is_open_now("Updating"))
         self.assertTrue(Search_Clone_2.is_open_now(None))
@@ -70,8 +96,16 @@ class TestSearchClone(unittest.TestCase):
     # B. API WRAPPERS
     # =========================================================================
 
-    @patch('Search_Clone_2.requests.get')
-    def test_get_coords_for_location(self, mock_get):
+    @patch('Search_Clone_2.HttpClient.get')
+    @patch('Search_Clone_2.lookup_place', return_value={"name": "quan 1", "kind": "district", "lat": 10.77, "lon": 106.69})
+    def test_get_coords_for_location_from_gazetteer(self, mock_place, mock_get):
+        """Địa danh có trong dữ liệu nhà hàng: không gọi Geoapify."""
+        self.assertEqual(Search_Clone_2.get_coords_for_location("Quận 1"), (10.77, 106.69))
+        mock_get.assert_not_called()
+
+    @patch('Search_Clone_2.HttpClient.get')
+    @patch('Search_Clone_2.lookup_place', return_value=None)
+    def test_get_coords_for_location(self, mock_place, mock_get):
         """Test Geoapify."""
         mock_resp = MagicMock()
         mock_resp.ok = True
@@ -84,13 +118,18 @@ class TestSearchClone(unittest.TestCase):
         self.assertEqual(lat, 10.456)
         self.assertEqual(lon, 106.123)
 
+        # Lần hai (khác hoa/thường, khoảng trắng) lấy từ cache, không gọi Geoapify nữa
+        self.assertEqual(Search_Clone_2.get_coords_for_location(" district 1 "), (10.456, 106.123))
+        mock_get.assert_called_once()
+
     # =========================================================================
     # C. CORE HANDLERS (With Fixes)
     # =========================================================================
 
+    @patch('Search_Clone_2.extract_entities', return_value=None)
     @patch('google.generativeai.GenerativeModel')
-    def test_route_user_request(self, mock_model_cls):
-        """Test Intent Router."""
+    def test_route_user_request(self, mock_model_cls, mock_extract):
+        """Test Intent Router (LLM fallback when the local extractor is not confident)."""
         mock_json = json.dumps({
             "task": "restaurant_recommendation",
             "location": "District 1",
@@ -101,6 +140,16 @@ class TestSearchClone(unittest.TestCase):
         res = Search_Clone_2.route_user_request("Where to eat Pho in District 1?")
         self.assertEqual(res['task'], 'restaurant_recommendation')
 
+    @patch('Search_Clone_2.extract_entities')
+    @patch('google.generativeai.GenerativeModel')
+    def test_route_user_request_local(self, mock_model_cls, mock_extract):
+        """Trích xuất cục bộ đủ tin cậy thì không gọi Gemini."""
+        mock_extract.return_value = {"location": "Quận 1", "cuisine": "Phở"}
+
+        res = Search_Clone_2.route_user_request("Where to eat Pho in District 1?")
+        self.assertEqual(res, {"location": "Quận 1", "cuisine": "Phở"})
+        mock_model_cls.return_value.generate_content.assert_not_called()
+
     @patch('google.generativeai.GenerativeModel')
     def test_handle_culture_query(self, mock_model_cls):
         """Test Culture Query."""
@@ -108,22 +157,18 @@ class TestSearchClone(unittest.TestCase):
         res = Search_Clone_2.handle_culture_query("What is Tet?")
         self.assertEqual(res, "This is Tet.")
 
-    @patch('Search_Clone_2.sqlite3.connect')
+    @patch('Search_Clone_2.rank_restaurants')
     @patch('Search_Clone_2.get_coords_for_location')
     @patch('google.generativeai.GenerativeModel')
-    def test_handle_restaurant_fallback_unknown_location(self, mock_genai, mock_geo, mock_sql):
+    def test_handle_restaurant_fallback_unknown_location(self, mock_genai, mock_geo, mock_rank):
         """
         EDGE CASE: User asks for a location not in DB (e.g., Hanoi or Paris).
         """
         # 1. Mock Geocoding
         mock_geo.return_value = (48.85, 2.35)
 
-        # 2. Mock Database returning EMPTY list
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_sql.return_value = mock_conn
-        mock_conn.cursor.return_value = mock_cursor
-        mock_cursor.fetchall.return_value = []
+        # 2. Mock spatial index returning EMPTY list
+        mock_rank.return_value = []
 
         # 3. Mock AI Response
         fallback_text = "I cannot find restaurants there, but here is some cultural info."
@@ -136,20 +181,15 @@ class TestSearchClone(unittest.TestCase):
         # 5. FIX: Assert result is the string directly (fixing TypeError)
         self.assertEqual(result, fallback_text)
 
-        mock_sql.assert_called()
+        mock_rank.assert_called_with(48.85, 2.35, radius_km=10, k=100, name_term='Pho', open_at=None)
 
-    @patch('Search_Clone_2.sqlite3.connect')
+    @patch('Search_Clone_2.rank_restaurants')
     @patch('Search_Clone_2.get_coords_for_location')
     @patch('google.generativeai.GenerativeModel')
-    def test_handle_restaurant_recommendation(self, mock_genai, mock_geo, mock_sql):
+    def test_handle_restaurant_recommendation(self, mock_genai, mock_geo, mock_rank):
         """Test Restaurant Search (Success Case)."""
         mock_geo.return_value = (10.0, 100.0)
 
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_sql.return_value = mock_conn
-        mock_conn.cursor.return_value = mock_cursor
-
         # FIX: Added 'price_range' and 'tags' to prevent KeyError
         mock_row = {
             'name': 'Test Food Resto',
@@ -157,9 +197,10 @@ class TestSearchClone(unittest.TestCase):
             'opening_hours': '08:00 - 22:00',
             'rating': 5.0,
             'price_range': '50k - 100k',
-            'tags': 'Casual'
+            'tags': 'Casual',
+            'distance_km': 0.0
         }
-        mock_cursor.fetchall.return_value = [mock_row]
+        mock_rank.return_value = [mock_row]
 
         final_json = json.dumps({
             "explanation": "Here is a place",
@@ -173,6 +214,45 @@ class TestSearchClone(unittest.TestCase):
         self.assertEqual(result['text'], "Here is a place")
         self.assertEqual(len(result['restaurants']), 1)
 
+    @patch('Search_Clone_2.rank_restaurants')
+    @patch('Search_Clone_2.get_coords_for_location')
+    @patch('google.generativeai.GenerativeModel')
+    def test_handle_restaurant_uses_speculative_geocode(self, mock_genai, mock_geo, mock_rank):
+        """Router trả về đúng địa điểm đã đoán -> dùng kết quả geocode chạy song song."""
+        mock_rank.return_value = [{'name': 'Phở Hòa', 'rating': 4.5, 'distance_km': 1.0}]
+        mock_genai.return_value.generate_content.return_value = MockGeminiResponse(
+            json.dumps({"explanation": "ok", "recommendations": [{"Name": "Phở Hòa"}]})
+        )
+        future = Search_Clone_2.StageTimer("place").submit("geocode", lambda: (10.77, 106.70))
+
+        entities = {'location': 'quận 1', 'cuisine': 'Phở'}
+        Search_Clone_2.handle_restaurant_recommendation("phở quận 1", entities, speculative=("Quận 1", future))
+
+        mock_geo.assert_not_called()
+        mock_rank.assert_called_with(10.77, 106.70, radius_km=10, k=100, name_term='Phở', open_at=None)
+
+    @patch('Search_Clone_2.get_travel_matrix')
+    def test_rank_by_travel_time(self, mock_matrix):
+        """Quán gần theo đường chim bay nhưng đi lâu hơn bị xếp sau; lỗi ma trận giữ thứ tự cũ."""
+        rows = [
+            {'id': 1, 'latitude': 10.77, 'longitude': 106.70, 'distance_km': 1.0},
+            {'id': 2, 'latitude': 10.78, 'longitude': 106.70, 'distance_km': 2.0},
+            {'id': 3, 'latitude': 10.79, 'longitude': 106.70, 'distance_km': 3.0},
+        ]
+        mock_matrix.return_value = [{'duration_s': 900, 'distance_m': 4000}, None, {'duration_s': 300, 'distance_m': 3500}]
+
+        ranked = Search_Clone_2.rank_by_travel_time(10.76, 106.68, rows, n=2)
+        # Chỉ n quán đầu được tính, trong một lần gọi
+        mock_matrix.assert_called_once_with((10.76, 106.68), [(10.77, 106.70), (10.78, 106.70)])
+        self.assertEqual([r['id'] for r in ranked], [1, 2, 3])
+        self.assertEqual((ranked[0]['distance_km'], ranked[0]['travel_min']), (4.0, 15.0))
+
+        mock_matrix.return_value = [{'duration_s': 900, 'distance_m': 4000}, {'duration_s': 60, 'distance_m': 500}]
+        self.assertEqual([r['id'] for r in Search_Clone_2.rank_by_travel_time(10.76, 106.68, rows, n=2)], [2, 1, 3])
+
+        mock_matrix.side_effect = Exception("ORS down")
+        self.assertEqual(Search_Clone_2.rank_by_travel_time(10.76, 106.68, rows), rows)
+
     @patch('google.generativeai.GenerativeModel')
     @patch('Search_Clone_2.get_nutrition_from_spoonacular')
     def test_handle_daily_menu(self, mock_spoon, mock_genai):
@@ -187,6 +267,40 @@ class TestSearchClone(unittest.TestCase):
         res = Search_Clone_2.handle_daily_menu("Plan diet", {'budget': 'low'})
         self.assertEqual(res['text'], "Healthy plan")
 
+    @patch('Search_Clone_2.get_nutrition_from_spoonacular')
+    def test_fetch_nutrition_deadline(self, mock_spoon):
+        """Lookups run concurrently; a slow dish degrades instead of stalling the plan."""
+        def lookup(name):
+            sleep(0.5 if name == "Bun Bo" else 0.1)
+            return {"Calories": "300 kcal", "Protein": "10 g", "Fat": "5 g"}
+        mock_spoon.side_effect = lookup
+
+        start = perf_counter()
+        res = Search_Clone_2.fetch_nutrition(["Pho", "Com Tam", "Bun Bo"], deadline=0.3)
+        self.assertLess(perf_counter() - start, 0.45)
+        self.assertEqual(res["Pho"]["Calories"], "300 kcal")
+        self.assertEqual(res["Com Tam"]["Protein"], "10 g")
+        self.assertEqual(res["Bun Bo"], {})
+        # Lượt tra cứu chậm vẫn chạy nền và được ghi vào kho khi xong
+        sleep(0.3)
+        self.assertEqual(self.nutrition_store.get("Bun Bo")[1]["Fat"], "5 g")
+
+    @patch('Search_Clone_2.get_nutrition_from_spoonacular')
+    def test_fetch_nutrition_uses_store(self, mock_spoon):
+        """Seeded and remembered dishes never reach Spoonacular; errors are not cached."""
+        self.nutrition_store.put("Phở Bò", {"Calories": "450 kcal", "Protein": "25 g", "Fat": "12 g"}, source="seed")
+        mock_spoon.side_effect = lambda name: None if name == "Pizza Hue" else {}
+
+        res = Search_Clone_2.fetch_nutrition(["Pho Bo", "Pizza Hue", "Bun Cha"])
+        self.assertEqual(res["Pho Bo"]["Calories"], "450 kcal")
+        self.assertEqual(res["Pizza Hue"], {})
+        self.assertEqual(mock_spoon.call_count, 2)
+
+        Search_Clone_2.fetch_nutrition(["Pho Bo", "Pizza Hue", "Bun Cha"])
+        # Chỉ món bị lỗi mạng được hỏi lại
+        self.assertEqual(mock_spoon.call_count, 3)
+        mock_spoon.assert_called_with("Bun Cha")
+
     @patch('google.generativeai.GenerativeModel')
     def test_handle_food_recommendation_foreign_dish(self, mock_genai):
         """EDGE CASE: Foreign food request."""
@@ -204,10 +318,11 @@ class TestSearchClone(unittest.TestCase):
     # D. MAIN INTEGRATION (With Runtime Fix)
     # =========================================================================
 
+    @patch('Search_Clone_2.start_speculative_geocode', return_value=None)
     @patch('Search_Clone_2.saveAnswerForUser')  # FIX: Mock the DB saver
     @patch('Search_Clone_2.route_user_request')
     @patch('Search_Clone_2.handle_restaurant_recommendation')
-    def test_replyToUser_restaurant(self, mock_handler, mock_router, mock_save_db):
+    def test_replyToUser_restaurant(self, mock_handler, mock_router, mock_save_db, mock_speculative):
         """Test replyToUser for restaurant."""
         mock_router.return_value = {"task": "restaurant_recommendation"}
         mock_handler.return_value = {"text": "Found it", "restaurants": []}
@@ -220,6 +335,33 @@ class TestSearchClone(unittest.TestCase):
         mock_handler.assert_called()
         mock_save_db.assert_called()
 
+    @patch('Search_Clone_2.start_speculative_geocode', return_value=None)
+    @patch('Search_Clone_2.saveAnswerForUser')
+    @patch('Search_Clone_2.route_user_request', return_value={"location": "Quận 1"})
+    @patch('Search_Clone_2.get_coords_for_location', return_value=(10.77, 106.70))
+    @patch('Search_Clone_2.rank_restaurants')
+    @patch('google.generativeai.GenerativeModel')
+    def test_replyToUser_streams_events(self, mock_model_cls, mock_rank, mock_geo, mock_router, mock_save_db, mock_speculative):
+        """on_event nhận phần giải thích theo từng đoạn, rồi tới danh sách quán."""
+        mock_rank.return_value = [{"id": 7, "name": "Phở Hòa", "location": "Pasteur", "local_image_path": "foody_images/7.jpg"}]
+        full = json.dumps({"explanation": "Phở Hòa is 1 km away.", "recommendations": [{"id": 7, "Name": "Pho Hoa"}]})
+        chunks = [MagicMock(text=full[i:i + 10]) for i in range(0, len(full), 10)]
+        stream = MagicMock()
+        stream.__iter__.return_value = iter(chunks)
+        stream.text = full
+        mock_model_cls.return_value.generate_content.return_value = stream
+
+        events = []
+        result = Search_Clone_2.replyToUser({"message": "phở quận 1", "mode": "/place_"},
+                                            on_event=lambda name, payload: events.append((name, payload)))
+
+        deltas = [p["text"] for name, p in events if name == "delta"]
+        self.assertGreater(len(deltas), 1)
+        self.assertEqual("".join(deltas), "Phở Hòa is 1 km away.")
+        self.assertEqual(events[-1][0], "cards")
+        self.assertEqual(events[-1][1]["food_data"][0]["img"], "foody_images/7.jpg")
+        self.assertEqual(result["reply"], "Phở Hòa is 1 km away.")
+
     @patch('Search_Clone_2.saveAnswerForUser')  # FIX: Mock the DB saver
     @patch('Search_Clone_2.route_user_request')
     @patch('Search_Clone_2.handle_culture_query')
@@ -235,6 +377,45 @@ class TestSearchClone(unittest.TestCase):
         self.assertEqual(result['reply'], "Cultural Info")
         mock_save_db.assert_called()
 
+    @patch('Search_Clone_2.start_speculative_geocode', return_value=None)
+    @patch('Search_Clone_2.saveAnswerForUser')
+    @patch('Search_Clone_2.route_user_request')
+    @patch('Search_Clone_2.handle_restaurant_recommendation')
+    def test_replyToUser_uses_response_cache(self, mock_handler, mock_router, mock_save_db, mock_speculative):
+        """Câu hỏi lặp lại không gọi Gemini lần nữa; cùng entities thì bỏ qua handler."""
+        mock_router.return_value = {"location": "Quận 1", "cuisine": "Phở"}
+        mock_handler.return_value = {"text": "Found it", "restaurants": [{"Name": "Phở Hòa"}]}
+
+        first = Search_Clone_2.replyToUser({"message": "best phở in Quận 1", "mode": "/place_"})
+        again = Search_Clone_2.replyToUser({"message": "Best Pho in quan 1!", "mode": "/place_"})
+        self.assertEqual(again, first)
+        self.assertEqual(mock_router.call_count, 1)
+        self.assertEqual(mock_handler.call_count, 1)
+
+        mock_router.return_value = {"location": "quận 1", "cuisine": "pho"}
+        other = Search_Clone_2.replyToUser({"message": "phở ngon quận 1", "mode": "/place_"})
+        self.assertEqual(other["food_data"], [{"Name": "Phở Hòa"}])
+        self.assertEqual(mock_router.call_count, 2)
+        self.assertEqual(mock_handler.call_count, 1)
+        self.assertEqual(mock_save_db.call_count, 3)
+
+
+class TestImportWithoutOrsKey(unittest.TestCase):
+
+    def test_chatbot_imports_without_ors_key(self):
+        """Client ORS chỉ được tạo khi tính đường: chatbot vẫn import được khi thiếu ORS_API_KEY."""
+        web_dir = os.path.abspath(os.path.join(current_dir, '..'))
+        env = {k: v for k, v in os.environ.items() if k != "ORS_API_KEY"}
+        env["PYTHONPATH"] = web_dir
+        # Chạy ngoài thư mục Web để load_dotenv không đọc lại khóa từ .env
+        with tempfile.TemporaryDirectory() as tmp:
+            result = subprocess.run(
+                [sys.executable, "-c", "import Search_Clone_2, Routing; print(Routing.ors_client)"],
+                cwd=tmp, env=env, capture_output=True, text=True, timeout=120
+            )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "None")
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -19,14 +19,22 @@ except ImportError:
     sys.path.append(os.path.join(current_dir, '..'))
     import Currency
 
+import LLMClient
+import HttpClient
+from google.api_core.exceptions import TooManyRequests
+
 
 class TestCurrency(unittest.TestCase):
 
+    def setUp(self):
+        LLMClient.clear_models()
+        Currency._last_rates.clear()
+
     # =========================================================================
     # A. TEST EXCHANGE RATE API (get_exchange_rate)
     # =========================================================================
 
-    @patch('Currency.requests.get')
+    @patch('Currency.HttpClient.get')
     def test_get_exchange_rate_success(self, mock_get):
         """Test successful API call."""
         # 1. Setup Mock Response
@@ -46,9 +54,9 @@ class TestCurrency(unittest.TestCase):
         self.assertEqual(result['name'], "United States Dollar")
         # Ensure URL was constructed correctly with the dummy key
         expected_url = "https://v6.exchangerate-api.com/v6/TEST_CURRENCY_KEY/pair/USD/VND"
-        mock_get.assert_called_with(expected_url)
+        mock_get.assert_called_with(expected_url, label="exchangerate")
 
-    @patch('Currency.requests.get')
+    @patch('Currency.HttpClient.get')
     def test_get_exchange_rate_api_error(self, mock_get):
         """Test API returning an error (e.g., invalid key)."""
         mock_response = MagicMock()
@@ -63,7 +71,7 @@ class TestCurrency(unittest.TestCase):
         self.assertFalse(result['success'])
         self.assertEqual(result['error'], "invalid-key")
 
-    @patch('Currency.requests.get')
+    @patch('Currency.HttpClient.get')
     def test_get_exchange_rate_exception(self, mock_get):
         """Test network exception (e.g., no internet)."""
         mock_get.side_effect = Exception("Network Down")
@@ -73,6 +81,20 @@ class TestCurrency(unittest.TestCase):
         self.assertFalse(result['success'])
         self.assertIn("Network Down", result['error'])
 
+    @patch('Currency.HttpClient.get')
+    def test_get_exchange_rate_falls_back_to_last_rate(self, mock_get):
+        """API lỗi (hoặc breaker mở) thì dùng tỷ giá lấy được gần nhất."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"result": "success", "conversion_rate": 25000.0}
+        mock_get.return_value = mock_response
+        Currency.get_exchange_rate("USD")
+
+        mock_get.side_effect = HttpClient.CircuitOpenError("exchangerate circuit is open")
+        result = Currency.get_exchange_rate("USD")
+        self.assertTrue(result['success'])
+        self.assertEqual(result['rate'], 25000.0)
+        self.assertTrue(result['stale'])
+
     # =========================================================================
     # B. TEST CALCULATION LOGIC (calculate_conversion)
     # =========================================================================
@@ -144,10 +166,11 @@ class TestCurrency(unittest.TestCase):
     # C. TEST GEMINI VISION (scan_money_image)
     # =========================================================================
 
+    @patch('LLMClient.genai.GenerativeModel')
     @patch('Currency.genai')
-    def test_scan_money_success(self, mock_genai):
+    def test_scan_money_success(self, mock_genai, mock_model_cls):
         """Test successfully analyzing a single bill."""
-        mock_model_instance = mock_genai.GenerativeModel.return_value
+        mock_model_instance = mock_model_cls.return_value
 
         mock_json_response = json.dumps({
             "amount": 100,
@@ -168,10 +191,11 @@ class TestCurrency(unittest.TestCase):
 
         mock_genai.upload_file.assert_called_with(path="dummy_path.jpg", display_name="User Money Upload")
 
+    @patch('LLMClient.genai.GenerativeModel')
     @patch('Currency.genai')
-    def test_scan_money_multiple_items_detected(self, mock_genai):
+    def test_scan_money_multiple_items_detected(self, mock_genai, mock_model_cls):
         """Test strict mode: Reject if multiple items are found."""
-        mock_model_instance = mock_genai.GenerativeModel.return_value
+        mock_model_instance = mock_model_cls.return_value
 
         mock_json_response = json.dumps({
             "amount": 200,
@@ -188,10 +212,11 @@ class TestCurrency(unittest.TestCase):
         self.assertFalse(result['success'])
         self.assertIn("Detected 2 items", result['error'])
 
+    @patch('LLMClient.genai.GenerativeModel')
     @patch('Currency.genai')
-    def test_scan_money_gemini_error(self, mock_genai):
+    def test_scan_money_gemini_error(self, mock_genai, mock_model_cls):
         """Test when Gemini throws an exception."""
-        mock_model_instance = mock_genai.GenerativeModel.return_value
+        mock_model_instance = mock_model_cls.return_value
         mock_model_instance.generate_content.side_effect = Exception("API Overloaded")
 
         result = Currency.scan_money_image("dummy_path.jpg")
@@ -199,6 +224,31 @@ class TestCurrency(unittest.TestCase):
         self.assertFalse(result['success'])
         self.assertEqual(result['error'], "Could not recognize money in this image.")
 
+    @patch('LLMClient.genai.GenerativeModel')
+    @patch('Currency.genai')
+    def test_scan_money_upload_error(self, mock_genai, mock_model_cls):
+        """Upload lỗi thì trả lỗi rõ ràng, không gọi tới bước nhận dạng."""
+        mock_genai.upload_file.side_effect = Exception("Upload failed")
+
+        result = Currency.scan_money_image("dummy_path.jpg")
+
+        self.assertFalse(result['success'])
+        self.assertNotIn('busy', result)
+        self.assertIn("upload", result['error'])
+        mock_model_cls.return_value.generate_content.assert_not_called()
+
+    @patch('LLMClient.genai.GenerativeModel')
+    @patch('Currency.genai')
+    def test_scan_money_upload_busy(self, mock_genai, mock_model_cls):
+        """Gemini trả 429 (hoặc breaker mở) khi upload: báo bận như bước nhận dạng."""
+        mock_genai.upload_file.side_effect = TooManyRequests("quota")
+
+        result = Currency.scan_money_image("dummy_path.jpg")
+
+        self.assertFalse(result['success'])
+        self.assertTrue(result['busy'])
+        mock_model_cls.return_value.generate_content.assert_not_called()
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,76 @@
+import unittest
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để import được EntityExtractor.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from EntityExtractor import EntityExtractor
+
+DIET_KEYS = ["vegan", "vegetarian", "halal", "hindu", "kosher"]
+
+
+def make_rows():
+    rows = []
+    dishes = ["Phở Bò", "Cơm Tấm", "Bún Bò Huế", "Bánh Mì"]
+    owners = ["Lan", "Hòa", "Thành", "Mai", "Tư", "Út"]
+    places = [
+        ("413 Nguyễn Trãi", "P. 7, Quận 5"),
+        ("13 Lê Lợi", "P. Bến Nghé, Quận 1"),
+        ("28 Phan Xích Long", "P. 2, Quận Phú Nhuận"),
+        ("5 Đinh Bộ Lĩnh", "P. 26, Quận Bình Thạnh"),
+    ]
+    rid = 1
+    for dish in dishes:
+        for owner in owners:
+            street, area = places[rid % len(places)]
+            rows.append({"id": rid, "name": f"{dish} {owner} - {street.split(' ', 1)[1]}",
+                         "location": f"{street}, {area}, TP. HCM"})
+            rid += 1
+    return rows
+
+
+class TestEntityExtractor(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.extractor = EntityExtractor(make_rows(), DIET_KEYS)
+
+    def test_lexicons_from_catalogue(self):
+        self.assertEqual(self.extractor.dishes["pho"], "Phở")
+        self.assertEqual(self.extractor.dishes["bun bo hue"], "Bún Bò Huế")
+        # Tên chủ quán và tên đường đứng sau món, không phải món ăn
+        self.assertNotIn("lan", self.extractor.dishes)
+        self.assertNotIn("nguyen trai", self.extractor.dishes)
+        self.assertEqual(self.extractor.streets["nguyen trai"], "Nguyễn Trãi")
+        self.assertEqual(self.extractor.districts["phu nhuan"], "Phú Nhuận")
+
+    def test_district_and_dish_is_confident(self):
+        for prompt in ("best phở in Quận 1", "phở ngon q.1", "Where to eat Pho in District 1?"):
+            entities, confident = self.extractor.extract(prompt)
+            self.assertTrue(confident, prompt)
+            self.assertEqual(entities, {"cuisine": "Phở", "location": "Quận 1"})
+
+    def test_street_budget_diet_open_now(self):
+        entities, confident = self.extractor.extract("cơm tấm halal gần Nguyễn Trãi quận 5 dưới 50k đang mở")
+        self.assertTrue(confident)
+        self.assertEqual(entities["location"], "Nguyễn Trãi, Quận 5")
+        self.assertEqual(entities["cuisine"], "Cơm Tấm")
+        self.assertEqual(entities["budget"], "duoi 50k")
+        self.assertEqual(entities["diet_ingredient"], "halal")
+        self.assertTrue(entities["open_now"])
+
+        entities, _ = self.extractor.extract("bún bò huế Phú Nhuận giá rẻ")
+        self.assertEqual(entities["location"], "Phú Nhuận")
+        self.assertEqual(entities["budget"], "cheap")
+
+    def test_low_confidence_falls_back(self):
+        self.assertFalse(self.extractor.extract("What is Tết?")[1])
+        self.assertFalse(self.extractor.extract("quán ngon quận 1 cho Lan")[1])
+        self.assertFalse(self.extractor.extract("bánh mì quận 1 không phải Huỳnh Hoa")[1])
+        # Quận không có trong dữ liệu
+        self.assertFalse(self.extractor.extract("phở quận 12")[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,10 +8,13 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import FoodRecognition
+import LLMClient
 
 class TestFoodRecognition(unittest.TestCase):
 
     def setUp(self):
+        LLMClient.clear_models()
+
         # Tạo Flask app context
         self.app = Flask(__name__)
         self.ctx = self.app.app_context()
@@ -29,7 +32,7 @@ class TestFoodRecognition(unittest.TestCase):
         self.ctx.pop()
 
     # Hàm giả lập (Side Effect) cho model.generate_content
-    def mock_generate_content_side_effect(self, contents):
+    def mock_generate_content_side_effect(self, contents, **kwargs):
         
         input_image_bytes = contents[1]['data']
         
@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để import được Gazetteer.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Gazetteer import Gazetteer, AddressMap, address_key, parse_address
+
+ROWS = [
+    {"location": "833A Tạ Quang Bửu, P. 5, Quận 8, TP. HCM", "latitude": 10.736, "longitude": 106.669},
+    {"location": "48F/2A Hoàng Sĩ Khải, P. 14, Quận 8, TP. HCM", "latitude": 10.737, "longitude": 106.644},
+    {"location": "12 Lê Lợi, P. Bến Thành, Quận 1, TP. HCM", "latitude": 10.772, "longitude": 106.698},
+    {"location": "40 Lê Lợi, P. Bến Thành, Quận 1, TP. HCM", "latitude": 10.774, "longitude": 106.700},
+    {"location": "Tầng 3, Aeon Mall, 1 Đường Số 17A, P. 5, Quận Tân Bình, TP. HCM", "latitude": 10.80, "longitude": 106.65},
+]
+
+
+class TestGazetteer(unittest.TestCase):
+
+    def setUp(self):
+        self.gazetteer = Gazetteer(ROWS)
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address(ROWS[0]["location"]), ("ta quang buu", "phuong 5", "quan 8"))
+        self.assertEqual(parse_address(ROWS[4]["location"]), ("duong so 17a", "phuong 5", "tan binh"))
+        self.assertEqual(parse_address("Q.1, Ho Chi Minh City"), (None, None, "quan 1"))
+
+    def test_exact_lookups_use_centroids(self):
+        district = self.gazetteer.lookup("District 8")
+        self.assertEqual((district["kind"], district["match"], district["count"]), ("district", "exact", 2))
+        self.assertAlmostEqual(district["lat"], 10.7365)
+
+        self.assertEqual(self.gazetteer.lookup("Bến Thành")["kind"], "ward")
+        self.assertAlmostEqual(self.gazetteer.lookup("le loi, quan 1")["lon"], 106.699)
+        # 'Phường 5' có ở hai quận: chỉ tìm được khi có quận đi kèm
+        self.assertEqual(self.gazetteer.lookup("Phường 5, Quận 8")["lat"], 10.736)
+        self.assertIsNone(self.gazetteer.lookup("Phường 5"))
+
+    def test_prefix_fuzzy_and_miss(self):
+        self.assertEqual(self.gazetteer.lookup("ben tha")["match"], "prefix")
+        self.assertEqual(self.gazetteer.lookup("Hoàng Sỹ Khải")["name"], "hoang si khai")
+        self.assertEqual(self.gazetteer.lookup("Hoàng Sỹ Khải")["match"], "fuzzy")
+        self.assertIsNone(self.gazetteer.lookup("Paris"))
+        stats = self.gazetteer.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["places"]["district"], 3)
+
+
+    def test_numbers_never_change_in_prefix_or_fuzzy(self):
+        gazetteer = Gazetteer(ROWS + [
+            {"location": "10 Đường Số 7, P. 3, Quận 3, TP. HCM", "latitude": 10.78, "longitude": 106.68},
+            {"location": "25 Hậu Giang, Quận 6, TP. HCM", "latitude": 10.75, "longitude": 106.63},
+        ])
+        self.assertEqual(gazetteer.lookup("Quận 6")["match"], "exact")
+        self.assertEqual(gazetteer.lookup("Phường 3, Quận 3")["name"], "phuong 3 quan 3")
+        # Quận/đường/phường mang số khác không có trong dữ liệu: để Geoapify tìm
+        for text in ("Quận 14", "Q.16", "District 13", "Đường số 70", "Phường 3 Quận 13"):
+            self.assertIsNone(gazetteer.lookup(text), text)
+
+
+class TestAddressMap(unittest.TestCase):
+
+    def setUp(self):
+        self.addresses = AddressMap(ROWS)
+
+    def test_exact_and_normalized(self):
+        self.assertEqual(address_key("833A Ta Quang Buu, Phường 5, Q.8"), address_key(ROWS[0]["location"]))
+        self.assertEqual(self.addresses.lookup(ROWS[2]["location"]), (10.772, 106.698))
+        self.assertEqual(self.addresses.lookup("12 LE LOI , p. ben thanh, District 1"), (10.772, 106.698))
+
+    def test_fuzzy_keeps_house_number(self):
+        self.assertEqual(self.addresses.lookup("48F/2A Hoang Sy Khai, P14, Q8"), (10.737, 106.644))
+        # Chuỗi gần giống nhưng khác số nhà: không được trả về nhà hàng bên cạnh
+        self.assertEqual(self.addresses.lookup("14 Lê Lợi, P. Bến Thành, Quận 1"), (None, None))
+        self.assertEqual(self.addresses.lookup("skibidi dop dop"), (None, None))
+        stats = self.addresses.stats()
+        self.assertEqual((stats["fuzzy"], stats["misses"]), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
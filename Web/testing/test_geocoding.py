@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import MagicMock
+
+# Thêm thư mục cha vào sys.path để import được Geocoding.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Geocoding import GeocodeCache, address_key
+from helpers import FakeClock
+
+
+class TestGeocodeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "geocode.sqlite")
+        self.clock = FakeClock(1000.0)
+        self.cache = GeocodeCache(self.db_path, ttl=100, miss_ttl=10, clock=self.clock)
+
+    def test_hit_by_normalized_address_and_persisted(self):
+        fetch = MagicMock(return_value=(10.77, 106.70))
+        self.assertEqual(address_key("  Quận 1, TP.HCM "), address_key("quan 1 tp hcm"))
+
+        self.assertEqual(self.cache.resolve("goong", "Quận 1", fetch), (10.77, 106.70))
+        self.assertEqual(self.cache.resolve("goong", " quan 1 ", fetch), (10.77, 106.70))
+        fetch.assert_called_once_with("Quận 1")
+
+        # Tiến trình mới: bộ nhớ trống nhưng SQLite vẫn còn
+        fresh = GeocodeCache(self.db_path, ttl=100, miss_ttl=10, clock=self.clock)
+        self.assertEqual(fresh.resolve("goong", "Quận 1", fetch), (10.77, 106.70))
+        fetch.assert_called_once()
+        self.assertEqual(fresh.stats()["db_hits"], 1)
+
+        # Provider khác là một khóa khác
+        self.cache.resolve("geoapify", "Quận 1", fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["memory_hits"], 1)
+        self.assertEqual(stats["upstream_calls"], {"goong": 1, "geoapify": 1})
+        self.assertEqual(stats["rows"], 2)
+
+    def test_negative_result_cached_until_miss_ttl(self):
+        fetch = MagicMock(return_value=None)
+        self.assertIsNone(self.cache.resolve("goong", "xyz", fetch))
+        self.assertIsNone(self.cache.resolve("goong", "xyz", fetch))
+        fetch.assert_called_once()
+        self.assertEqual(self.cache.stats()["negative_hits"], 1)
+
+        self.clock.now += 11
+        fetch.return_value = (10.0, 106.0)
+        self.assertEqual(self.cache.resolve("goong", "xyz", fetch), (10.0, 106.0))
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_errors_not_cached_and_ttl_expiry(self):
+        fetch = MagicMock(side_effect=ConnectionError("down"))
+        with self.assertRaises(ConnectionError):
+            self.cache.resolve("geoapify", "Bến Thành", fetch)
+        self.assertEqual(self.cache.stats()["upstream_errors"], {"geoapify": 1})
+
+        fetch.side_effect = None
+        fetch.return_value = (10.77, 106.69)
+        self.assertEqual(self.cache.resolve("geoapify", "Bến Thành", fetch), (10.77, 106.69))
+
+        self.clock.now += 101
+        self.cache.clear_memory()
+        self.cache.resolve("geoapify", "Bến Thành", fetch)
+        self.assertEqual(fetch.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
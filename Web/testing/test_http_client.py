@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import time
+
+import requests
+
+# Thêm thư mục cha vào sys.path để import được HttpClient.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import HttpClient
+from HttpClient import CircuitBreaker, CircuitOpenError
+from helpers import FakeClock
+
+
+def make_response(status):
+    response = MagicMock()
+    response.status_code = status
+    response.ok = status < 400
+    return response
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_open_half_open_close(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.on_failure()
+        self.assertTrue(breaker.allow())
+        breaker.on_failure()
+        self.assertFalse(breaker.allow())
+
+        # Hết thời gian chờ: chỉ một lượt thử được đi qua
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.on_failure()
+        self.assertEqual(breaker.stats()["state"], "open")
+
+        clock.now = 20
+        self.assertTrue(breaker.allow())
+        breaker.on_success()
+        self.assertEqual(breaker.stats(), {"opened": 2, "short_circuited": 2, "state": "closed", "failures": 0})
+
+
+class TestResilientCalls(unittest.TestCase):
+
+    def setUp(self):
+        HttpClient.reset_breakers()
+        HttpClient.reset_stats()
+        sleep_patch = patch('HttpClient.time.sleep')
+        sleep_patch.start()
+        self.addCleanup(sleep_patch.stop)
+
+    @patch('HttpClient.get_session')
+    def test_get_retries_transient_status(self, mock_session):
+        mock_session.return_value.get.side_effect = [make_response(503), make_response(200)]
+        response = HttpClient.get("https://api.example.com", label="geoapify")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(HttpClient.stats()["calls"]["geoapify"]["retries"], 1)
+        mock_session.return_value.get.assert_called_with(
+            "https://api.example.com", params=None, timeout=HttpClient.DEFAULT_TIMEOUT)
+
+    def test_breaker_opens_and_short_circuits(self):
+        fn = MagicMock(side_effect=requests.ConnectionError("down"))
+        threshold = HttpClient.get_breaker("goong").failure_threshold
+        while fn.call_count < threshold:
+            with self.assertRaises(requests.ConnectionError):
+                HttpClient.call("goong", fn)
+
+        calls = fn.call_count
+        with self.assertRaises(CircuitOpenError):
+            HttpClient.call("goong", fn)
+        self.assertEqual(fn.call_count, calls)
+        self.assertEqual(HttpClient.stats()["breakers"]["goong"]["state"], "open")
+
+    def test_non_transient_error_not_retried(self):
+        fn = MagicMock(side_effect=ValueError("bad address"))
+        with self.assertRaises(ValueError):
+            HttpClient.call("goong", fn)
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(HttpClient.get_breaker("goong").failures, 0)
+
+    def test_hedge_returns_faster_copy(self):
+        delays = [0.5, 0.0]
+
+        def slow_then_fast():
+            time_to_wait = delays.pop(0)
+            deadline = time.monotonic() + time_to_wait
+            while time.monotonic() < deadline:
+                pass
+            return "fast" if time_to_wait == 0 else "slow"
+
+        start = time.monotonic()
+        self.assertEqual(HttpClient.call("geoapify", slow_then_fast, hedge_after=0.05), "fast")
+        self.assertLess(time.monotonic() - start, 0.4)
+        stats = HttpClient.stats()["calls"]["geoapify"]
+        self.assertEqual((stats["hedged"], stats["hedge_wins"]), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import json
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để import được LLMClient.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import HttpClient
+import LLMClient
+import LLMScheduler
+
+SCHEMA = {"type": "OBJECT", "properties": {"name": {"type": "STRING"}}}
+
+
+class TestLLMClient(unittest.TestCase):
+
+    def setUp(self):
+        LLMClient.clear_models()
+        LLMClient.reset_stats()
+        LLMScheduler.reset_schedulers()
+        HttpClient.reset_breakers()
+
+    @patch('LLMClient.genai.GenerativeModel')
+    def test_model_reused_per_key(self, mock_model_cls):
+        """Cùng (model, system, schema) thì chỉ tạo model một lần."""
+        first = LLMClient.get_model(schema=SCHEMA)
+        again = LLMClient.get_model(schema={"properties": {"name": {"type": "STRING"}}, "type": "OBJECT"})
+        self.assertIs(first, again)
+        self.assertEqual(mock_model_cls.call_count, 1)
+
+        LLMClient.get_model(system="You are a guide.")
+        LLMClient.get_model()
+        self.assertEqual(mock_model_cls.call_count, 3)
+
+        kwargs = mock_model_cls.call_args_list[0].kwargs
+        self.assertEqual(kwargs["generation_config"]["response_schema"], SCHEMA)
+
+    @patch('LLMClient.genai.GenerativeModel')
+    def test_generate_records_metrics(self, mock_model_cls):
+        response = MagicMock()
+        response.usage_metadata.prompt_token_count = 120
+        response.usage_metadata.candidates_token_count = 30
+        mock_model_cls.return_value.generate_content.return_value = response
+
+        LLMClient.generate(["hi"], label="router")
+        LLMClient.generate(["hi again"], label="router")
+
+        stats = LLMClient.stats()["calls"]["router"]
+        self.assertEqual(stats["calls"], 2)
+        self.assertEqual(stats["prompt_tokens"], 240)
+        self.assertEqual(stats["output_tokens"], 60)
+        self.assertEqual(mock_model_cls.call_count, 1)
+
+    @patch('LLMClient.genai.GenerativeModel')
+    def test_generate_error_is_counted_and_raised(self, mock_model_cls):
+        mock_model_cls.return_value.generate_content.side_effect = Exception("API Overloaded")
+
+        with self.assertRaises(Exception):
+            LLMClient.generate(["hi"], label="culture")
+        self.assertEqual(LLMClient.stats()["calls"]["culture"]["errors"], 1)
+
+
+    @patch('LLMClient.genai.GenerativeModel')
+    def test_generate_streams_chunks(self, mock_model_cls):
+        chunks = [MagicMock(text="Phở "), MagicMock(text="là món nước")]
+        stream = MagicMock()
+        stream.__iter__.return_value = iter(chunks)
+        stream.text = "Phở là món nước"
+        mock_model_cls.return_value.generate_content.return_value = stream
+
+        received = []
+        response = LLMClient.generate(["Phở là gì?"], label="culture", on_text=received.append)
+
+        self.assertEqual(received, ["Phở ", "là món nước"])
+        self.assertEqual(response.text, "Phở là món nước")
+        mock_model_cls.return_value.generate_content.assert_called_with(
+            ["Phở là gì?"], stream=True, request_options={"timeout": LLMClient.LLM_TIMEOUT})
+        self.assertEqual(LLMClient.stats()["calls"]["culture"]["streams"], 1)
+
+    def test_json_field_stream(self):
+        """Chỉ giá trị 'explanation' được chuyển tiếp, kể cả khi escape bị cắt giữa hai chunk."""
+        full = json.dumps({"explanation": 'Quán "ngon"\nở Q1 😀', "recommendations": [{"Name": "Phở"}]})
+        received = []
+        stream = LLMClient.JsonFieldStream("explanation", received.append)
+        for i in range(0, len(full), 3):
+            stream(full[i:i + 3])
+        self.assertEqual("".join(received), 'Quán "ngon"\nở Q1 😀')
+        self.assertGreater(len(received), 1)
+
+    @patch('LLMClient.genai.GenerativeModel')
+    def test_quota_error_becomes_busy(self, mock_model_cls):
+        from google.api_core.exceptions import ResourceExhausted
+        mock_model_cls.return_value.generate_content.side_effect = ResourceExhausted("quota")
+
+        with self.assertRaises(LLMClient.LLMBusyError):
+            LLMClient.generate(["hi"], label="router")
+        scheduler = LLMClient.stats()["schedulers"][LLMClient.DEFAULT_MODEL]
+        self.assertEqual(scheduler["throttled"], 1)
+        self.assertEqual(scheduler["in_flight"], 0)
+
+    @patch('LLMClient.genai.GenerativeModel')
+    def test_transient_error_retried(self, mock_model_cls):
+        from google.api_core.exceptions import ServiceUnavailable
+        response = MagicMock(text="ok")
+        mock_model_cls.return_value.generate_content.side_effect = [ServiceUnavailable("overloaded"), response]
+
+        with patch('HttpClient.time.sleep'):
+            self.assertIs(LLMClient.generate(["hi"], label="router"), response)
+        self.assertEqual(HttpClient.stats()["calls"]["gemini:router"]["retries"], 1)
+        self.assertEqual(HttpClient.stats()["breakers"]["gemini"]["state"], "closed")
+
+    def test_open_breaker_is_busy(self):
+        breaker = HttpClient.get_breaker("gemini")
+        for _ in range(breaker.failure_threshold):
+            breaker.on_failure()
+        with self.assertRaises(LLMClient.LLMBusyError):
+            LLMClient.generate(["hi"], label="culture")
+
+
+if __name__ == '__main__':
+    unittest.main()
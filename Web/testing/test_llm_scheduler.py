@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Thêm thư mục cha vào sys.path để import được LLMScheduler.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from LLMScheduler import ModelScheduler, TokenBucket, LLMBusyError, PRIORITY_INTERACTIVE, PRIORITY_IMAGE
+from helpers import FakeClock
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+        self.assertEqual(bucket.try_take(), 0)
+        self.assertEqual(bucket.try_take(), 0)
+        self.assertAlmostEqual(bucket.try_take(), 0.5)
+        clock.now = 0.5
+        self.assertEqual(bucket.try_take(), 0)
+
+        bucket.drain()
+        clock.now = 10
+        self.assertEqual(bucket.tokens, 0)
+        self.assertEqual(bucket.try_take(), 0)
+
+
+class TestModelScheduler(unittest.TestCase):
+
+    def test_queue_deadline_rejects(self):
+        scheduler = ModelScheduler(max_concurrency=1, rpm=6000, burst=10, queue_timeout=0.05)
+        with scheduler.slot():
+            with self.assertRaises(LLMBusyError):
+                with scheduler.slot():
+                    pass
+        stats = scheduler.stats()
+        self.assertEqual(stats["admitted"], 1)
+        self.assertEqual(stats["rejected"], 1)
+        self.assertEqual(stats["queued"], 0)
+
+    def test_interactive_before_image(self):
+        """Khi slot trống, chat đang chờ được chạy trước ảnh dù ảnh xếp hàng trước."""
+        scheduler = ModelScheduler(max_concurrency=1, rpm=6000, burst=10, queue_timeout=2)
+        order = []
+
+        def call(name, priority):
+            with scheduler.slot(priority):
+                order.append(name)
+
+        release = threading.Event()
+
+        def hold():
+            with scheduler.slot():
+                release.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        time.sleep(0.02)
+        image = threading.Thread(target=call, args=("image", PRIORITY_IMAGE))
+        image.start()
+        time.sleep(0.02)
+        chat = threading.Thread(target=call, args=("chat", PRIORITY_INTERACTIVE))
+        chat.start()
+        time.sleep(0.02)
+
+        release.set()
+        for t in (holder, image, chat):
+            t.join()
+        self.assertEqual(order, ["chat", "image"])
+
+    def test_rate_limit_paces_starts(self):
+        # 1200 rpm = 20/s, không để dành: lần gọi thứ 3 phải chờ ~50ms
+        scheduler = ModelScheduler(max_concurrency=4, rpm=1200, burst=1, queue_timeout=1)
+        start = time.monotonic()
+        for _ in range(3):
+            with scheduler.slot():
+                pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+from flask import Flask
+
+# Thêm thư mục cha vào sys.path để import được LocalRouter.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import Routing
+from LocalRouter import RoadGraph, LocalRouter, LocalRouteError
+from RoadGraphBuilder import build_road_graph
+from RouteCache import RouteCache
+
+#   0 ---- 1 ---- 2        đường trên: ngắn nhưng chậm (kẹt xe)
+#   |             |
+#   3 ----------- 4        đường dưới: dài hơn nhưng nhanh
+#                          5: nút rời, không nối với ai
+LAT = [10.770, 10.770, 10.770, 10.765, 10.765, 10.800]
+LON = [106.690, 106.695, 106.700, 106.690, 106.700, 106.750]
+
+
+def two_way(u, v, length_m, time_s):
+    return [(u, v, length_m, time_s), (v, u, length_m, time_s)]
+
+
+EDGES = (two_way(0, 1, 550, 120) + two_way(1, 2, 550, 120) + two_way(0, 3, 560, 40)
+         + two_way(3, 4, 1100, 60) + two_way(4, 2, 560, 40))
+
+
+class TestLocalRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = RoadGraph.from_edges(LAT, LON, EDGES)
+        self.router = LocalRouter(self.graph)
+
+    def test_csr_layout(self):
+        self.assertEqual((self.graph.node_count, self.graph.edge_count), (6, 10))
+        self.assertEqual(self.graph.indices[self.graph.indptr[0]:self.graph.indptr[1]].tolist(), [1, 3])
+        self.assertEqual(self.graph.indptr[-1], 10)
+
+    def test_astar_prefers_fastest_path(self):
+        route = self.router.route(10.7701, 106.6901, 10.7699, 106.7001)
+        self.assertEqual(route["geometry"]["type"], "LineString")
+        self.assertEqual(route["geometry"]["coordinates"],
+                         [[106.690, 10.770], [106.690, 10.765], [106.700, 10.765], [106.700, 10.770]])
+        self.assertEqual((route["distance_m"], route["duration_s"]), (2220.0, 140.0))
+        self.assertEqual(self.router.stats()["routes"], 1)
+
+    def test_unreachable_and_off_graph(self):
+        with self.assertRaises(LocalRouteError):
+            self.router.route(10.770, 106.690, 10.800, 106.750)
+        with self.assertRaises(LocalRouteError):
+            self.router.route(10.770, 106.690, 45.46, 9.15)
+        self.assertEqual(self.router.stats()["errors"], 2)
+
+    def test_save_load_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.npz")
+            self.graph.save(path)
+            loaded = RoadGraph.load(path)
+        self.assertEqual(loaded.shortest_path(0, 2)[0], [0, 3, 4, 2])
+        with self.assertRaises(LocalRouteError):
+            RoadGraph.load(os.path.join(tmp, "missing.npz"))
+
+    def test_matrix_from_one_search(self):
+        cells = self.router.matrix(10.770, 106.690, [(10.770, 106.700), (10.765, 106.690), (10.800, 106.750), (45.46, 9.15)])
+        self.assertEqual(cells[0], {"duration_s": 140.0, "distance_m": 2220.0})
+        self.assertEqual(cells[1], {"duration_s": 40.0, "distance_m": 560.0})
+        # Nút rời và điểm ngoài đồ thị: không có đường
+        self.assertEqual(cells[2:], [None, None])
+
+    @patch('Routing.ROUTING_BACKEND', 'local')
+    @patch('Routing.ors_client')
+    @patch('Routing.get_matrix_cache')
+    @patch('Routing.restaurants_by_ids')
+    def test_matrix_api_with_local_backend(self, mock_rows, mock_matrix_cache, mock_ors):
+        from RouteCache import MatrixCache
+        mock_matrix_cache.return_value = MatrixCache()
+        mock_rows.return_value = [
+            {"id": 1, "name": "Xa", "latitude": 10.770, "longitude": 106.700},
+            None,
+            {"id": 3, "name": "Gan", "latitude": 10.765, "longitude": 106.690},
+        ]
+        app = Flask(__name__)
+        with app.app_context(), patch('Routing.get_local_router', return_value=self.router):
+            response = Routing.travelTimeMatrix({'origin': {'lat': 10.770, 'lng': 106.690}, 'restaurant_ids': [1, 2, 3]})
+            too_many = Routing.travelTimeMatrix({'origin': 'Quận 1', 'restaurant_ids': list(range(Routing.MATRIX_MAX_DESTINATIONS + 1))})
+
+        data = response.get_json()
+        self.assertEqual([r['id'] for r in data['results']], [3, 1])
+        self.assertEqual(data['results'][0]['duration_s'], 40.0)
+        self.assertEqual(data['missing_ids'], [2])
+        self.assertEqual(too_many[1], 400)
+        mock_ors.distance_matrix.assert_not_called()
+
+    @patch('Routing.ROUTING_BACKEND', 'local')
+    @patch('Routing.ors_client')
+    @patch('Routing.get_coordinates_from_db', return_value=(10.770, 106.700))
+    @patch('Routing.geocode_address', return_value=(10.770, 106.690))
+    def test_find_path_with_local_backend(self, mock_geocode, mock_db, mock_ors):
+        """ROUTING_BACKEND=local: /api/find_path trả về cùng dạng, không gọi ORS."""
+        app = Flask(__name__)
+        with app.app_context(), patch('Routing.get_local_router', return_value=self.router):
+            response = Routing.drawPathToDestionation({'origin': 'A', 'destination': 'B'})
+
+        data = response.get_json()
+        self.assertEqual(data['start_point'], [10.770, 106.690])
+        self.assertEqual(data['end_point'], [10.770, 106.700])
+        self.assertEqual(len(data['geometry']['coordinates']), 4)
+        mock_ors.directions.assert_not_called()
+
+
+# Ngã ba: 1 -> 2 là đường một chiều, 2 - 3 hai chiều, way đi bộ bị bỏ qua
+OSM_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="10.7700" lon="106.6900"/>
+  <node id="2" lat="10.7700" lon="106.6950"/>
+  <node id="3" lat="10.7650" lon="106.6950"/>
+  <node id="4" lat="10.7600" lon="106.6950"/>
+  <way id="10">
+    <nd ref="1"/><nd ref="2"/>
+    <tag k="highway" v="primary"/><tag k="oneway" v="yes"/>
+  </way>
+  <way id="11">
+    <nd ref="2"/><nd ref="3"/>
+    <tag k="highway" v="residential"/><tag k="maxspeed" v="20"/>
+  </way>
+  <way id="12">
+    <nd ref="3"/><nd ref="4"/>
+    <tag k="highway" v="footway"/>
+  </way>
+</osm>
+"""
+
+
+class TestRoadGraphBuilder(unittest.TestCase):
+
+    def test_build_from_osm_extract(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "roads.osm")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(OSM_XML)
+            graph = build_road_graph(path)
+
+        # Nút 4 chỉ nằm trên đường đi bộ: không vào đồ thị
+        self.assertEqual((graph.node_count, graph.edge_count), (3, 3))
+        self.assertEqual(graph.shortest_path(0, 2)[0], [0, 1, 2])
+        with self.assertRaises(LocalRouteError):
+            graph.shortest_path(2, 0)
+
+        # ~550 m ở 30 km/h (primary), ~556 m ở maxspeed 20 km/h
+        nodes, seconds, meters, _ = graph.shortest_path(0, 2)
+        self.assertAlmostEqual(meters, 1103, delta=5)
+        self.assertAlmostEqual(seconds, 547 / (30 / 3.6) + 556 / (20 / 3.6), delta=3)
+
+
+class TestLocalBackendFallback(unittest.TestCase):
+
+    @patch('Routing.ROUTING_BACKEND', 'local')
+    @patch('Routing._local_fallback_reported', False)
+    @patch('Routing.get_local_router', side_effect=LocalRouteError("Road graph not found: data/hcm_road_graph.npz"))
+    @patch('Routing.ors_client')
+    def test_missing_graph_falls_back_to_ors(self, mock_ors, mock_router):
+        geometry = {"type": "LineString", "coordinates": [[106.69, 10.77], [106.70, 10.77]]}
+        mock_ors.directions.return_value = {"features": [{"geometry": geometry}]}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = RouteCache(os.path.join(tmp, "routes.sqlite"))
+            with patch('Routing.get_route_cache', return_value=cache):
+                self.assertEqual(Routing.active_backend(), "ors")
+                self.assertEqual(Routing.get_route(10.77, 106.69, 10.77, 106.70), geometry)
+            cache.close()
+
+        mock_ors.directions.assert_called_once()
+        self.assertTrue(Routing._local_fallback_reported)
+
+
+if __name__ == '__main__':
+    unittest.main()
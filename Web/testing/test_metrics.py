@@ -0,0 +1,40 @@
+import unittest
+import sys
+import os
+
+# --- 1. SETUP ENVIRONMENT ---
+for key in ("GOOGLE_API_KEY", "GEOAPIFY_API_KEY", "SPOONACULAR_API_KEY"):
+    os.environ.setdefault(key, "TEST_KEY")
+
+# Thêm thư mục cha vào sys.path để import được app.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as web
+
+
+class TestMetricsAccess(unittest.TestCase):
+
+    def setUp(self):
+        web.app.config["TESTING"] = True
+        self.client = web.app.test_client()
+        self.addCleanup(web.app.config.update, METRICS_TOKEN=web.app.config.get("METRICS_TOKEN"))
+
+    def test_local_only_without_token(self):
+        web.app.config["METRICS_TOKEN"] = None
+        self.assertEqual(self.client.get("/api/metrics").status_code, 200)
+        remote = self.client.get("/api/metrics", environ_base={"REMOTE_ADDR": "203.0.113.7"})
+        self.assertEqual(remote.status_code, 403)
+
+    def test_token_required_when_configured(self):
+        web.app.config["METRICS_TOKEN"] = "s3cret"
+        # Có token thì kể cả request nội bộ (vd. sau reverse proxy) cũng phải gửi token
+        self.assertEqual(self.client.get("/api/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/api/metrics", headers={"X-Metrics-Token": "wrong"}).status_code, 403)
+        ok = self.client.get("/api/metrics", headers={"X-Metrics-Token": "s3cret"},
+                             environ_base={"REMOTE_ADDR": "203.0.113.7"})
+        self.assertEqual(ok.status_code, 200)
+        self.assertIn("llm", ok.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import threading
+
+# Thêm thư mục cha vào sys.path để import được NutritionStore.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from NutritionStore import NutritionStore, dish_key
+from SqliteStore import SqliteStore
+from helpers import FakeClock
+
+SEED = {"dishes": {"Phở Bò": {"Calories": "450 kcal", "Protein": "25 g", "Fat": "12 g"}}}
+PIZZA = {"Calories": "800 kcal", "Protein": "30 g", "Fat": "35 g"}
+
+
+class TestNutritionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        seed_path = os.path.join(self.tmp.name, "seed.json")
+        with open(seed_path, "w", encoding="utf-8") as f:
+            json.dump(SEED, f)
+        self.clock = FakeClock(1000.0)
+        self.store = NutritionStore(os.path.join(self.tmp.name, "nutrition.sqlite"), seed_path,
+                                    ttl=100, miss_ttl=10, clock=self.clock)
+
+    def test_seeded_dish_by_normalized_name(self):
+        self.assertEqual(dish_key("  Phở BÒ! "), "pho bo")
+        self.assertEqual(self.store.get("pho bo"), (True, SEED["dishes"]["Phở Bò"]))
+        self.clock.now += 10 ** 6
+        self.assertTrue(self.store.get("Phở Bò")[0])
+        # API không ghi đè dữ liệu seed
+        self.store.put("Pho Bo", PIZZA)
+        self.assertEqual(self.store.get("Pho Bo")[1]["Calories"], "450 kcal")
+
+    def test_ttl_and_negative_cache(self):
+        self.assertEqual(self.store.get("Pizza"), (False, None))
+        self.store.put("Pizza", PIZZA)
+        self.store.put("Sushi", None)
+        self.assertEqual(self.store.get("pizza"), (True, PIZZA))
+        self.assertEqual(self.store.get("Sushi"), (True, {}))
+
+        self.clock.now += 10
+        self.assertEqual(self.store.get("Sushi"), (False, None))
+        self.assertTrue(self.store.get("Pizza")[0])
+        self.clock.now += 90
+        self.assertEqual(self.store.get("Pizza"), (False, None))
+
+        stats = self.store.stats()
+        self.assertEqual(stats["rows"], 3)
+        self.assertEqual(stats["expired"], 2)
+        self.assertEqual(stats["negative_hits"], 1)
+
+    def test_memory_tier_and_thread_connection(self):
+        self.store.put("Pizza", PIZZA)
+        conn = self.store.conn
+        self.assertIs(self.store.conn, conn)
+        for _ in range(3):
+            self.assertEqual(self.store.get("Pizza"), (True, PIZZA))
+        stats = self.store.stats()
+        # put đã nạp sẵn bản trong bộ nhớ: không lần nào phải đọc SQLite
+        self.assertEqual((stats["memory_hits"], stats["db_hits"]), (3, 0))
+
+        # Bản trả về là bản sao, sửa nó không làm hỏng cache
+        self.store.get("Pizza")[1]["Calories"] = "0 kcal"
+        self.assertEqual(self.store.get("Pizza")[1]["Calories"], "800 kcal")
+
+        # Luồng khác dùng kết nối riêng
+        other = []
+        worker = threading.Thread(target=lambda: other.append(self.store.conn))
+        worker.start()
+        worker.join()
+        self.assertIsNot(other[0], conn)
+
+    def test_persists_across_instances(self):
+        self.store.put("Pizza", PIZZA)
+        reopened = NutritionStore(self.store.db_path, seed_path=None, clock=self.clock)
+        self.assertEqual(reopened.get("Pizza"), (True, PIZZA))
+
+
+    def test_store_subclass_must_implement_read_and_write(self):
+        class Incomplete(SqliteStore):
+            SCHEMA = "CREATE TABLE IF NOT EXISTS t (k TEXT PRIMARY KEY);"
+            TABLE = "t"
+
+            def _read(self, key):
+                return None
+
+        # Thiếu _write: lỗi ngay khi tạo, không phải ở lần ghi đầu tiên
+        with self.assertRaises(TypeError):
+            Incomplete(os.path.join(self.tmp.name, "t.sqlite"), ttl=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để import được PromptContext.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PromptContext import (
+    build_restaurant_context, hydrate_recommendations, format_row, estimate_tokens, HEADER, MIN_CONTEXT_ROWS
+)
+
+
+def make_row(rid, name="Phở Hòa", tags="Family, Office workers, Students, Couple"):
+    return {
+        "id": rid, "name": name, "tags": tags,
+        "location": "260C Pasteur, P. 8, Quận 3, TP. HCM", "rating": 8.2,
+        "price_range": "50.000đ - 90.000đ", "opening_hours": "06:00 - 22:00",
+        "latitude": 10.78, "longitude": 106.69, "distance_km": 1.23456,
+        "local_image_path": f"foody_images/{rid}_pho.jpg",
+        "original_image_url": "https://example.com/very/long/image/url.jpg",
+        "detail_page_url": "https://www.foody.vn/ho-chi-minh/pho-hoa-pasteur"
+    }
+
+
+class TestPromptContext(unittest.TestCase):
+
+    def test_row_projection(self):
+        line = format_row(make_row(7, name="Bún | Chả"))
+        self.assertEqual(
+            line, "7|Bún / Chả|260C Pasteur, P. 8, Quận 3|8.2|50.000đ - 90.000đ|06:00 - 22:00|1.2|Family, Office workers, Students"
+        )
+        self.assertNotIn("http", line)
+        self.assertNotIn("foody_images", line)
+
+    def test_budget_limits_rows(self):
+        rows = [make_row(i) for i in range(100)]
+        text, used = build_restaurant_context(rows, token_budget=400, max_rows=40)
+        self.assertLessEqual(estimate_tokens(text), 400)
+        self.assertTrue(text.startswith(HEADER))
+        self.assertEqual(len(text.splitlines()), len(used) + 1)
+        self.assertEqual([r["id"] for r in used], list(range(len(used))))
+
+        # Ngân sách quá nhỏ vẫn giữ tối thiểu vài ứng viên; max_rows là trần
+        self.assertEqual(len(build_restaurant_context(rows, token_budget=1)[1]), MIN_CONTEXT_ROWS)
+        self.assertEqual(len(build_restaurant_context(rows, token_budget=10 ** 6, max_rows=12)[1]), 12)
+
+    def test_hydrate_from_catalogue(self):
+        rows = [make_row(1), make_row(2)]
+        recs = hydrate_recommendations([{"id": 2, "Name": "Pho Hoa", "img": "made/up.jpg"}, {"Name": "Unknown"}], rows)
+        self.assertEqual(recs[0]["img"], "foody_images/2_pho.jpg")
+        self.assertEqual(recs[0]["Name"], "Phở Hòa")
+        self.assertEqual(recs[0]["distance_km"], 1.23)
+        self.assertEqual(recs[1], {"Name": "Unknown"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để import được RestaurantIndex.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import RestaurantIndex
+
+
+def make_row(rid, lat, lon, rating=4.0, name="Quán"):
+    return {
+        'id': rid, 'name': name, 'latitude': lat, 'longitude': lon,
+        'rating': rating, 'opening_hours': "Updating", 'price_range': "Updating",
+        'tags': "Family"
+    }
+
+
+class TestRestaurantIndex(unittest.TestCase):
+
+    def setUp(self):
+        # Quận 5, Quận 1 và một điểm ở Hà Nội
+        self.rows = [
+            make_row(1, 10.7520, 106.6657),
+            make_row(2, 10.7769, 106.7009),
+            make_row(3, 21.0285, 105.8542),
+            make_row(4, None, None),
+        ]
+        self.index = RestaurantIndex.RestaurantIndex(self.rows)
+
+    def test_nearest_within_radius(self):
+        """Chỉ trả về các quán nằm trong bán kính, gần nhất đứng trước."""
+        result = self.index.nearest(10.7520, 106.6657, radius_km=10)
+        self.assertEqual([r['id'] for r in result], [1, 2])
+        self.assertEqual(result[0]['distance_km'], 0)
+        self.assertTrue(4 < result[1]['distance_km'] < 6)
+
+    def test_nearest_k(self):
+        result = self.index.nearest(10.7769, 106.7009, radius_km=10, k=1)
+        self.assertEqual([r['id'] for r in result], [2])
+
+    def test_rows_are_not_mutated(self):
+        """Kết quả là bản sao, không ghi 'distance_km' vào dữ liệu gốc."""
+        self.index.nearest(10.7520, 106.6657, radius_km=10)
+        self.assertNotIn('distance_km', self.rows[0])
+
+    def test_matches_brute_force(self):
+        """Lưới phải cho cùng kết quả với việc quét toàn bộ bảng."""
+        lat, lon = 10.76, 106.68
+        expected = sorted(
+            r['id'] for r in self.rows
+            if r['latitude'] is not None
+            and RestaurantIndex.haversine_km(lat, lon, r['latitude'], r['longitude']) <= 3
+        )
+        got = sorted(r['id'] for r in self.index.nearest(lat, lon, radius_km=3))
+        self.assertEqual(got, expected)
+
+    def test_rank_matches_sort(self):
+        """Thứ tự phải giống hệt sort theo (-rating, distance_km) của vòng lặp cũ."""
+        rows = [
+            make_row(i, 10.75 + (i % 7) * 0.004, 106.66 + (i % 5) * 0.003,
+                     rating=[3.5, 4.0, 3.5, 4.2][i % 4], name=["Phở Bò", "Cơm Tấm"][i % 2])
+            for i in range(60)
+        ]
+        index = RestaurantIndex.RestaurantIndex(rows)
+
+        for k in (1, 5, 13, 100):
+            got = index.rank(10.76, 106.67, radius_km=10, k=k, name_term="phở")
+            expected = [
+                dict(r, distance_km=round(RestaurantIndex.haversine_km(10.76, 106.67, r['latitude'], r['longitude']), 2))
+                for r in rows if "phở" in r['name'].lower()
+            ]
+            expected.sort(key=lambda x: (-x['rating'], x['distance_km']))
+            self.assertEqual([r['id'] for r in got], [r['id'] for r in expected[:k]])
+
+    def test_rank_without_location(self):
+        """Không có vị trí: mọi quán đều là ứng viên, distance_km = 0."""
+        result = self.index.rank(k=2)
+        self.assertEqual(len(result), 2)
+        self.assertTrue(all(r['distance_km'] == 0 for r in result))
+
+    def test_match_name_multi_word(self):
+        rows = [make_row(1, 10.75, 106.66, name="Bún Bò Huế"), make_row(2, 10.75, 106.66, name="Bún Chả")]
+        index = RestaurantIndex.RestaurantIndex(rows)
+        self.assertEqual([r['id'] for r in index.rank(name_term="bún bò")], [1])
+        self.assertEqual(sorted(r['id'] for r in index.rank(name_term="bún")), [1, 2])
+
+    def test_rank_open_at(self):
+        """Lọc 'đang mở cửa' theo phút trong ngày, kể cả khung giờ qua nửa đêm."""
+        rows = [make_row(i, 10.75, 106.66, name="Phở") for i in range(4)]
+        rows[0]['opening_hours'] = "06:00 - 10:00 | 16:00 - 21:00"
+        rows[1]['opening_hours'] = "18:00 - 02:00"
+        rows[2]['opening_hours'] = "Updating"
+        rows[3]['opening_hours'] = "09:00 - 14:00"
+        index = RestaurantIndex.RestaurantIndex(rows)
+
+        self.assertEqual(sorted(r['id'] for r in index.rank(open_at=9 * 60 + 30)), [0, 2, 3])
+        self.assertEqual(sorted(r['id'] for r in index.rank(open_at=60)), [1, 2])
+        self.assertEqual(sorted(r['id'] for r in index.rank(open_at=20 * 60, name_term="phở")), [0, 1, 2])
+
+        # Giờ đã tách sẵn ở ETL được ưu tiên hơn chuỗi hiển thị
+        index = RestaurantIndex.RestaurantIndex(rows, opening_hours={3: [(0, 600)]})
+        self.assertEqual(sorted(r['id'] for r in index.rank(open_at=60)), [0, 1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import MagicMock
+
+# Thêm thư mục cha vào sys.path để import được RouteCache.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from RouteCache import RouteCache, MatrixCache, snap
+from helpers import FakeClock
+
+GEOMETRY = {"type": "LineString", "coordinates": [[106.68, 10.76], [106.70, 10.77]]}
+ORIGIN = (10.76258, 106.68169)
+DEST = (10.77210, 106.69800)
+
+
+class TestRouteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "routes.sqlite")
+        self.clock = FakeClock(1000.0)
+        self.cache = RouteCache(self.db_path, ttl=100, snap_meters=50, max_rows=2, clock=self.clock)
+
+    def test_nearby_origins_share_a_route(self):
+        # ~10 m lệch nhau: cùng ô; ~200 m: ô khác
+        self.assertEqual(snap(10.762580, 106.681690, 50), snap(10.762590, 106.681700, 50))
+        self.assertNotEqual(snap(10.762580, 106.681690, 50), snap(10.764400, 106.681690, 50))
+
+        fetch = MagicMock(return_value=GEOMETRY)
+        self.assertEqual(self.cache.resolve(ORIGIN, DEST, fetch), GEOMETRY)
+        self.assertEqual(self.cache.resolve((10.76259, 106.68170), DEST, fetch), GEOMETRY)
+        fetch.assert_called_once()
+
+        self.cache.resolve((10.7644, 106.68169), DEST, fetch)
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(self.cache.stats()["memory_hits"], 1)
+
+    def test_persisted_until_ttl(self):
+        fetch = MagicMock(return_value=GEOMETRY)
+        self.cache.resolve(ORIGIN, DEST, fetch)
+
+        # Khởi động lại: bộ nhớ trống, SQLite vẫn còn
+        fresh = RouteCache(self.db_path, ttl=100, snap_meters=50, clock=self.clock)
+        self.assertEqual(fresh.resolve(ORIGIN, DEST, fetch), GEOMETRY)
+        self.assertEqual(fresh.stats()["db_hits"], 1)
+        fetch.assert_called_once()
+
+        self.clock.now += 101
+        fresh = RouteCache(self.db_path, ttl=100, snap_meters=50, clock=self.clock)
+        fresh.resolve(ORIGIN, DEST, fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_errors_not_cached_and_rows_capped(self):
+        fetch = MagicMock(side_effect=RuntimeError("ors down"))
+        with self.assertRaises(RuntimeError):
+            self.cache.resolve(ORIGIN, DEST, fetch)
+        self.assertEqual(self.cache.stats()["upstream_errors"], 1)
+
+        fetch = MagicMock(return_value=GEOMETRY)
+        for i in range(3):
+            self.clock.now += 1
+            self.cache.resolve(ORIGIN, (10.70 + i * 0.01, 106.70), fetch)
+        self.assertEqual(self.cache.stats()["rows"], 2)
+
+
+class TestMatrixCache(unittest.TestCase):
+
+    def test_only_new_destinations_are_computed(self):
+        cache = MatrixCache(ttl=100, snap_meters=50)
+        fetch = MagicMock(side_effect=lambda dests: [{"duration_s": lat * 1000, "distance_m": 1.0} for lat, _ in dests])
+        a, b, c = (10.77, 106.70), (10.78, 106.70), (10.79, 106.70)
+
+        first = cache.resolve(ORIGIN, [a, b], fetch)
+        self.assertEqual([cell["duration_s"] for cell in first], [10770.0, 10780.0])
+
+        # Cùng ô xuất phát: a, b lấy từ cache, chỉ c được tính
+        second = cache.resolve((10.76259, 106.68170), [b, c, a], fetch)
+        self.assertEqual([cell["duration_s"] for cell in second], [10780.0, 10790.0, 10770.0])
+        self.assertEqual(fetch.call_args_list[1][0][0], [c])
+
+        cache.resolve(ORIGIN, [a, c], fetch)
+        self.assertEqual(fetch.call_count, 2)
+        # Backend khác không dùng chung kết quả
+        cache.resolve(ORIGIN, [a], fetch, backend="local")
+        self.assertEqual(fetch.call_count, 3)
+
+        stats = cache.stats()
+        self.assertEqual((stats["cached"], stats["computed"], stats["batches"]), (4, 4, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+
+# Thêm thư mục cha vào sys.path để import được SearchIndex.py, FoodLoading.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from SearchIndex import InvertedIndex, HoursIndex, fold_text, tokenize, district_key, split_overnight
+from FoodLoading import FoodCatalogue
+
+
+def make_food(fid, name, location="1 Lê Lợi, P. Bến Nghé, Quận 1, TP. HCM"):
+    return {"id": fid, "name": name, "location": location, "rating": "4.0",
+            "price": "Đang cập nhật", "hours": "Đang cập nhật", "image": None}
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.foods = [
+            make_food(1, "Phở Bò Gia Truyền"),
+            make_food(2, "Bún Bò Huế O Hà"),
+            make_food(3, "Cơm Tấm Phúc Lộc Thọ"),
+            make_food(4, "Đậu Hủ Cá Viên HongKong", "28 Phan Phú Tiên, P. 10, Quận 5, TP. HCM"),
+            make_food(5, "Phở Lệ", "413 Nguyễn Trãi, P. 7, Quận 5, TP. HCM"),
+            make_food(6, "Ốc Đào", "13 Đường Số 3, P. Tân Phú, Quận 7, TP. HCM"),
+            make_food(7, "Phở Hòa", "203 Tây Thạnh, P. Tây Thạnh, Quận Tân Phú, TP. HCM"),
+        ]
+        self.catalogue = FoodCatalogue(self.foods)
+
+    def test_fold_text(self):
+        self.assertEqual(fold_text("Phở Bò Đặc Biệt"), "pho bo dac biet")
+        self.assertEqual(tokenize("Cơm Tấm - Phúc Lộc"), ["com", "tam", "phuc", "loc"])
+
+    def test_search_without_diacritics(self):
+        """Gõ không dấu vẫn phải tìm thấy: 'pho' khớp 'Phở'."""
+        self.assertEqual([f["id"] for f in self.catalogue.search("pho")], [1, 5, 7])
+        self.assertEqual([f["id"] for f in self.catalogue.search("dau hu")], [4])
+
+    def test_search_with_diacritics_and_prefix(self):
+        self.assertEqual([f["id"] for f in self.catalogue.search("bò")], [1, 2])
+        self.assertEqual([f["id"] for f in self.catalogue.search("bun b")], [2])
+        self.assertEqual([f["id"] for f in self.catalogue.search("com ta")], [3])
+
+    def test_search_no_match(self):
+        self.assertEqual(self.catalogue.search("sushi"), [])
+        self.assertEqual(self.catalogue.search("!!!"), [])
+
+    def test_district_key_variants(self):
+        """'Quận 5', 'Q.5', 'District 5' đều về cùng một khóa."""
+        for text in ("Quận 5", "Q.5", "Q5", "District 5", "28 Phan Phú Tiên, P. 10, Quận 5, TP. HCM"):
+            self.assertEqual(district_key(text), "quan 5")
+        self.assertNotEqual(district_key("Quận 15"), "quan 5")
+        self.assertEqual(district_key("Tp. Thủ Đức"), district_key("Thủ Đức"))
+        self.assertEqual(district_key("Quận Tân Bình"), district_key("Tân Bình"))
+
+    def test_filter_by_area_and_name(self):
+        self.assertEqual([f["id"] for f in self.catalogue.filter("Quận 5")], [4, 5])
+        self.assertEqual([f["id"] for f in self.catalogue.filter("Q.5", "pho")], [5])
+        self.assertEqual([f["id"] for f in self.catalogue.filter("all", "pho")], [1, 5, 7])
+        self.assertEqual(len(self.catalogue.filter("all", "")), len(self.foods))
+
+    def test_ward_is_not_district(self):
+        """Phường Tân Phú (Quận 7) không được tính vào Quận Tân Phú."""
+        self.assertEqual([f["id"] for f in self.catalogue.filter("Tân Phú")], [7])
+
+    def test_area_counts(self):
+        counts = dict(self.catalogue.area_counts())
+        self.assertEqual(counts["Quận 1"], 3)
+        self.assertEqual(counts["Quận 5"], 2)
+        self.assertEqual(list(counts)[:3], ["Quận 1", "Quận 5", "Quận 7"])
+
+    def test_exact_token_mode(self):
+        index = InvertedIndex()
+        index.add(0, "Phở Bò")
+        index.add(1, "Phố Đi Bộ")
+        self.assertEqual(index.search("pho"), [0, 1])
+        self.assertEqual(index.search("ph", prefix=False), [])
+
+    def test_split_overnight(self):
+        self.assertEqual(split_overnight([(1080, 120)]), [(1080, 1440), (0, 120)])
+        self.assertEqual(split_overnight([(420, 840), (0, 0)]), [(420, 840), (0, 1440)])
+
+    def test_hours_index_open_at(self):
+        hours = HoursIndex([[(420, 840), (960, 1260)], [(1080, 120)], None])
+        self.assertEqual(hours.open_at(600).tolist(), [True, False, True])
+        self.assertEqual(hours.open_at(900).tolist(), [False, False, True])
+        self.assertEqual(hours.open_at(90, unknown_open=False).tolist(), [False, True, False])
+
+    def test_filter_open_at(self):
+        self.foods[0]["hours"] = "06:00 - 10:00"
+        self.foods[4]["hours"] = "16:00 - 22:00"
+        catalogue = FoodCatalogue(self.foods)
+        self.assertEqual([f["id"] for f in catalogue.filter("all", "pho", open_at=8 * 60)], [1, 7])
+        self.assertEqual([f["id"] for f in catalogue.filter("Quận 5", "", open_at=8 * 60)], [4])
+
+
+if __name__ == '__main__':
+    unittest.main()